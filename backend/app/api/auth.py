@@ -1,13 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.services.chat_service import ChatService
+from app.services.webhook_service import WebhookService, webhook_worker
 from app.core.config import settings
-from app.core.auth import get_current_user
-from app.models import User
-import json
-import hmac
-import hashlib
+from app.core.auth import get_current_user, get_read_db
+from app.core.user_cache import AuthenticatedUser
+from app.models import Conversation
 from svix.webhooks import Webhook
 
 router = APIRouter()
@@ -15,80 +13,50 @@ router = APIRouter()
 
 @router.post("/webhook")
 async def clerk_webhook(request: Request, db: Session = Depends(get_db)):
-    """Handle Clerk webhooks for user management"""
+    """Handle Clerk webhooks for user management (only signed events are accepted)"""
+    headers = dict(request.headers)
+    body = await request.body()
+
+    if not all(name in headers for name in ("svix-id", "svix-timestamp", "svix-signature")):
+        raise HTTPException(status_code=400, detail="Missing webhook signature headers")
+
     try:
-        # Get headers and body
-        headers = dict(request.headers)
-        body = await request.body()
-        
-        # Check if signature headers are present
-        has_signature_headers = (
-            "svix-id" in headers and 
-            "svix-timestamp" in headers and 
-            "svix-signature" in headers
-        )
-        
-        if has_signature_headers:
-            # Try to verify webhook signature
-            try:
-                webhook = Webhook(settings.clerk_webhook_secret)
-                payload = webhook.verify(body, headers)
-                print("✅ Webhook signature verified")
-            except Exception as verify_error:
-                print(f"⚠️ Signature verification failed: {verify_error}")
-                print("⚠️ Falling back to parsing without verification")
-                payload = json.loads(body.decode())
-        else:
-            # No signature headers - parse JSON directly (for testing)
-            print("⚠️ No signature headers found, parsing without verification")
-            payload = json.loads(body.decode())
-        
-        event_type = payload.get("type")
-        user_data = payload.get("data", {})
-        
-        service = ChatService(db)
-        
-        if event_type == "user.created":
-            # Create user in our database
-            clerk_user_id = user_data.get("id")
-            email_addresses = user_data.get("email_addresses", [])
-            email = email_addresses[0].get("email_address") if email_addresses else None
-            
-            if clerk_user_id and email:
-                user = service.get_or_create_user(clerk_user_id, email)
-                print(f"✅ User created via webhook: {user.email}")
-            
-        elif event_type == "user.updated":
-            # Update user information
-            clerk_user_id = user_data.get("id")
-            email_addresses = user_data.get("email_addresses", [])
-            email = email_addresses[0].get("email_address") if email_addresses else None
-            
-            if clerk_user_id and email:
-                user = service.get_or_create_user(clerk_user_id, email)
-                print(f"✅ User updated via webhook: {user.email}")
-        
-        elif event_type == "user.deleted":
-            # Handle user deletion (optional)
-            clerk_user_id = user_data.get("id")
-            print(f"⚠️ User deleted: {clerk_user_id} (implement cleanup if needed)")
-        
-        return {"success": True, "event": event_type}
-        
+        payload = Webhook(settings.clerk_webhook_secret).verify(body, headers)
+    except Exception as e:
+        print(f"⚠️ Webhook signature verification failed: {e}")
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+
+    event_type = payload.get("type")
+    svix_id = headers["svix-id"]
+
+    try:
+        # Persist the verified event and let the background worker apply it;
+        # Clerk retries carry the same svix-id and are dropped here
+        queued = WebhookService(db).enqueue(svix_id, event_type, body)
     except Exception as e:
         print(f"❌ Webhook error: {e}")
-        raise HTTPException(status_code=400, detail=f"Webhook processing failed: {str(e)}")
+        raise HTTPException(status_code=500, detail="Could not queue webhook event")
+
+    if queued:
+        webhook_worker.notify()
+    else:
+        print(f"⚠️ Duplicate webhook {svix_id} ignored")
+    return {"success": True, "event": event_type, "duplicate": not queued}
 
 
 @router.get("/me") 
-async def get_current_user_info(user: User = Depends(get_current_user)):
+async def get_current_user_info(
+    user: AuthenticatedUser = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
     """Get current user information"""
+    conversation_count = db.query(Conversation).filter(Conversation.user_id == user.id).count()
     return {
         "id": user.id,
         "clerk_user_id": user.clerk_user_id,
         "email": user.email,
         "created_at": user.created_at,
-        "conversation_count": len(user.conversations)
+        "conversation_count": conversation_count
     }
 
 
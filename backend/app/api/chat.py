@@ -1,16 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+import asyncio
+import hashlib
+import zlib
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, WebSocket, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.database import get_db
+from app.database import READ_YOUR_WRITES_COOKIE, get_db
+from app.core.config import settings
 from app.services.chat_service import ChatService
+from app.services.export_service import stream_export
+from app.services.import_service import ImportService, NDJSONDecoder
+from app.services.search_service import SearchService
+from app.services.archive_service import conversation_archive
+from app.services.message_notifier import message_notifier
+from app.services.job_service import job_worker
+from app.services.idempotency import idempotency_store
 from app.chat.schemas import (
     ChatRequest, ChatResponse, ConversationCreate, 
-    ConversationResponse, ConversationDetail, ChatMessage
+    ConversationResponse, ConversationDetail, ChatMessage, ImportResponse,
+    SearchResponse, SyncResponse, CHAT_MESSAGE_ROW_FIELDS, CONVERSATION_DETAIL_ADAPTER
 )
 from app.chat.agents import process_message, AGENT_TYPE_MAPPING
 from app.models import MessageRole, AgentType, User
-from app.core.auth import get_current_user_id, get_current_user  # Updated imports
-import json
+from app.core.auth import get_current_user_id, get_current_user, get_read_db, authenticate_websocket
+from app.core.json_response import json_response
+from app.core.admission import admission_controller, Overloaded
+from app.core.etag import make_etag, etag_matches, set_etag, not_modified
+from app.api.websocket import ChatConnection
 
 router = APIRouter()
 
@@ -18,57 +36,115 @@ router = APIRouter()
 @router.post("/send", response_model=ChatResponse)
 async def send_message(
     chat_request: ChatRequest,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
     user_id: int = Depends(get_current_user_id),  # Now uses real auth
     db: Session = Depends(get_db)
 ):
-    """Send a message and get AI response"""
+    """
+    Send a message and get AI response
+
+    Retries that repeat the Idempotency-Key header get the original response
+    instead of running the turn (and the LLM) again; reusing a key for a
+    different request is a 422.
+    """
+    if not idempotency_key:
+        return await _send_message(chat_request, user_id, db)
+
+    key = f"{user_id}:{idempotency_key}"
+    request_hash = hashlib.sha256(chat_request.model_dump_json().encode("utf-8")).hexdigest()
+    # The hash is part of the in-process key so a different body isn't replayed from memory
+    return await idempotency_store.run(
+        f"{key}:{request_hash}",
+        lambda: _send_message(chat_request, user_id, db, key, request_hash)
+    )
+
+
+def _seconds_since(value: datetime) -> float:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)  # SQLite hands back naive UTC
+    return (datetime.now(timezone.utc) - value).total_seconds()
+
+
+async def _send_message(
+    chat_request: ChatRequest,
+    user_id: int,
+    db: Session,
+    idempotency_key: Optional[str] = None,
+    request_hash: Optional[str] = None
+) -> ChatResponse:
     try:
         service = ChatService(db)
+
+        if idempotency_key:
+            # Seen by another worker or before a restart: answer from the database
+            turn = service.get_idempotent_turn(idempotency_key)
+            if turn is not None:
+                user_message, reply = turn
+                # Rows from before request hashes were recorded have none to compare
+                if user_message.request_hash not in (None, request_hash):
+                    raise HTTPException(status_code=422, detail="This Idempotency-Key was used for a different request")
+                if reply is None:
+                    if _seconds_since(user_message.created_at) < settings.idempotency_lease_seconds:
+                        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+                    # The worker running it went away: start over
+                    service.discard_message(user_message)
+                else:
+                    return ChatResponse(
+                        message=reply.content,
+                        agent_type=reply.agent_type or AgentType.LOGICAL,
+                        conversation_id=reply.conversation_id,
+                        message_id=reply.id
+                    )
         
-        # Get or create conversation
-        if chat_request.conversation_id:
-            conversation = service.get_conversation(chat_request.conversation_id, user_id)
-            if not conversation:
-                raise HTTPException(status_code=404, detail="Conversation not found")
-        else:
-            # Create new conversation
-            conversation = service.create_conversation(user_id)
-        
-        # Add user message to database
-        user_message = service.add_message(
-            conversation.id,
-            chat_request.message,
-            MessageRole.USER
-        )
-        
-        # Get conversation history for context
-        messages = service.get_conversation_messages(conversation.id)
-        
-        # Convert to format expected by LangGraph
-        conversation_history = []
-        for msg in messages:
-            conversation_history.append({
-                "role": msg.role.value,
-                "content": msg.content
-            })
-        
-        # Process through LangGraph
-        response_content, agent_type_str = process_message(conversation_history)
-        agent_type = AGENT_TYPE_MAPPING.get(agent_type_str, AgentType.LOGICAL)
+        # Wait for a turn slot before writing anything, so a rejected request leaves no trace
+        async with admission_controller.admit():
+            # Get or create conversation
+            if chat_request.conversation_id:
+                conversation = service.get_conversation(chat_request.conversation_id, user_id)
+                if not conversation:
+                    raise HTTPException(status_code=404, detail="Conversation not found")
+            else:
+                # Create new conversation
+                conversation = service.create_conversation(user_id)
         
-        # Add AI response to database
-        ai_message = service.add_message(
-            conversation.id,
-            response_content,
-            MessageRole.ASSISTANT,
-            agent_type
-        )
+            # Add user message to database (the key's unique index catches a concurrent duplicate)
+            try:
+                user_message = service.add_message(
+                    conversation.id,
+                    chat_request.message,
+                    MessageRole.USER,
+                    idempotency_key=idempotency_key,
+                    request_hash=request_hash
+                )
+            except IntegrityError:
+                db.rollback()
+                raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+
+            try:
+                # Get conversation history for context (served from the history cache)
+                conversation_history = service.get_conversation_history(conversation.id)
+
+                # Process through LangGraph, off the event loop
+                response_content, agent_type_str = await asyncio.to_thread(process_message, conversation_history)
+                agent_type = AGENT_TYPE_MAPPING.get(agent_type_str, AgentType.LOGICAL)
+
+                # Add AI response to database, linked to the message it answers
+                ai_message = service.add_message(
+                    conversation.id,
+                    response_content,
+                    MessageRole.ASSISTANT,
+                    agent_type,
+                    reply_to_id=user_message.id
+                )
+            except Exception:
+                if idempotency_key:
+                    # Free the key so the client's retry runs the turn instead of getting 409s
+                    service.discard_message(user_message)
+                raise
         
-        # Auto-generate title if this is the first exchange
-        if not conversation.title and len(messages) == 1:
-            title = service.auto_generate_title(conversation)
-            conversation.title = title
-            db.commit()
+        # Auto-generate title if this is the first exchange (after the response is sent)
+        if not conversation.title and len(conversation_history) == 1:
+            job_worker.enqueue(db, "generate_title", conversation.id)
         
         return ChatResponse(
             message=response_content,
@@ -77,6 +153,14 @@ async def send_message(
             message_id=ai_message.id
         )
         
+    except HTTPException:
+        raise
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many chats in progress, please retry shortly",
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         print(f"Chat error: {e}")
         raise HTTPException(status_code=500, detail="Failed to process message")
@@ -84,12 +168,20 @@ async def send_message(
 
 @router.get("/conversations", response_model=List[ConversationResponse])
 async def get_conversations(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     user_id: int = Depends(get_current_user_id),  # Now uses real auth
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get all conversations for the current user"""
     try:
         service = ChatService(db)
+
+        # Answer revalidations from a metadata query before loading anything
+        etag = make_etag(user_id, *service.get_conversations_version(user_id))
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
         conversations = service.get_user_conversations(user_id)
         
         result = []
@@ -99,9 +191,10 @@ async def get_conversations(
                 title=conv.title,
                 created_at=conv.created_at,
                 updated_at=conv.updated_at,
-                message_count=len(conv.messages)
+                message_count=len(conv.messages) or conversation_archive.archived_message_count(conv.id)
             ))
         
+        set_etag(response, etag)
         return result
         
     except Exception as e:
@@ -112,8 +205,9 @@ async def get_conversations(
 @router.get("/conversations/{conversation_id}", response_model=ConversationDetail)
 async def get_conversation(
     conversation_id: int,
+    if_none_match: Optional[str] = Header(None),
     user_id: int = Depends(get_current_user_id),  # Now uses real auth
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get a specific conversation with all messages"""
     try:
@@ -122,30 +216,69 @@ async def get_conversation(
         conversation = service.get_conversation(conversation_id, user_id)
         if not conversation:
             raise HTTPException(status_code=404, detail="Conversation not found")
+
+        # A new message or any change to the conversation row (title) changes the ETag
+        etag = make_etag(conversation.id, conversation.updated_at, service.get_last_message_id(conversation.id))
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
         
-        # Convert messages to schema format
-        messages = []
-        for msg in conversation.messages:
-            messages.append(ChatMessage(
-                content=msg.content,
-                role=msg.role,
-                agent_type=msg.agent_type,
-                created_at=msg.created_at
-            ))
-        
-        return ConversationDetail(
-            id=conversation.id,
-            title=conversation.title,
-            created_at=conversation.created_at,
-            updated_at=conversation.updated_at,
-            messages=messages
-        )
+        # Build the response from plain rows and validate it in one pass, rather
+        # than an ORM object plus a ChatMessage model per message
+        rows = service.get_conversation_message_rows(conversation.id)
+        detail = CONVERSATION_DETAIL_ADAPTER.validate_python({
+            "id": conversation.id,
+            "title": conversation.title,
+            "created_at": conversation.created_at,
+            "updated_at": conversation.updated_at,
+            "messages": [dict(zip(CHAT_MESSAGE_ROW_FIELDS, row)) for row in rows]
+        })
+        response = json_response(detail, CONVERSATION_DETAIL_ADAPTER)
+        set_etag(response, etag)
+        return response
         
     except Exception as e:
         print(f"Get conversation error: {e}")
         raise HTTPException(status_code=500, detail="Failed to get conversation")
 
 
+@router.get("/sync", response_model=SyncResponse)
+async def sync_messages(
+    since_id: int = 0,
+    conversation_id: Optional[int] = None,
+    wait: float = Query(0, ge=0, le=60, description="Seconds to hold the request open if nothing is new"),
+    limit: int = Query(100, ge=1, le=1000),
+    user_id: int = Depends(get_current_user_id),
+    db: Session = Depends(get_db)
+):
+    """
+    Messages newer than since_id, in one conversation or across all of the user's
+
+    With wait > 0 this long-polls: an empty result holds the request until a
+    new message is written in this worker or the wait expires.
+    """
+    service = ChatService(db)
+    # Primary, not a replica: right after a wake-up a replica may not have the row yet
+    with message_notifier.listen(user_id) as new_message:
+        rows = service.get_messages_since(user_id, since_id, conversation_id, limit + 1)
+        deadline = asyncio.get_running_loop().time() + wait
+        while not rows and wait > 0:
+            # Give the connection back to the pool while we wait
+            db.rollback()
+            try:
+                await asyncio.wait_for(new_message.wait(), timeout=deadline - asyncio.get_running_loop().time())
+            except asyncio.TimeoutError:
+                break
+            # The message may be in another conversation than the one we're syncing
+            new_message.clear()
+            rows = service.get_messages_since(user_id, since_id, conversation_id, limit + 1)
+
+    return SyncResponse(
+        messages=rows[:limit],
+        last_id=rows[:limit][-1].id if rows else since_id,
+        has_more=len(rows) > limit
+    )
+
+
 @router.post("/conversations", response_model=ConversationResponse)
 async def create_conversation(
     conversation_data: ConversationCreate,
@@ -170,24 +303,99 @@ async def create_conversation(
         raise HTTPException(status_code=500, detail="Failed to create conversation")
 
 
-# WebSocket endpoint (unchanged for now)
+@router.get("/search", response_model=SearchResponse)
+async def search_messages(
+    q: str,
+    agent_type: Optional[AgentType] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    archived: bool = False,
+    user_id: int = Depends(get_current_user_id),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Full-text search over the current user's messages, best matches first
+
+    Archived conversations aren't indexed; pass archived=true to scan them
+    too (slower, and the same value on every page of a search).
+    """
+    try:
+        service = SearchService(db)
+        return service.search_messages(user_id, q, agent_type, limit, cursor, include_archived=archived)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"Search error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to search messages")
+
+
+@router.get("/export")
+async def export_conversations(
+    request: Request,
+    gzip: bool = False,
+    user_id: int = Depends(get_current_user_id)
+):
+    """Stream all of the current user's conversations and messages as NDJSON"""
+    filename = "conversations.ndjson.gz" if gzip else "conversations.ndjson"
+    return StreamingResponse(
+        stream_export(user_id, compress=gzip, last_write_at=request.cookies.get(READ_YOUR_WRITES_COOKIE)),
+        media_type="application/gzip" if gzip else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.post("/import", response_model=ImportResponse)
+async def import_conversations(
+    request: Request,
+    user_id: int = Depends(get_current_user_id),
+    db: Session = Depends(get_db)
+):
+    """
+    Bulk import NDJSON conversations (as produced by /export) for the current user
+
+    The import is one transaction: invalid data anywhere in the body imports
+    nothing, so the request can simply be retried once fixed.
+    """
+    service = ImportService(db, user_id=user_id, commit_batches=False)
+    decoder = NDJSONDecoder(gzip=request.headers.get("content-encoding") == "gzip")
+
+    try:
+        # Decoding and inserting block, so they run off the event loop
+        async for chunk in request.stream():
+            await asyncio.to_thread(_import_chunk, decoder, service, chunk)
+        result = await asyncio.to_thread(_finish_import, decoder, service)
+    except (ValueError, KeyError, zlib.error) as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Invalid import data: {str(e)}")
+
+    print(f"✅ Imported {result.messages} messages at {result.rows_per_second} rows/s")
+    return result
+
+
+def _import_chunk(decoder: NDJSONDecoder, service: ImportService, chunk: bytes) -> None:
+    for record in decoder.feed(chunk):
+        service.feed(record)
+
+
+def _finish_import(decoder: NDJSONDecoder, service: ImportService) -> ImportResponse:
+    for record in decoder.close():
+        service.feed(record)
+    return service.finish()
+
+
 @router.websocket("/ws/{conversation_id}")
 async def websocket_endpoint(websocket: WebSocket, conversation_id: int):
-    """WebSocket endpoint for real-time chat"""
+    """
+    WebSocket endpoint for real-time, streaming chat
+
+    The connection is authenticated once (token query parameter or bearer
+    header) and can then carry turns for any of the user's conversations; the
+    conversation in the URL is the default (0 starts a new one).
+    """
+    user = await authenticate_websocket(websocket)
+    if user is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
     await websocket.accept()
-    
-    try:
-        while True:
-            data = await websocket.receive_text()
-            message_data = json.loads(data)
-            
-            response = {
-                "type": "message",
-                "content": f"Echo: {message_data.get('message', '')}",
-                "agent_type": "logical"
-            }
-            
-            await websocket.send_text(json.dumps(response))
-            
-    except WebSocketDisconnect:
-        print(f"WebSocket disconnected for conversation {conversation_id}")
\ No newline at end of file
+    await ChatConnection(websocket, user, conversation_id or None).run()
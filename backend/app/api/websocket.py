@@ -0,0 +1,169 @@
+import asyncio
+import json
+from typing import Any, Dict, List, Optional, Set, Tuple
+from fastapi import WebSocket, WebSocketDisconnect
+from app.database import SessionLocal
+from app.services.chat_service import ChatService
+from app.services.job_service import job_worker
+from app.chat.agents import stream_message, AGENT_TYPE_MAPPING
+from app.models import MessageRole, AgentType
+from app.core.user_cache import AuthenticatedUser
+from app.core.admission import admission_controller, Overloaded
+
+
+class ChatConnection:
+    """
+    One authenticated WebSocket carrying chat turns for any of the user's conversations
+
+    Client frames:
+        {"type": "message", "message": "...", "conversation_id": 12, "request_id": "..."}
+        {"type": "ping"}
+
+    conversation_id defaults to the one in the URL; without either a new
+    conversation is created. For each turn the server sends "accepted",
+    "routing", any number of "token" frames and a final "message" frame with
+    the persisted reply (or an "error" frame). Every frame carries the
+    conversation_id and the client's request_id, so turns for different
+    conversations can stream over the socket at the same time. A new
+    conversation's title is generated in the background, so the first
+    "message" frame has no title yet.
+    """
+
+    def __init__(self, websocket: WebSocket, user: AuthenticatedUser, conversation_id: Optional[int] = None):
+        self.websocket = websocket
+        self.user = user
+        self.default_conversation_id = conversation_id
+        self._send_lock = asyncio.Lock()
+        # Per-conversation turn locks, dropped once no turn holds or waits for them
+        self._conversation_locks: Dict[int, asyncio.Lock] = {}
+        self._lock_users: Dict[int, int] = {}
+        self._turns: Set[asyncio.Task] = set()
+        self._closed = False
+
+    async def send(self, frame: Dict[str, Any]) -> None:
+        if self._closed:
+            return
+        # Concurrent turns share the socket, so frames must not interleave
+        async with self._send_lock:
+            try:
+                await self.websocket.send_text(json.dumps(frame))
+            except Exception:
+                self._closed = True
+
+    async def run(self) -> None:
+        try:
+            while True:
+                data = await self.websocket.receive_text()
+                try:
+                    frame = json.loads(data)
+                except ValueError:
+                    await self.send({"type": "error", "detail": "Invalid JSON"})
+                    continue
+
+                if frame.get("type") == "ping":
+                    await self.send({"type": "pong"})
+                elif frame.get("type", "message") == "message" and frame.get("message"):
+                    task = asyncio.create_task(self._turn(frame))
+                    self._turns.add(task)
+                    task.add_done_callback(self._turns.discard)
+                else:
+                    await self.send({
+                        "type": "error",
+                        "request_id": frame.get("request_id"),
+                        "detail": "Expected a message frame"
+                    })
+
+        except WebSocketDisconnect:
+            print(f"WebSocket disconnected for user {self.user.id}")
+        finally:
+            # Turns already started still persist their reply; they just stop sending
+            self._closed = True
+
+    async def _turn(self, frame: Dict[str, Any]) -> None:
+        conversation_id = frame.get("conversation_id") or self.default_conversation_id
+        base = {"conversation_id": conversation_id, "request_id": frame.get("request_id")}
+
+        # Turns in one conversation run in order; different conversations run concurrently
+        lock = None
+        if conversation_id:
+            lock = self._conversation_locks.setdefault(conversation_id, asyncio.Lock())
+            self._lock_users[conversation_id] = self._lock_users.get(conversation_id, 0) + 1
+        acquired = False
+        try:
+            if lock:
+                await lock.acquire()
+                acquired = True
+            # Same per-worker turn limit as POST /send
+            async with admission_controller.admit():
+                await self._run_turn(conversation_id, frame["message"], base)
+        except Overloaded as e:
+            await self.send({**base, "type": "error", "detail": "Server busy", "retry_after": e.retry_after})
+        except Exception as e:
+            print(f"WebSocket chat error: {e}")
+            await self.send({**base, "type": "error", "detail": "Failed to process message"})
+        finally:
+            if acquired:
+                lock.release()
+            if lock:
+                self._lock_users[conversation_id] -= 1
+                if not self._lock_users[conversation_id]:
+                    del self._lock_users[conversation_id]
+                    del self._conversation_locks[conversation_id]
+
+    async def _run_turn(self, conversation_id: Optional[int], text: str, base: Dict[str, Any]) -> None:
+        db = SessionLocal()
+        db.info["user_id"] = self.user.id
+        try:
+            # Database work is synchronous, so keep it off the loop other turns stream on
+            started = await asyncio.to_thread(self._start_turn, db, conversation_id, text)
+            if started is None:
+                await self.send({**base, "type": "error", "detail": "Conversation not found"})
+                return
+            conversation_id, user_message_id, history = started
+            base["conversation_id"] = conversation_id
+            await self.send({**base, "type": "accepted", "message_id": user_message_id})
+
+            async for event in stream_message(history):
+                if event["type"] == "routing":
+                    await self.send({**base, "type": "routing", "agent_type": event["agent_type"]})
+                elif event["type"] == "token":
+                    await self.send({**base, "type": "token", "delta": event["delta"]})
+                else:
+                    content, agent_type_str = event["content"], event["agent_type"]
+
+            agent_type = AGENT_TYPE_MAPPING.get(agent_type_str, AgentType.LOGICAL)
+            message_id, title = await asyncio.to_thread(
+                self._finish_turn, db, conversation_id, content, agent_type, len(history) == 1
+            )
+            await self.send({
+                **base,
+                "type": "message",
+                "message_id": message_id,
+                "content": content,
+                "agent_type": agent_type.value,
+                "title": title
+            })
+        finally:
+            db.close()
+
+    def _start_turn(self, db, conversation_id: Optional[int], text: str) -> Optional[Tuple[int, int, List[Dict[str, str]]]]:
+        service = ChatService(db)
+        if conversation_id:
+            conversation = service.get_conversation(conversation_id, self.user.id)
+            if not conversation:
+                return None
+        else:
+            conversation = service.create_conversation(self.user.id)
+
+        user_message = service.add_message(conversation.id, text, MessageRole.USER)
+        return conversation.id, user_message.id, service.get_conversation_history(conversation.id)
+
+    def _finish_turn(self, db, conversation_id: int, content: str, agent_type: AgentType, first_exchange: bool) -> Tuple[int, Optional[str]]:
+        service = ChatService(db)
+        ai_message = service.add_message(conversation_id, content, MessageRole.ASSISTANT, agent_type)
+
+        conversation = service.get_conversation(conversation_id, self.user.id)
+        # Auto-generate title if this is the first exchange (in the background)
+        if not conversation.title and first_exchange:
+            job_worker.enqueue(db, "generate_title", conversation_id)
+        return ai_message.id, conversation.title
@@ -1,4 +1,4 @@
-from typing import Annotated, Literal, List, Dict, Any
+from typing import Annotated, Literal, List, Dict, Any, AsyncIterator
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
 from langchain.chat_models import init_chat_model
@@ -6,6 +6,7 @@ from langchain_core.messages import HumanMessage, AIMessage
 from pydantic import BaseModel, Field
 from typing_extensions import TypedDict
 from app.core.config import settings
+from app.core.circuit_breaker import CircuitBreaker, CircuitOpen
 from app.models import AgentType
 
 # Initialize LLM with your API key
@@ -14,6 +15,21 @@ llm = init_chat_model(
     api_key=settings.anthropic_api_key
 )
 
+# Shared by every node, so once the LLM is failing no turn waits on it
+llm_breaker = CircuitBreaker(
+    window_size=settings.llm_breaker_window,
+    min_calls=settings.llm_breaker_min_calls,
+    failure_rate=settings.llm_breaker_failure_rate,
+    slow_call_seconds=settings.llm_breaker_slow_call_seconds,
+    open_seconds=settings.llm_breaker_open_seconds
+)
+
+
+def invoke_llm(runnable, messages):
+    """Invoke an LLM runnable through the circuit breaker (raises CircuitOpen while it's open)"""
+    with llm_breaker.call():
+        return runnable.invoke(messages)
+
 
 class MessageClassifier(BaseModel):
     message_type: Literal["emotional", "logical", "study", "creative", "planning"] = Field(
@@ -38,7 +54,7 @@ def classify_message(state: State):
     last_message = state["messages"][-1]
     classifier_llm = llm.with_structured_output(MessageClassifier)
 
-    result = classifier_llm.invoke([
+    result = invoke_llm(classifier_llm, [
         {
             "role": "system",
             "content": """Classify the user message based on their primary intent and need."""
@@ -68,7 +84,7 @@ def therapist_agent(state: State):
          }
     ] + conversation_messages
     
-    reply = llm.invoke(messages)
+    reply = invoke_llm(llm, messages)
     return {"messages": [reply]}
 
 
@@ -85,7 +101,7 @@ def logical_agent(state: State):
          }
     ] + conversation_messages
     
-    reply = llm.invoke(messages)
+    reply = invoke_llm(llm, messages)
     return {"messages": [reply]}
 
 
@@ -110,7 +126,7 @@ def study_buddy_agent(state: State):
          }
     ] + conversation_messages
     
-    reply = llm.invoke(messages)
+    reply = invoke_llm(llm, messages)
     return {"messages": [reply]}
 
 
@@ -136,7 +152,7 @@ def creative_agent(state: State):
          }
     ] + conversation_messages
     
-    reply = llm.invoke(messages)
+    reply = invoke_llm(llm, messages)
     return {"messages": [reply]}
 
 
@@ -162,7 +178,7 @@ def planning_agent(state: State):
          }
     ] + conversation_messages
     
-    reply = llm.invoke(messages)
+    reply = invoke_llm(llm, messages)
     return {"messages": [reply]}
 
 
@@ -211,6 +227,31 @@ def create_conversation_graph():
 conversation_graph = create_conversation_graph()
 
 
+# Nodes whose LLM output is the reply itself (the classifier's isn't)
+AGENT_NODES = {"emotional", "logical", "study", "creative", "planning"}
+
+
+def to_langchain_messages(messages: List[Dict[str, str]]) -> list:
+    """Convert role/content dicts to LangChain message format"""
+    langchain_messages = []
+    for msg in messages:
+        if msg["role"] == "user":
+            langchain_messages.append(HumanMessage(content=msg["content"]))
+        elif msg["role"] == "assistant":
+            langchain_messages.append(AIMessage(content=msg["content"]))
+    return langchain_messages
+
+
+def _content_text(content: Any) -> str:
+    """Text of a message's content, which Anthropic may send as content blocks"""
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block.get("text", "") if isinstance(block, dict) else str(block)
+        for block in content
+    )
+
+
 def process_message(messages: List[Dict[str, str]]) -> tuple[str, str]:
     """
     Process a conversation through the LangGraph system
@@ -222,17 +263,9 @@ def process_message(messages: List[Dict[str, str]]) -> tuple[str, str]:
         tuple: (response_content, agent_type)
     """
     try:
-        # Convert to LangChain message format
-        langchain_messages = []
-        for msg in messages:
-            if msg["role"] == "user":
-                langchain_messages.append(HumanMessage(content=msg["content"]))
-            elif msg["role"] == "assistant":
-                langchain_messages.append(AIMessage(content=msg["content"]))
-
         # Create state for LangGraph
         state = {
-            "messages": langchain_messages,
+            "messages": to_langchain_messages(messages),
             "message_type": None
         }
 
@@ -248,11 +281,62 @@ def process_message(messages: List[Dict[str, str]]) -> tuple[str, str]:
         else:
             return "I'm sorry, I couldn't process that message.", "logical"
             
+    except CircuitOpen:
+        return settings.llm_degraded_response, "logical"
     except Exception as e:
         print(f"Error processing message: {e}")
         return "I'm sorry, something went wrong. Please try again.", "logical"
 
 
+async def stream_message(messages: List[Dict[str, str]]) -> AsyncIterator[Dict[str, str]]:
+    """
+    Process a conversation through the LangGraph system, yielding events as they happen
+
+    Args:
+        messages: List of message dicts with 'role' and 'content'
+
+    Yields:
+        {"type": "routing", "agent_type": ...} once the classifier has decided
+        {"type": "token", "delta": ...} for each piece of the agent's reply
+        {"type": "done", "content": ..., "agent_type": ...} with the full reply, last
+    """
+    state = {
+        "messages": to_langchain_messages(messages),
+        "message_type": None
+    }
+    agent_type = "logical"
+    content = None
+
+    try:
+        async for mode, chunk in conversation_graph.astream(state, stream_mode=["updates", "messages"]):
+            if mode == "messages":
+                message_chunk, metadata = chunk
+                if metadata.get("langgraph_node") in AGENT_NODES:
+                    delta = _content_text(message_chunk.content)
+                    if delta:
+                        yield {"type": "token", "delta": delta}
+                continue
+
+            for node, update in chunk.items():
+                if node == "classifier":
+                    agent_type = update.get("message_type") or "logical"
+                    yield {"type": "routing", "agent_type": agent_type}
+                elif node in AGENT_NODES and update.get("messages"):
+                    content = _content_text(update["messages"][-1].content)
+
+    except CircuitOpen:
+        yield {"type": "done", "content": settings.llm_degraded_response, "agent_type": agent_type}
+        return
+    except Exception as e:
+        print(f"Error streaming message: {e}")
+        yield {"type": "done", "content": "I'm sorry, something went wrong. Please try again.", "agent_type": agent_type}
+        return
+
+    if content is None:
+        content = "I'm sorry, I couldn't process that message."
+    yield {"type": "done", "content": content, "agent_type": agent_type}
+
+
 # Agent type mapping for database storage
 AGENT_TYPE_MAPPING = {
     "emotional": AgentType.EMOTIONAL,
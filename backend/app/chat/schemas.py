@@ -1,5 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 from typing import Optional, List
+from typing_extensions import TypedDict
 from datetime import datetime
 from app.models import AgentType, MessageRole
 
@@ -46,4 +47,68 @@ class ConversationDetail(BaseModel):
     messages: List[ChatMessage]
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class ImportResponse(BaseModel):
+    conversations: int
+    messages: int
+    seconds: float
+    rows_per_second: float
+
+
+class SearchResult(BaseModel):
+    message_id: int
+    conversation_id: int
+    conversation_title: Optional[str]
+    role: MessageRole
+    agent_type: Optional[AgentType] = None
+    snippet: str
+    created_at: Optional[datetime] = None
+    score: float
+
+
+class SearchResponse(BaseModel):
+    results: List[SearchResult]
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= for the next page
+
+
+class SyncMessage(BaseModel):
+    id: int
+    conversation_id: int
+    content: str
+    role: MessageRole
+    agent_type: Optional[AgentType] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class SyncResponse(BaseModel):
+    messages: List[SyncMessage]
+    last_id: int  # Pass back as ?since_id= on the next call
+    has_more: bool
+
+
+class ChatMessageRow(TypedDict):
+    """ChatMessage as a plain dict, so long threads don't need a model instance per message"""
+    content: str
+    role: MessageRole
+    agent_type: Optional[AgentType]
+    created_at: Optional[datetime]
+
+
+class ConversationDetailRow(TypedDict):
+    """ConversationDetail built straight from SQL rows (same JSON shape)"""
+    id: int
+    title: Optional[str]
+    created_at: datetime
+    updated_at: Optional[datetime]
+    messages: List[ChatMessageRow]
+
+
+# Field order of ChatService.get_conversation_message_rows
+CHAT_MESSAGE_ROW_FIELDS = tuple(ChatMessageRow.__annotations__)
+
+CONVERSATION_DETAIL_ADAPTER = TypeAdapter(ConversationDetailRow)
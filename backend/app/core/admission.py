@@ -0,0 +1,90 @@
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from app.core.config import settings
+
+
+class Overloaded(Exception):
+    """Raised when a turn can't be admitted; retry_after is a hint in seconds"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Server busy, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Caps concurrent graph executions in this worker
+
+    Up to max_in_flight turns run at once and up to max_queue more wait (for
+    at most queue_timeout seconds) for a slot. Anything beyond that is
+    rejected immediately, so admitted turns keep predictable latency instead
+    of everyone slowing down together.
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int, queue_timeout: float):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._waits = deque(maxlen=1000)
+        self._turn_seconds = 5.0  # Moving average, used for Retry-After
+
+    def retry_after(self) -> int:
+        """Rough seconds until a slot frees up for a new arrival"""
+        backlog = (self.waiting + 1) / self.max_in_flight
+        return max(1, math.ceil(backlog * self._turn_seconds))
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded(self.retry_after())
+
+        self.waiting += 1
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise Overloaded(self.retry_after())
+        finally:
+            self.waiting -= 1
+            self._waits.append(time.monotonic() - started)
+
+        self.admitted += 1
+        self.in_flight += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+            self._turn_seconds = 0.9 * self._turn_seconds + 0.1 * (time.monotonic() - started)
+
+    def stats(self) -> dict:
+        waits = sorted(self._waits)
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "queue_wait_ms_avg": round(sum(waits) / len(waits) * 1000, 2) if waits else 0.0,
+            "queue_wait_ms_p95": round(waits[int(len(waits) * 0.95)] * 1000, 2) if waits else 0.0
+        }
+
+
+# Global controller for this worker
+admission_controller = AdmissionController(
+    settings.max_inflight_turns, settings.turn_queue_size, settings.turn_queue_timeout_seconds
+)
@@ -1,83 +1,103 @@
-from fastapi import Depends, HTTPException, status
+import asyncio
+from fastapi import Depends, HTTPException, Request, WebSocket, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session
 from app.core.config import settings
-from app.database import get_db
+from app.database import READ_YOUR_WRITES_COOKIE, SessionLocal, get_db, replica_router
 from app.services.chat_service import ChatService
-from app.models import User
-import httpx
+from app.core.user_cache import user_cache, AuthenticatedUser
+from app.core.jwks import JWKSClient, VerifiedTokenCache
 from typing import Optional
-import json
 
 # Security scheme
 security = HTTPBearer(auto_error=False)
 
-# Cache for Clerk JWKS (JSON Web Key Set)
-_jwks_cache = None
-_jwks_cache_time = 0
+# Clerk signing keys, refreshed in the background (see app startup)
+# The Backend API JWKS endpoint needs the secret key; a Frontend API or stub URL doesn't
+jwks_client = JWKSClient(
+    settings.clerk_jwks_url,
+    headers=(
+        {"Authorization": f"Bearer {settings.clerk_secret_key}"}
+        if settings.clerk_jwks_url.startswith("https://api.clerk.com") else None
+    )
+)
+
+# Tokens whose signature has already been checked, kept until they expire
+verified_tokens = VerifiedTokenCache(settings.verified_token_cache_size)
+
+# Algorithms we accept from Clerk
+ALLOWED_ALGORITHMS = ["RS256"]
 
-async def get_clerk_jwks():
-    """Get Clerk's JSON Web Key Set for JWT verification"""
-    global _jwks_cache, _jwks_cache_time
-    import time
-    
-    # Cache JWKS for 1 hour
-    if _jwks_cache and (time.time() - _jwks_cache_time) < 3600:
-        return _jwks_cache
-    
-    try:
-        # Get your Clerk instance URL from your dashboard
-        # It should be something like: https://clerk.your-domain.com or similar
-        # For now, we'll construct it from your secret key
-        clerk_domain = "https://api.clerk.com"  # This is the default API domain
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{clerk_domain}/v1/jwks")
-            _jwks_cache = response.json()
-            _jwks_cache_time = time.time()
-            return _jwks_cache
-    except Exception as e:
-        print(f"Failed to fetch JWKS: {e}")
-        return None
 
+async def verify_clerk_jwt(token: str) -> Optional[dict]:
+    """Verify a Clerk JWT against Clerk's JWKS"""
+    user_data = verified_tokens.get(token)
+    if user_data is not None:
+        return user_data
 
-def verify_clerk_jwt(token: str) -> Optional[dict]:
-    """Verify a Clerk JWT token"""
     try:
-        # For development, we'll implement a simpler verification
-        # In production, you'd verify against Clerk's JWKS
-        
-        # Decode the JWT without verification for now (development only)
-        payload = jwt.get_unverified_claims(token)
+        header = jwt.get_unverified_header(token)
+        if header.get("alg") not in ALLOWED_ALGORITHMS:
+            return None
+
+        key = await jwks_client.get_key(header.get("kid"))
+        if key is None:
+            print(f"JWT verification failed: unknown signing key {header.get('kid')}")
+            return None
+
+        payload = jwt.decode(
+            token,
+            key,
+            algorithms=ALLOWED_ALGORITHMS,
+            issuer=settings.clerk_issuer,
+            options={"verify_aud": False}  # Clerk session tokens carry azp, not aud
+        )
         
         # Basic validation
         if not payload.get("sub"):  # subject (user ID)
             return None
             
-        return {
+        user_data = {
             "user_id": payload.get("sub"),
             "email": payload.get("email"),
             "email_verified": payload.get("email_verified", False)
         }
+        if payload.get("exp"):
+            verified_tokens.set(token, user_data, float(payload["exp"]))
+        return user_data
         
     except JWTError as e:
         print(f"JWT verification failed: {e}")
         return None
 
 
+def resolve_user(db: Session, clerk_user_id: str, email: str) -> AuthenticatedUser:
+    """Map a Clerk user to our user record, skipping the database on a cache hit"""
+    user = user_cache.get(clerk_user_id)
+    if user is None:
+        db_user = ChatService(db).upsert_user(clerk_user_id, email)
+        user = AuthenticatedUser(
+            id=db_user.id,
+            clerk_user_id=db_user.clerk_user_id,
+            email=db_user.email,
+            created_at=db_user.created_at
+        )
+        user_cache.set(user)
+    db.info["user_id"] = user.id  # Attribute this request's writes to the user
+    return user
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
-) -> User:
+) -> AuthenticatedUser:
     """Get the current authenticated user"""
     
     # For development/testing, allow requests without auth
     if not credentials and settings.debug:
         # Return a test user for development
-        service = ChatService(db)
-        user = service.get_or_create_user("dev_user_123", "dev@example.com")
-        return user
+        return resolve_user(db, "dev_user_123", "dev@example.com")
     
     if not credentials:
         raise HTTPException(
@@ -87,7 +107,7 @@ async def get_current_user(
         )
 
     # Verify the JWT token
-    user_data = verify_clerk_jwt(credentials.credentials)
+    user_data = await verify_clerk_jwt(credentials.credentials)
     if not user_data:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -96,16 +116,48 @@ async def get_current_user(
         )
 
     # Get or create user in our database
-    service = ChatService(db)
-    user = service.get_or_create_user(
-        clerk_user_id=user_data["user_id"],
-        email=user_data["email"]
-    )
-    
-    return user
+    return resolve_user(db, user_data["user_id"], user_data["email"])
+
+
+async def authenticate_websocket(websocket: WebSocket) -> Optional[AuthenticatedUser]:
+    """
+    Authenticate a WebSocket connection once, before it is accepted
+
+    Browsers can't set headers on a WebSocket, so the token may also be passed
+    in the `token` query parameter.
+    """
+    token = websocket.query_params.get("token")
+    authorization = websocket.headers.get("authorization", "")
+    if not token and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+
+    db = SessionLocal()
+    try:
+        # resolve_user may query the database, which would block the event loop
+        if not token:
+            # Same development fallback as get_current_user
+            if not settings.debug:
+                return None
+            return await asyncio.to_thread(resolve_user, db, "dev_user_123", "dev@example.com")
+
+        user_data = await verify_clerk_jwt(token)
+        if not user_data:
+            return None
+        return await asyncio.to_thread(resolve_user, db, user_data["user_id"], user_data["email"])
+    finally:
+        db.close()
 
 
 # Convenience function to get just the user ID
-async def get_current_user_id(user: User = Depends(get_current_user)) -> int:
+async def get_current_user_id(user: AuthenticatedUser = Depends(get_current_user)) -> int:
     """Get the current user's ID"""
-    return user.id
\ No newline at end of file
+    return user.id
+
+
+def get_read_db(request: Request, user_id: int = Depends(get_current_user_id)):
+    """Session for read-only endpoints, served by a replica when configured"""
+    db = replica_router.read_session(user_id, request.cookies.get(READ_YOUR_WRITES_COOKIE))
+    try:
+        yield db
+    finally:
+        db.close()
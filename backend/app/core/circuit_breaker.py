@@ -0,0 +1,117 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterator
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a dependency the breaker considers down"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Circuit open, retry after {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Fails fast while a dependency is erroring or too slow
+
+    Closed: calls go through and their outcomes fill a sliding window. Once
+    the window holds min_calls and the share of failed calls (exceptions, or
+    calls slower than slow_call_seconds) reaches failure_rate, it opens.
+    Open: calls raise CircuitOpen straight away for open_seconds.
+    Half-open: up to probe_calls calls go through; if they all succeed the
+    breaker closes, if any fails it opens again.
+
+    Calls may come from worker threads (graph nodes), so state is locked.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, window_size: int, min_calls: int, failure_rate: float,
+                 slow_call_seconds: float, open_seconds: float, probe_calls: int = 1):
+        self.window_size = window_size
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.probe_calls = probe_calls
+        self.state = self.CLOSED
+        self.opened = 0
+        self.rejected = 0
+        self._outcomes = deque(maxlen=window_size)  # (failed, seconds)
+        self._opened_at = 0.0
+        self._probes_started = 0
+        self._probes_passed = 0
+        self._lock = threading.Lock()
+
+    def _allow(self) -> None:
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = self._opened_at + self.open_seconds - time.monotonic()
+                if remaining > 0:
+                    self.rejected += 1
+                    raise CircuitOpen(remaining)
+                self.state = self.HALF_OPEN
+                self._probes_started = self._probes_passed = 0
+            if self.state == self.HALF_OPEN:
+                if self._probes_started >= self.probe_calls:
+                    self.rejected += 1
+                    raise CircuitOpen(self.open_seconds)
+                self._probes_started += 1
+
+    def _record(self, failed: bool, seconds: float) -> None:
+        failed = failed or seconds > self.slow_call_seconds
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                if failed:
+                    self._open()
+                else:
+                    self._probes_passed += 1
+                    if self._probes_passed >= self.probe_calls:
+                        self.state = self.CLOSED
+                        self._outcomes.clear()
+                return
+            if self.state == self.OPEN:
+                return  # A call that started before the breaker opened
+
+            self._outcomes.append((failed, seconds))
+            if len(self._outcomes) >= self.min_calls and self._failure_rate() >= self.failure_rate:
+                self._open()
+
+    def _open(self) -> None:
+        self.state = self.OPEN
+        self.opened += 1
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+
+    def _failure_rate(self) -> float:
+        return sum(failed for failed, _ in self._outcomes) / len(self._outcomes) if self._outcomes else 0.0
+
+    @contextmanager
+    def call(self) -> Iterator[None]:
+        """Guard one call: raises CircuitOpen instead of running it while open"""
+        self._allow()
+        started = time.monotonic()
+        try:
+            yield
+        except BaseException:
+            self._record(True, time.monotonic() - started)
+            raise
+        self._record(False, time.monotonic() - started)
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = sorted(seconds for _, seconds in self._outcomes)
+            return {
+                "state": self.state,
+                "calls_in_window": len(self._outcomes),
+                "failure_rate": round(self._failure_rate(), 3),
+                "latency_ms_p50": round(latencies[len(latencies) // 2] * 1000, 1) if latencies else 0.0,
+                "latency_ms_p95": round(latencies[int(len(latencies) * 0.95)] * 1000, 1) if latencies else 0.0,
+                "opened": self.opened,
+                "rejected": self.rejected
+            }
@@ -5,17 +5,80 @@ from typing import Optional
 class Settings(BaseSettings):
     # Database
     database_url: str
+    database_replica_urls: str = ""  # Comma-separated read replica URLs
+    read_your_writes_seconds: float = 5.0  # Pin a user's reads to the primary after a write
     
     # Clerk
     clerk_secret_key: str
     clerk_webhook_secret: str
+    clerk_jwks_url: str = "https://api.clerk.com/v1/jwks"
+    clerk_issuer: Optional[str] = None  # e.g. https://<your-instance>.clerk.accounts.dev
+    verified_token_cache_size: int = 10000
+    webhook_batch_size: int = 100  # Events applied per batch by the webhook worker
+    webhook_poll_seconds: float = 5.0
+    webhook_retention_days: int = 7  # Processed events (and their svix-ids for dedup) are kept this long
     
     # Anthropic
     anthropic_api_key: str
+
+    # Circuit breaker shared by every LLM call in the graph
+    llm_breaker_window: int = 20  # Most recent calls considered
+    llm_breaker_min_calls: int = 5
+    llm_breaker_failure_rate: float = 0.5  # Share of failed or slow calls that opens the circuit
+    llm_breaker_slow_call_seconds: float = 30.0
+    llm_breaker_open_seconds: float = 30.0  # Before a probe call is let through
+    llm_degraded_response: str = (
+        "I'm having trouble reaching my AI service right now. Please try again in a minute."
+    )
     
     # Application
     debug: bool = True
     environment: str = "development"
+    json_backend: str = "pydantic"  # Response encoder: "pydantic", "orjson" or "msgspec"
+
+    # Authenticated user cache (clerk_user_id -> user record)
+    user_cache_size: int = 10000
+    user_cache_ttl_seconds: float = 300  # Bounds staleness on other workers when event_bus isn't shared
+
+    # Cross-worker event bus for cache invalidations and WebSocket events:
+    # "memory" (single worker), "postgres" (LISTEN/NOTIFY) or "redis" (pub/sub).
+    # event_bus_url defaults to database_url or redis_url respectively.
+    event_bus: str = "memory"
+    event_bus_url: Optional[str] = None
+
+    # Worker processes serving the app (WEB_CONCURRENCY, as read by uvicorn and gunicorn)
+    web_concurrency: int = 1
+
+    # Conversation history cache: "memory" (per worker, single-worker deployments only)
+    # or "redis" (shared); unset picks redis when web_concurrency > 1
+    history_cache_backend: Optional[str] = None
+    history_cache_size: int = 1000
+    history_cache_ttl_seconds: int = 3600
+    redis_url: Optional[str] = None
+
+    # Admission control for chat turns (per worker)
+    max_inflight_turns: int = 8
+    turn_queue_size: int = 32
+    turn_queue_timeout_seconds: float = 10.0
+
+    # Idempotency-Key results for POST /api/chat/send
+    idempotency_ttl_seconds: float = 86400
+    idempotency_cache_size: int = 10000
+    idempotency_lease_seconds: float = 300  # A keyed turn with no reply after this long is run again
+
+    # Background jobs (post-turn work such as titles)
+    job_workers: int = 2
+    job_poll_seconds: float = 5.0
+    job_max_attempts: int = 5
+
+    # Background health checks behind /health (probes only read the cached results)
+    health_check_interval_seconds: float = 30.0
+    health_check_timeout_seconds: float = 5.0
+    health_check_llm: bool = True  # Also check that the Anthropic API accepts our key
+
+    # Cold storage for inactive conversations
+    archive_dir: str = "archive"
+    archive_after_days: int = 180
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,37 @@
+import hashlib
+from typing import Optional
+from fastapi import Response
+from app.core.config import settings
+
+
+def make_etag(*parts) -> str:
+    """
+    Strong ETag from version parts
+
+    The JSON backend is part of the hash, so the same version encoded by a
+    worker on another backend (different bytes) never shares a validator.
+    """
+    digest = hashlib.sha256("|".join(str(part) for part in (settings.json_backend, *parts)).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header covers the current ETag (weak comparison, as RFC 9110 asks for)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in tags
+
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    # Let clients keep a copy but revalidate it on every use
+    response.headers["Cache-Control"] = "private, no-cache"
+
+
+def not_modified(etag: str) -> Response:
+    response = Response(status_code=304)
+    set_etag(response, etag)
+    return response
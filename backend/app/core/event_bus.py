@@ -0,0 +1,322 @@
+"""
+Cross-worker event bus for real-time WebSocket events
+
+Each uvicorn worker only holds its own sockets, so events are published to a
+bus and every worker (the publisher included) fans them out to its local
+subscribers. Pick the implementation with the event_bus setting (EVENT_BUS):
+
+    memory    single process only (default)
+    postgres  LISTEN/NOTIFY on EVENT_BUS_URL or DATABASE_URL
+    redis     Redis pub/sub on EVENT_BUS_URL or REDIS_URL
+"""
+import abc
+import asyncio
+import json
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+from app.core.config import settings
+
+# Called with (topics, message) for every event received from the bus
+EventHandler = Callable[[List[str], str], Awaitable[None]]
+
+# Backoff between attempts to get a lost bus connection back
+RECONNECT_MIN_SECONDS = 1.0
+RECONNECT_MAX_SECONDS = 30.0
+
+
+class EventBus(abc.ABC):
+    """
+    Interface for event buses
+
+    Events published while a worker is reconnecting are not replayed to it;
+    the bus carries live updates, the store is the source of truth.
+    """
+
+    def __init__(self):
+        self._tasks: Set[asyncio.Task] = set()
+
+    @abc.abstractmethod
+    async def start(self, handler: EventHandler) -> None:
+        """Start delivering events from every worker to handler"""
+
+    @abc.abstractmethod
+    async def publish(self, topics: List[str], message: str) -> None:
+        """Publish a message to the given topics on every worker"""
+
+    async def close(self) -> None:
+        pass
+
+    def _spawn(self, coro: Awaitable[None]) -> None:
+        """Run a handler call in the background, keeping a reference until it's done"""
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+
+    def _task_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"❌ Event handler failed: {task.exception()!r}")
+
+    @staticmethod
+    def _encode(topics: List[str], message: str) -> str:
+        return json.dumps({"topics": topics, "message": message})
+
+    @staticmethod
+    def _decode(payload: str) -> tuple:
+        event = json.loads(payload)
+        return event["topics"], event["message"]
+
+
+class InMemoryEventBus(EventBus):
+    """Delivers straight to this process's handler"""
+
+    def __init__(self):
+        super().__init__()
+        self._handler: Optional[EventHandler] = None
+
+    async def start(self, handler: EventHandler) -> None:
+        self._handler = handler
+
+    async def publish(self, topics: List[str], message: str) -> None:
+        if self._handler is not None:
+            await self._handler(topics, message)
+
+
+class PostgresEventBus(EventBus):
+    """
+    LISTEN/NOTIFY on a dedicated connection per worker
+
+    NOTIFY payloads are limited to 8000 bytes, so larger events are split into
+    chunks that are sent in one transaction and reassembled by the listeners.
+    A lost listening connection is reopened in the background with backoff;
+    TCP keepalives make a silently dropped one show up as an error.
+    """
+
+    # Leaves room for the chunk header within the 8000 byte limit
+    CHUNK_SIZE = 7000
+
+    def __init__(self, dsn: str, channel: str = "chat_events"):
+        super().__init__()
+        try:
+            import psycopg2
+        except ImportError as e:
+            raise RuntimeError("The postgres event bus requires the 'psycopg2' package") from e
+
+        self._psycopg2 = psycopg2
+        # psycopg2 doesn't understand SQLAlchemy's driver suffix
+        self.dsn = dsn.replace("postgresql+psycopg2://", "postgresql://")
+        self.channel = channel
+        self._listen_conn = None
+        self._listen_fd: Optional[int] = None
+        self._publish_conn = None
+        self._handler: Optional[EventHandler] = None
+        self._partial: Dict[str, List[Optional[str]]] = {}
+        self._lost = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def _connect(self):
+        return self._psycopg2.connect(
+            self.dsn, keepalives=1, keepalives_idle=30, keepalives_interval=10, keepalives_count=3
+        )
+
+    def _listen(self) -> None:
+        """Open the listening connection (blocking)"""
+        conn = self._connect()
+        conn.set_session(autocommit=True)
+        with conn.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.channel}"')
+        self._listen_conn = conn
+
+    async def start(self, handler: EventHandler) -> None:
+        self._handler = handler
+        await asyncio.to_thread(self._listen)
+        self._watch()
+        self._task = asyncio.create_task(self._reconnect_when_lost())
+
+    def _watch(self) -> None:
+        # Woken by the event loop whenever the server sends a notification
+        self._listen_fd = self._listen_conn.fileno()
+        asyncio.get_running_loop().add_reader(self._listen_fd, self._on_readable)
+
+    def _unwatch(self) -> None:
+        if self._listen_fd is not None:
+            asyncio.get_running_loop().remove_reader(self._listen_fd)
+            self._listen_fd = None
+
+    async def _reconnect_when_lost(self) -> None:
+        delay = RECONNECT_MIN_SECONDS
+        connected_at = time.monotonic()
+        while True:
+            await self._lost.wait()
+            self._lost.clear()
+            self._unwatch()
+            self._listen_conn.close()
+            self._listen_conn = None
+            self._partial.clear()  # The rest of a chunked event won't arrive now
+            if time.monotonic() - connected_at > RECONNECT_MAX_SECONDS:
+                delay = RECONNECT_MIN_SECONDS  # It had been stable; don't carry the old backoff over
+
+            while self._listen_conn is None:
+                print(f"⚠️ Event bus reconnecting in {delay:.0f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+                try:
+                    await asyncio.to_thread(self._listen)
+                except Exception as e:
+                    print(f"❌ Event bus reconnect failed: {e}")
+            self._watch()
+            connected_at = time.monotonic()
+            print("✅ Event bus reconnected")
+
+    def _on_readable(self) -> None:
+        try:
+            self._listen_conn.poll()
+        except Exception as e:
+            print(f"❌ Event bus connection lost: {e}")
+            self._unwatch()
+            self._lost.set()
+            return
+
+        while self._listen_conn.notifies:
+            notify = self._listen_conn.notifies.pop(0)
+            try:
+                payload = self._reassemble(notify.payload)
+                if payload is not None:
+                    topics, message = self._decode(payload)
+                    self._spawn(self._handler(topics, message))
+            except Exception as e:
+                print(f"❌ Bad event bus message: {e}")
+
+    def _reassemble(self, payload: str) -> Optional[str]:
+        if not payload.startswith("#"):
+            return payload
+        # Chunk format: "#<event id>:<index>:<count>:<data>"
+        event_id, index, count, data = payload[1:].split(":", 3)
+        chunks = self._partial.setdefault(event_id, [None] * int(count))
+        chunks[int(index)] = data
+        if any(chunk is None for chunk in chunks):
+            return None
+        del self._partial[event_id]
+        return "".join(chunks)
+
+    def _notify(self, payload: str) -> None:
+        if self._publish_conn is None or self._publish_conn.closed:
+            self._publish_conn = self._connect()
+
+        if len(payload.encode()) <= self.CHUNK_SIZE:
+            parts = [payload]
+        else:
+            event_id = uuid.uuid4().hex
+            pieces = [payload[i:i + self.CHUNK_SIZE // 4] for i in range(0, len(payload), self.CHUNK_SIZE // 4)]
+            parts = [f"#{event_id}:{i}:{len(pieces)}:{piece}" for i, piece in enumerate(pieces)]
+
+        try:
+            with self._publish_conn.cursor() as cursor:
+                for part in parts:
+                    cursor.execute("SELECT pg_notify(%s, %s)", (self.channel, part))
+            self._publish_conn.commit()
+        except Exception:
+            # Reconnected on the next publish
+            self._publish_conn.close()
+            raise
+
+    async def publish(self, topics: List[str], message: str) -> None:
+        # psycopg2 is blocking, so keep the NOTIFY off the event loop
+        await asyncio.to_thread(self._notify, self._encode(topics, message))
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._unwatch()
+        if self._listen_conn is not None:
+            self._listen_conn.close()
+            self._listen_conn = None
+        if self._publish_conn is not None:
+            self._publish_conn.close()
+            self._publish_conn = None
+
+
+class RedisEventBus(EventBus):
+    """
+    Redis pub/sub on one channel shared by all workers
+
+    A lost subscription is re-established in the background with backoff.
+    """
+
+    def __init__(self, url: str, channel: str = "chat_events"):
+        super().__init__()
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("The redis event bus requires the 'redis' package") from e
+
+        self.client = redis.Redis.from_url(url, health_check_interval=30)
+        self.channel = channel
+        self._pubsub = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _subscribe(self) -> None:
+        self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(self.channel)
+
+    async def _unsubscribe(self) -> None:
+        if self._pubsub is not None:
+            pubsub, self._pubsub = self._pubsub, None
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass  # Already broken
+
+    async def start(self, handler: EventHandler) -> None:
+        await self._subscribe()
+        self._task = asyncio.create_task(self._listen(handler))
+
+    async def _listen(self, handler: EventHandler) -> None:
+        delay = RECONNECT_MIN_SECONDS
+        while True:
+            try:
+                if self._pubsub is None:
+                    await self._subscribe()
+                    print("✅ Event bus reconnected")
+                async for item in self._pubsub.listen():
+                    delay = RECONNECT_MIN_SECONDS
+                    try:
+                        topics, message = self._decode(item["data"])
+                        await handler(topics, message)
+                    except Exception as e:
+                        print(f"❌ Bad event bus message: {e}")
+                raise ConnectionError("subscription ended")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Event bus connection lost, reconnecting in {delay:.0f}s: {e}")
+                await self._unsubscribe()
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+
+    async def publish(self, topics: List[str], message: str) -> None:
+        await self.client.publish(self.channel, self._encode(topics, message))
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self._unsubscribe()
+        await self.client.aclose()
+
+
+def create_event_bus(backend: str = settings.event_bus, url: Optional[str] = settings.event_bus_url) -> EventBus:
+    """Build the event bus selected by the event_bus setting"""
+    if backend == "postgres":
+        url = url or settings.database_url
+        return PostgresEventBus(url)
+    if backend == "redis":
+        url = url or settings.redis_url
+        if not url:
+            raise RuntimeError("EVENT_BUS=redis requires EVENT_BUS_URL or REDIS_URL")
+        return RedisEventBus(url)
+    if backend != "memory":
+        raise RuntimeError(f"Unknown event_bus: {backend}")
+    return InMemoryEventBus()
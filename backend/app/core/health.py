@@ -0,0 +1,117 @@
+"""
+Cached health checks for liveness and readiness probes
+
+Probes only read the results of the last refresh. A background task runs the
+deep checks (database ping, LLM reachability) every interval, so a probe does
+no I/O of its own and never spends LLM tokens however often it is polled.
+"""
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional, Set
+from sqlalchemy import text
+
+# Listing models is authenticated but free, unlike sending a prompt
+ANTHROPIC_MODELS_URL = "https://api.anthropic.com/v1/models"
+ANTHROPIC_VERSION = "2023-06-01"
+
+
+def database_check(engine) -> Callable[[], None]:
+    """Check that a connection can be checked out and run a trivial query"""
+    def check() -> None:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    return check
+
+
+def anthropic_check(api_key: str, timeout_seconds: float) -> Callable[[], None]:
+    """Check that the Anthropic API is reachable and accepts the key"""
+    def check() -> None:
+        import httpx
+        response = httpx.get(
+            ANTHROPIC_MODELS_URL,
+            params={"limit": 1},
+            headers={"x-api-key": api_key, "anthropic-version": ANTHROPIC_VERSION},
+            timeout=timeout_seconds
+        )
+        response.raise_for_status()
+    return check
+
+
+class HealthMonitor:
+    """
+    Runs registered checks in the background and serves their last results
+
+    Checks are blocking callables that raise on failure. A required check
+    failing (or not having run yet) makes the process unready; an optional
+    one only marks it degraded.
+    """
+
+    def __init__(self, interval_seconds: float, timeout_seconds: float):
+        self.interval_seconds = interval_seconds
+        self.timeout_seconds = timeout_seconds
+        self.checks: Dict[str, Callable[[], None]] = {}
+        self.required: Set[str] = set()
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def add_check(self, name: str, check: Callable[[], None], required: bool = False) -> None:
+        self.checks[name] = check
+        if required:
+            self.required.add(name)
+
+    async def _run_check(self, name: str, check: Callable[[], None]) -> None:
+        started = time.perf_counter()
+        try:
+            # Checks block on the network, so keep them off the event loop
+            await asyncio.wait_for(asyncio.to_thread(check), timeout=self.timeout_seconds)
+            result = {"status": "ok", "error": None}
+        except asyncio.TimeoutError:
+            result = {"status": "error", "error": f"Timed out after {self.timeout_seconds}s"}
+        except Exception as e:
+            result = {"status": "error", "error": str(e) or type(e).__name__}
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        result["checked_at"] = datetime.now(timezone.utc).isoformat()
+        self.results[name] = result
+
+    async def refresh(self) -> None:
+        """Run every check now"""
+        await asyncio.gather(*(self._run_check(name, check) for name, check in self.checks.items()))
+
+    async def _run(self) -> None:
+        if not self.results:
+            await self.refresh()
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"❌ Health monitor error: {e}")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def is_ok(self, name: str) -> bool:
+        result = self.results.get(name)
+        return result is not None and result["status"] == "ok"
+
+    def ready(self) -> bool:
+        return all(self.is_ok(name) for name in self.required)
+
+    def status(self) -> Dict[str, Any]:
+        """Overall status from the cached results: starting, unhealthy, degraded or healthy"""
+        if any(name not in self.results for name in self.required):
+            status = "starting"
+        elif not self.ready():
+            status = "unhealthy"
+        elif not all(self.is_ok(name) for name in self.checks):
+            status = "degraded"
+        else:
+            status = "healthy"
+        return {"status": status, "checks": dict(self.results)}
@@ -0,0 +1,48 @@
+from typing import Any, Type
+from fastapi.responses import JSONResponse, Response
+from pydantic import TypeAdapter
+from app.core.config import settings
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        import orjson
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+
+
+class MsgspecJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        import msgspec
+        return msgspec.json.encode(content)
+
+
+RESPONSE_CLASSES = {
+    "pydantic": JSONResponse,
+    "orjson": ORJSONResponse,
+    "msgspec": MsgspecJSONResponse,
+}
+
+
+def get_response_class(backend: str = settings.json_backend) -> Type[JSONResponse]:
+    """Response class for the configured JSON backend (checked once, at startup)"""
+    if backend not in RESPONSE_CLASSES:
+        raise RuntimeError(f"Unknown json_backend: {backend}")
+    if backend != "pydantic":
+        try:
+            __import__(backend)
+        except ImportError as e:
+            raise RuntimeError(f"json_backend={backend} requires the '{backend}' package") from e
+    return RESPONSE_CLASSES[backend]
+
+
+def json_response(value: Any, adapter: TypeAdapter, backend: str = settings.json_backend) -> Response:
+    """
+    Encode data already validated by adapter, skipping FastAPI's response_model pass
+
+    value should be plain data (dicts/TypedDicts, lists, datetimes, enums) so
+    orjson and msgspec can encode it directly; the pydantic backend uses the
+    adapter's serializer instead.
+    """
+    if backend == "pydantic":
+        return Response(adapter.dump_json(value), media_type="application/json")
+    return RESPONSE_CLASSES[backend](value)
@@ -0,0 +1,149 @@
+import asyncio
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import httpx
+from jose import jwk
+from jose.backends.base import Key
+from jose.exceptions import JWKError
+
+# How long to keep keys when the JWKS response has no Cache-Control max-age
+DEFAULT_JWKS_TTL_SECONDS = 3600
+
+# Refresh this long before the keys expire
+JWKS_REFRESH_MARGIN_SECONDS = 300
+
+# Minimum gap between refetches triggered by unknown kids
+JWKS_MIN_REFETCH_SECONDS = 30
+
+
+class JWKSClient:
+    """
+    Parsed, kid-indexed signing keys from a JWKS endpoint
+
+    Keys are parsed once per fetch rather than per request. A background task
+    refreshes them before they expire, an unknown kid triggers a (rate-limited)
+    refetch, and concurrent refreshes share a single in-flight request.
+    """
+
+    def __init__(self, url: str, headers: Optional[Dict[str, str]] = None):
+        self.url = url
+        self.headers = headers or {}
+        self._keys: Dict[str, Key] = {}
+        self._ttl = DEFAULT_JWKS_TTL_SECONDS
+        self._fetched_at = 0.0
+        self._last_attempt: Optional[float] = None
+        self._inflight: Optional[asyncio.Future] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # One pooled client for the lifetime of the app
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=10)
+        return self._client
+
+    async def _fetch(self) -> None:
+        self._last_attempt = time.monotonic()
+        response = await self._get_client().get(self.url, headers=self.headers)
+        response.raise_for_status()
+
+        keys = {}
+        for key_data in response.json().get("keys", []):
+            kid = key_data.get("kid")
+            if not kid or key_data.get("use", "sig") != "sig":
+                continue
+            try:
+                keys[kid] = jwk.construct(key_data, key_data.get("alg", "RS256"))
+            except JWKError as e:
+                print(f"⚠️ Skipping unusable JWKS key {kid}: {e}")
+
+        max_age = re.search(r"max-age=(\d+)", response.headers.get("cache-control", ""))
+        self._ttl = int(max_age.group(1)) if max_age else DEFAULT_JWKS_TTL_SECONDS
+        self._keys = keys
+        self._fetched_at = time.monotonic()
+
+    async def refresh(self) -> None:
+        """Refetch the key set, joining a fetch that is already in flight"""
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._fetch())
+            self._inflight.add_done_callback(lambda _: setattr(self, "_inflight", None))
+        # Shielded so one cancelled caller doesn't cancel the fetch for everyone
+        await asyncio.shield(self._inflight)
+
+    async def get_key(self, kid: Optional[str]) -> Optional[Key]:
+        """Get the verification key for a kid, refetching once if it's unknown"""
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+
+        # Unknown kid: the keys may have rotated. Rate-limited so bogus kids
+        # can't turn every request into a JWKS fetch.
+        if self._last_attempt is None or time.monotonic() - self._last_attempt >= JWKS_MIN_REFETCH_SECONDS:
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"Failed to fetch JWKS: {e}")
+        return self._keys.get(kid)
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            if self._fetched_at:
+                expires_in = self._fetched_at + self._ttl - time.monotonic()
+                await asyncio.sleep(max(expires_in - JWKS_REFRESH_MARGIN_SECONDS, JWKS_MIN_REFETCH_SECONDS))
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"Background JWKS refresh failed: {e}")
+                await asyncio.sleep(JWKS_MIN_REFETCH_SECONDS)
+
+    def start(self) -> None:
+        """Start refreshing keys in the background (call from app startup)"""
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def close(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class VerifiedTokenCache:
+    """Bounded cache of already-verified tokens, each kept until its exp"""
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._entries: "OrderedDict[bytes, Tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, token: str, claims: dict, expires_at: float) -> None:
+        if self.max_size <= 0:
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (expires_at, claims)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
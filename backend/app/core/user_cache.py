@@ -0,0 +1,106 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Tuple
+from app.core.config import settings
+
+# Event bus topic carrying the clerk_user_id of a user to drop from every worker's cache
+INVALIDATE_TOPIC = "user_cache:invalidate"
+
+
+class AuthenticatedUser(NamedTuple):
+    """Lightweight stand-in for the User row, enough for request handlers"""
+    id: int
+    clerk_user_id: str
+    email: str
+    created_at: Optional[datetime]
+
+
+class UserCache:
+    """
+    TTL-bounded LRU cache of clerk_user_id -> AuthenticatedUser
+
+    Once start() has been given an event bus, invalidations are published to
+    every worker; without one they only reach this process and other workers
+    catch up when their entries expire.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 300):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, AuthenticatedUser]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bus = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, clerk_user_id: str) -> Optional[AuthenticatedUser]:
+        with self._lock:
+            entry = self._entries.get(clerk_user_id)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[clerk_user_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(clerk_user_id)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, user: AuthenticatedUser) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[user.clerk_user_id] = (time.monotonic() + self.ttl_seconds, user)
+            self._entries.move_to_end(user.clerk_user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, clerk_user_id: str) -> None:
+        """Drop a user here and, with an event bus, on every other worker"""
+        self._evict(clerk_user_id)
+        if self._bus is not None:
+            # Callers run in worker threads; the bus belongs to the event loop
+            future = asyncio.run_coroutine_threadsafe(
+                self._bus.publish([INVALIDATE_TOPIC], clerk_user_id), self._loop
+            )
+            future.add_done_callback(self._published)
+
+    def _evict(self, clerk_user_id: str) -> None:
+        with self._lock:
+            self._entries.pop(clerk_user_id, None)
+
+    @staticmethod
+    def _published(future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            print(f"⚠️ Could not publish user cache invalidation: {future.exception()}")
+
+    async def _on_event(self, topics: List[str], message: str) -> None:
+        if INVALIDATE_TOPIC in topics:
+            self._evict(message)
+
+    async def start(self, bus) -> None:
+        """Exchange invalidations with the other workers over an app.core.event_bus.EventBus"""
+        self._loop = asyncio.get_running_loop()
+        await bus.start(self._on_event)
+        self._bus = bus
+
+    async def stop(self) -> None:
+        if self._bus is not None:
+            bus, self._bus = self._bus, None
+            await bus.close()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+# Global cache instance
+user_cache = UserCache(settings.user_cache_size, settings.user_cache_ttl_seconds)
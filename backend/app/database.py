@@ -1,6 +1,14 @@
-from sqlalchemy import create_engine
+import itertools
+import re
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+from sqlalchemy import create_engine, event, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.elements import TextClause
 from app.core.config import settings
 
 # Create database engine
@@ -9,17 +17,161 @@ engine = create_engine(
     echo=settings.debug  # Log SQL queries in debug mode
 )
 
+# Read replicas (optional, comma-separated DATABASE_REPLICA_URLS)
+replica_engines = [
+    create_engine(url.strip(), echo=settings.debug)
+    for url in settings.database_replica_urls.split(",") if url.strip()
+]
+
+
+# Raw SQL that can run on a replica: a plain SELECT, without row locks
+_READ_ONLY_SQL = re.compile(r"\A\s*(?:--[^\n]*\n\s*)*SELECT\b", re.IGNORECASE)
+_LOCKING_SQL = re.compile(r"\bFOR\s+(?:NO\s+KEY\s+)?(?:UPDATE|SHARE|KEY\s+SHARE)\b", re.IGNORECASE)
+
+
+def _is_write(clause) -> bool:
+    if isinstance(clause, UpdateBase):
+        return True
+    if isinstance(clause, TextClause):
+        # text() can hold anything, so only a recognisable read may use a replica
+        return not _READ_ONLY_SQL.match(clause.text) or bool(_LOCKING_SQL.search(clause.text))
+    return False
+
+
+class RoutingSession(Session):
+    """
+    Session that reads from a replica when one is assigned via info["replica"]
+
+    Flushes, INSERT/UPDATE/DELETE statements and raw text() SQL other than a
+    plain SELECT always go to the primary, and once a session has written (or
+    use_primary() was called), its later reads stick to the primary too.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if _is_write(clause):
+            self.info["wrote"] = True
+        replica = self.info.get("replica")
+        if replica is not None and not self.info.get("wrote") and not self.info.get("primary"):
+            return replica
+        return engine
+
+    def use_primary(self) -> None:
+        """Send the rest of this session's reads to the primary, e.g. ahead of a read-modify-write"""
+        self.info["primary"] = True
+
+
+@event.listens_for(RoutingSession, "before_flush")
+def _route_flush_to_primary(session, flush_context, instances):
+    # Fires before the flush asks for a bind, and only when there is something to write
+    session.info["wrote"] = True
+
+
 # Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=engine)
 
 # Base class for models
 Base = declarative_base()
 
 
+# Cookie carrying the time of the client's last write, so every worker honours the window
+READ_YOUR_WRITES_COOKIE = "last_write_at"
+
+# Set per request by the HTTP middleware; collects the time of any write it commits
+_request_writes: ContextVar[Optional[Dict[str, Any]]] = ContextVar("request_writes", default=None)
+
+
+class ReplicaRouter:
+    """
+    Round-robin replica selection with a read-your-writes window per user
+
+    Writes are remembered in this process and, for HTTP clients, in the
+    READ_YOUR_WRITES_COOKIE cookie, so a read served by another worker also
+    goes to the primary until the window has passed.
+    """
+
+    def __init__(self, engines: List, window_seconds: float):
+        self.engines = engines
+        self.window_seconds = window_seconds
+        self._cycle = itertools.cycle(engines) if engines else None
+        self._last_write: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def track_request(self) -> Dict[str, Any]:
+        """Start collecting this request's writes; "at" is set if it commits one"""
+        writes: Dict[str, Any] = {}
+        _request_writes.set(writes)
+        return writes
+
+    def record_write(self, user_id: int) -> None:
+        writes = _request_writes.get()
+        if writes is not None:
+            writes["at"] = time.time()
+        now = time.monotonic()
+        with self._lock:
+            self._last_write[user_id] = now
+            # Keep the map bounded by dropping users whose window has passed
+            if len(self._last_write) > 10000:
+                cutoff = now - self.window_seconds
+                self._last_write = {uid: t for uid, t in self._last_write.items() if t > cutoff}
+
+    def recently_wrote(self, user_id: Optional[int], last_write_at: Optional[str] = None) -> bool:
+        """
+        Args:
+            user_id: User to check in this process's record of writes
+            last_write_at: READ_YOUR_WRITES_COOKIE value sent by the client, if any
+        """
+        if last_write_at:
+            try:
+                if 0 <= time.time() - float(last_write_at) < self.window_seconds:
+                    return True
+            except ValueError:
+                pass
+        last_write = self._last_write.get(user_id)
+        return last_write is not None and time.monotonic() - last_write < self.window_seconds
+
+    def read_session(self, user_id: Optional[int] = None, last_write_at: Optional[str] = None) -> Session:
+        """Session for read-only work, on a replica unless the user just wrote"""
+        db = SessionLocal()
+        db.info["user_id"] = user_id
+        if self._cycle and not self.recently_wrote(user_id, last_write_at):
+            with self._lock:
+                db.info["replica"] = next(self._cycle)
+        return db
+
+
+replica_router = ReplicaRouter(replica_engines, settings.read_your_writes_seconds)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _record_user_write(session):
+    """Start the user's read-your-writes window after a committed write"""
+    if session.info.get("wrote") and session.info.get("user_id") is not None:
+        replica_router.record_write(session.info["user_id"])
+
+
+def init_db():
+    """Create any tables, nullable columns and indexes that don't exist yet (existing ones are left alone)"""
+    import app.models  # noqa: F401 - registers the models on Base
+    Base.metadata.create_all(bind=engine)
+
+    # create_all skips tables that already exist, so add newer columns and indexes here
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
 # Dependency to get database session
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
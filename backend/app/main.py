@@ -1,10 +1,23 @@
-from fastapi import FastAPI, Depends, HTTPException
+import asyncio
+import math
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import READ_YOUR_WRITES_COOKIE, engine, init_db, replica_router
 from app.core.config import settings
+from app.core.health import HealthMonitor, anthropic_check, database_check
+from app.core.json_response import get_response_class
 from app.api import chat, auth
+from app.chat.agents import llm_breaker
+from app.services.search_service import ensure_search_index
+from app.services.history_cache import history_cache
+from app.core.user_cache import user_cache
+from app.core.auth import jwks_client
+from app.core.admission import admission_controller
+from app.services.webhook_service import webhook_worker
+from app.services.job_service import job_worker
+from app.services.idempotency import idempotency_store
+from app.core.event_bus import InMemoryEventBus, create_event_bus
 
 # Create FastAPI application
 app = FastAPI(
@@ -12,7 +25,8 @@ app = FastAPI(
     description="Multi-agent AI conversation platform with authentication",
     version="1.0.0",
     docs_url="/docs" if settings.debug else None,
-    redoc_url="/redoc" if settings.debug else None
+    redoc_url="/redoc" if settings.debug else None,
+    default_response_class=get_response_class()
 )
 
 # Configure CORS for frontend
@@ -24,10 +38,71 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def read_your_writes_cookie(request: Request, call_next):
+    """Stamp responses to requests that wrote, so other workers keep the client's reads on the primary"""
+    writes = replica_router.track_request()
+    response = await call_next(request)
+    if "at" in writes and replica_router.engines:
+        response.set_cookie(
+            READ_YOUR_WRITES_COOKIE,
+            repr(writes["at"]),
+            max_age=math.ceil(replica_router.window_seconds),
+            httponly=True,
+            samesite="lax"
+        )
+    return response
+
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["authentication"])
 app.include_router(chat.router, prefix="/api/chat", tags=["chat"])
 
+# Deep checks run in the background; the probe endpoints only read their results
+health_monitor = HealthMonitor(settings.health_check_interval_seconds, settings.health_check_timeout_seconds)
+health_monitor.add_check("database", database_check(engine), required=True)
+if settings.health_check_llm:
+    health_monitor.add_check("llm", anthropic_check(settings.anthropic_api_key, settings.health_check_timeout_seconds))
+
+
+@app.on_event("startup")
+async def startup_event():
+    """Set up database extras outside the ORM models and background tasks"""
+    try:
+        init_db()
+    except Exception as e:
+        print(f"⚠️ Could not create missing tables: {e}")
+
+    try:
+        ensure_search_index(engine)
+    except Exception as e:
+        print(f"⚠️ Could not set up the message search index: {e}")
+
+    # User deletions and updates are applied by whichever worker claims the webhook
+    try:
+        event_bus = create_event_bus(settings.event_bus, settings.event_bus_url)
+        await user_cache.start(event_bus)
+        if isinstance(event_bus, InMemoryEventBus) and settings.web_concurrency > 1:
+            print(f"⚠️ No shared event_bus: other workers see user changes within {settings.user_cache_ttl_seconds:.0f}s")
+    except Exception as e:
+        print(f"⚠️ Could not start the event bus, user cache invalidations stay local: {e}")
+
+    jwks_client.start()
+    webhook_worker.start()
+    job_worker.start()
+    health_monitor.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background tasks and release pooled clients"""
+    await jwks_client.close()
+    await webhook_worker.stop()
+    await job_worker.stop()
+    await health_monitor.stop()
+    await user_cache.stop()
+
 
 @app.get("/")
 async def root():
@@ -36,19 +111,52 @@ async def root():
 
 
 @app.get("/health")
-async def health_check(db: Session = Depends(get_db)):
-    """Detailed health check with database connection"""
-    try:
-        # Test database connection - fix for SQLAlchemy 2.0
-        from sqlalchemy import text
-        db.execute(text("SELECT 1"))
-        return {
-            "status": "healthy",
-            "database": "connected",
-            "environment": settings.environment
-        }
-    except Exception as e:
-        raise HTTPException(status_code=503, detail=f"Database connection failed: {str(e)}")
+async def health_check():
+    """Detailed health from the last background checks (database and LLM)"""
+    return _health_response()
+
+
+@app.get("/health/live")
+async def liveness():
+    """Liveness probe: the process is up and serving requests"""
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+async def readiness():
+    """Readiness probe: 503 until the database check passes"""
+    return _health_response()
+
+
+def _health_response() -> JSONResponse:
+    health = health_monitor.status()
+    health["database"] = "connected" if health_monitor.is_ok("database") else "disconnected"
+    health["llm_circuit"] = llm_breaker.state
+    if health["status"] == "healthy" and llm_breaker.state != llm_breaker.CLOSED:
+        # Still ready: turns get the degraded reply instead of waiting on the LLM
+        health["status"] = "degraded"
+    health["environment"] = settings.environment
+    return JSONResponse(health, status_code=200 if health_monitor.ready() else 503)
+
+
+@app.get("/metrics")
+async def metrics():
+    """In-process cache and queue statistics for this worker"""
+    # Queue depths are counted in the database, so keep those queries off the event loop
+    webhooks, jobs = await asyncio.gather(
+        asyncio.to_thread(webhook_worker.stats),
+        asyncio.to_thread(job_worker.stats)
+    )
+    return {
+        "user_cache": user_cache.stats(),
+        "history_cache": history_cache.stats(),
+        "webhooks": webhooks,
+        "jobs": jobs,
+        "idempotency": idempotency_store.stats(),
+        "admission": admission_controller.stats(),
+        "llm_breaker": llm_breaker.stats()
+    }
+
 
 # Global exception handler
 @app.exception_handler(Exception)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -18,6 +18,19 @@ class AgentType(str, enum.Enum):
     PLANNING = "planning"
 
 
+class WebhookEventStatus(str, enum.Enum):
+    PENDING = "pending"
+    PROCESSED = "processed"
+    FAILED = "failed"
+
+
+class JobStatus(str, enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
 class User(Base):
     __tablename__ = "users"
     
@@ -54,6 +67,55 @@ class Message(Base):
     role = Column(Enum(MessageRole), nullable=False)
     agent_type = Column(Enum(AgentType), nullable=True)  # Only for assistant messages
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    idempotency_key = Column(String, nullable=True)  # "<user_id>:<Idempotency-Key>" on user messages
+    request_hash = Column(String, nullable=True)  # SHA-256 of the keyed request, to catch a reused key
+    reply_to_id = Column(Integer, nullable=True)  # On assistant messages: the user message answered
     
     # Relationships
-    conversation = relationship("Conversation", back_populates="messages")
\ No newline at end of file
+    conversation = relationship("Conversation", back_populates="messages")
+
+    __table_args__ = (
+        # Per-conversation lookups, including the latest message id used for ETags
+        Index("ix_messages_conversation_id_id", "conversation_id", "id"),
+        # Also stops two workers from running the same keyed request twice
+        Index("ix_messages_idempotency_key", "idempotency_key", unique=True),
+        Index("ix_messages_reply_to_id", "reply_to_id"),
+    )
+
+
+class WebhookEvent(Base):
+    __tablename__ = "webhook_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    svix_id = Column(String, unique=True, index=True, nullable=False)  # Deduplicates Clerk retries
+    event_type = Column(String, nullable=True)
+    payload = Column(Text, nullable=False)  # Raw JSON body
+    status = Column(Enum(WebhookEventStatus), nullable=False, default=WebhookEventStatus.PENDING, index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    received_at = Column(DateTime(timezone=True), server_default=func.now())
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+    # Set by the worker applying the event, so other workers leave it alone
+    claim_token = Column(String, nullable=True)
+    claimed_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class BackgroundJob(Base):
+    __tablename__ = "background_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)  # Handler name, e.g. "generate_title"
+    conversation_id = Column(Integer, nullable=True)
+    # "<kind>:<conversation_id>" while queued or running, so each is queued once; cleared when finished
+    dedup_key = Column(String, unique=True, nullable=True)
+    status = Column(Enum(JobStatus), nullable=False, default=JobStatus.PENDING)
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    run_after = Column(DateTime(timezone=True), server_default=func.now())  # Retry backoff
+    locked_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_background_jobs_status_run_after", "status", "run_after"),
+    )
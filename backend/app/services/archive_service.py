@@ -0,0 +1,393 @@
+import fcntl
+import gzip
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+from sqlalchemy import func, delete
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models import Conversation, Message, MessageRole, AgentType
+from app.services.history_cache import history_cache
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+MANIFEST_FILENAME = "manifest.ndjson"
+
+# Conversations archived per transaction
+ARCHIVE_BATCH_SIZE = 100
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data)
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+class ArchiveManifest:
+    """
+    Append-only log of where each archived conversation lives
+
+    Entries are {"conversation_id", "segment", "offset", "length", "codec", ...};
+    a later {"conversation_id", "rehydrated_at"} line cancels an entry. The log is
+    replayed into memory and re-read whenever another process changes it. Writers
+    hold an flock on a sibling lock file, since forget() rewrites the log in place.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[int, Dict[str, Any]] = {}
+        self._frames: Dict[int, List[Dict[str, Any]]] = {}  # Every frame written, cancelled ones included
+        self._rehydrated_at: Dict[int, datetime] = {}
+        self._loaded: Optional[tuple] = None
+
+    def _refresh(self) -> None:
+        try:
+            stat = os.stat(self.path)
+            signature = (stat.st_ino, stat.st_size)
+        except FileNotFoundError:
+            signature = None
+        if signature == self._loaded:
+            return
+
+        self._entries, self._frames, self._rehydrated_at = {}, {}, {}
+        if signature:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._apply(json.loads(line))
+        self._loaded = signature
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        conversation_id = record["conversation_id"]
+        if "rehydrated_at" in record:
+            self._entries.pop(conversation_id, None)
+            self._rehydrated_at[conversation_id] = datetime.fromisoformat(record["rehydrated_at"])
+        else:
+            self._entries[conversation_id] = record
+            self._frames.setdefault(conversation_id, []).append(record)
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._lock, open(self.path + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            self._refresh()
+            yield
+
+    def get(self, conversation_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._refresh()
+            return self._entries.get(conversation_id)
+
+    def archived(self, conversation_ids: Iterable[int]) -> List[int]:
+        """The given conversations that currently have an archive entry"""
+        with self._lock:
+            self._refresh()
+            return [cid for cid in conversation_ids if cid in self._entries]
+
+    def frames(self, conversation_ids: Iterable[int]) -> List[Dict[str, Any]]:
+        """Every frame written for these conversations, including ones since rehydrated"""
+        with self._lock:
+            self._refresh()
+            return [frame for cid in conversation_ids for frame in self._frames.get(cid, [])]
+
+    def live_segments(self) -> Set[str]:
+        """Segments that still hold the current archive of some conversation"""
+        with self._lock:
+            self._refresh()
+            return {entry["segment"] for entry in self._entries.values()}
+
+    def rehydrated_since(self, cutoff: datetime) -> List[int]:
+        """Conversations brought back after the cutoff (not worth re-archiving yet)"""
+        with self._lock:
+            self._refresh()
+            return [cid for cid, at in self._rehydrated_at.items() if at > cutoff]
+
+    def append(self, records: List[Dict[str, Any]]) -> None:
+        with self._write_lock():
+            with open(self.path, "a", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+                size = f.tell()
+            # Apply our own lines in place instead of replaying the whole log
+            for record in records:
+                self._apply(record)
+            self._loaded = (os.stat(self.path).st_ino, size)
+
+    def remove(self, conversation_ids: Set[int]) -> None:
+        """Rewrite the log without any line about these conversations"""
+        with self._write_lock():
+            if self._loaded is None:
+                return
+            tmp_path = self.path + ".tmp"
+            with open(self.path, "r", encoding="utf-8") as src, open(tmp_path, "w", encoding="utf-8") as dst:
+                for line in src:
+                    if line.strip() and json.loads(line)["conversation_id"] not in conversation_ids:
+                        dst.write(line)
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.replace(tmp_path, self.path)
+            self._refresh()
+
+
+class ConversationArchive:
+    """
+    Cold storage for the messages of inactive conversations
+
+    Messages are moved into append-only segment files on local disk, one
+    compressed frame (zstd if installed, gzip otherwise) per conversation, so a
+    single conversation can be read back without touching the rest of the segment.
+    Conversation rows stay in the hot table for listing and ownership checks.
+    """
+
+    def __init__(self, archive_dir: str):
+        self.archive_dir = archive_dir
+        self.codec = "zstd" if ZSTD_AVAILABLE else "gzip"
+        self.manifest = ArchiveManifest(os.path.join(archive_dir, MANIFEST_FILENAME))
+
+    def is_archived(self, conversation_id: int) -> bool:
+        return self.manifest.get(conversation_id) is not None
+
+    def archived(self, conversation_ids: Iterable[int]) -> List[int]:
+        """The given conversations whose messages are currently archived"""
+        return self.manifest.archived(conversation_ids)
+
+    def archived_message_count(self, conversation_id: int) -> int:
+        entry = self.manifest.get(conversation_id)
+        return entry["messages"] if entry else 0
+
+    def _read_frame(self, entry: Dict[str, Any]) -> List[Dict[str, Any]]:
+        with open(os.path.join(self.archive_dir, entry["segment"]), "rb") as f:
+            f.seek(entry["offset"])
+            frame = f.read(entry["length"])
+        return [json.loads(line) for line in _decompress(frame, entry["codec"]).decode("utf-8").splitlines()]
+
+    def read_messages(self, conversation_id: int) -> List[Dict[str, Any]]:
+        """
+        Archived messages of a conversation without moving them back, oldest first
+
+        Records are {"id", "role", "agent_type", "content", "created_at"} with enum
+        values and ISO timestamps, as written to the segment.
+        """
+        entry = self.manifest.get(conversation_id)
+        return self._read_frame(entry) if entry else []
+
+    def archive_inactive(
+        self,
+        db: Session,
+        inactive_days: int,
+        batch_size: int = ARCHIVE_BATCH_SIZE
+    ) -> Dict[str, int]:
+        """
+        Move messages of conversations idle for more than inactive_days to a new segment
+
+        Returns:
+            dict with the number of conversations and messages archived
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(days=inactive_days)
+        skip = set(self.manifest.rehydrated_since(cutoff))
+
+        # Judged by the latest message, so activity counts however updated_at was maintained
+        candidate_ids = [
+            conversation_id for (conversation_id,) in db.query(Message.conversation_id)
+            .group_by(Message.conversation_id)
+            .having(func.max(Message.created_at) < cutoff)
+            .order_by(Message.conversation_id)
+            if conversation_id not in skip
+        ]
+
+        os.makedirs(self.archive_dir, exist_ok=True)
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        extension = "zst" if self.codec == "zstd" else "gz"
+        segment = f"segment-{timestamp}.ndjson.{extension}"
+        segment_path = os.path.join(self.archive_dir, segment)
+
+        stats = {"conversations": 0, "messages": 0}
+        with open(segment_path, "ab") as segment_file:
+            # Held until the segment is complete so forget() never removes it mid-write
+            fcntl.flock(segment_file.fileno(), fcntl.LOCK_EX)
+            for start in range(0, len(candidate_ids), batch_size):
+                batch_ids = candidate_ids[start:start + batch_size]
+                self._archive_batch(db, batch_ids, segment, segment_file, stats)
+
+        if stats["conversations"] == 0:
+            os.remove(segment_path)
+        return stats
+
+    def _archive_batch(self, db: Session, conversation_ids: List[int], segment: str, segment_file, stats) -> None:
+        messages = db.query(Message).filter(
+            Message.conversation_id.in_(conversation_ids)
+        ).order_by(Message.conversation_id, Message.id).all()
+
+        by_conversation: Dict[int, List[Message]] = {}
+        for message in messages:
+            by_conversation.setdefault(message.conversation_id, []).append(message)
+
+        now = datetime.now(timezone.utc).isoformat()
+        manifest_records = []
+        for conversation_id, conversation_messages in by_conversation.items():
+            lines = [
+                json.dumps({
+                    "id": msg.id,
+                    "role": msg.role.value,
+                    "agent_type": msg.agent_type.value if msg.agent_type else None,
+                    "content": msg.content,
+                    "created_at": _isoformat(msg.created_at),
+                }, ensure_ascii=False)
+                for msg in conversation_messages
+            ]
+            frame = _compress(("\n".join(lines) + "\n").encode("utf-8"), self.codec)
+            offset = segment_file.tell()
+            segment_file.write(frame)
+            manifest_records.append({
+                "conversation_id": conversation_id,
+                "segment": segment,
+                "offset": offset,
+                "length": len(frame),
+                "codec": self.codec,
+                "messages": len(conversation_messages),
+                "archived_at": now,
+            })
+
+        if not manifest_records:
+            return
+
+        # Segment and manifest are durable before the hot rows go away
+        segment_file.flush()
+        os.fsync(segment_file.fileno())
+        self.manifest.append(manifest_records)
+
+        # Bounded by id so messages added since the SELECT stay in the hot table
+        max_archived_id = max(msg.id for msg in messages)
+        db.execute(delete(Message).where(
+            Message.conversation_id.in_(list(by_conversation)),
+            Message.id <= max_archived_id
+        ))
+        db.commit()
+        db.expire_all()
+
+        for conversation_id in by_conversation:
+            history_cache.invalidate(conversation_id)
+        stats["conversations"] += len(by_conversation)
+        stats["messages"] += len(messages)
+
+    def rehydrate(self, db: Session, conversation_id: int) -> bool:
+        """
+        Move an archived conversation's messages back into the messages table
+
+        Safe to run concurrently for the same conversation: rows that are
+        already back are skipped.
+
+        Returns:
+            True if the conversation was in the archive
+        """
+        entry = self.manifest.get(conversation_id)
+        if not entry:
+            return False
+
+        rows = [
+            {
+                "id": record["id"],
+                "conversation_id": conversation_id,
+                "content": record["content"],
+                "role": MessageRole(record["role"]),
+                "agent_type": AgentType(record["agent_type"]) if record["agent_type"] else None,
+                "created_at": datetime.fromisoformat(record["created_at"]) if record["created_at"] else None,
+            }
+            for record in self._read_frame(entry)
+        ]
+
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            stmt = postgresql.insert(Message)
+        elif dialect == "sqlite":
+            stmt = sqlite.insert(Message)
+        else:
+            raise RuntimeError(f"Rehydration is not supported on {dialect}")
+
+        # Rows may already be there: a concurrent first read of the same
+        # conversation inserted them, or a crash came between writing the
+        # manifest and deleting the hot rows
+        if rows:
+            db.execute(stmt.on_conflict_do_nothing(index_elements=[Message.id]), rows)
+            db.commit()
+
+        self.manifest.append([{
+            "conversation_id": conversation_id,
+            "rehydrated_at": datetime.now(timezone.utc).isoformat(),
+        }])
+        history_cache.invalidate(conversation_id)
+        return True
+
+    def forget(self, conversation_ids: List[int]) -> int:
+        """
+        Erase conversations from the archive, e.g. when their user is deleted
+
+        Their frames (including ones already rehydrated) are overwritten with
+        zeros, their manifest lines are dropped and segments left without a
+        live frame are removed.
+
+        Returns:
+            Number of frames erased
+        """
+        frames = self.manifest.frames(conversation_ids)
+        if not frames:
+            return 0
+
+        by_segment: Dict[str, List[Dict[str, Any]]] = {}
+        for frame in frames:
+            by_segment.setdefault(frame["segment"], []).append(frame)
+
+        erased = 0
+        for segment, segment_frames in by_segment.items():
+            path = os.path.join(self.archive_dir, segment)
+            if not os.path.exists(path):
+                continue
+            with open(path, "r+b") as f:
+                for frame in segment_frames:
+                    f.seek(frame["offset"])
+                    f.write(b"\0" * frame["length"])
+                    erased += 1
+                f.flush()
+                os.fsync(f.fileno())
+
+        self.manifest.remove(set(conversation_ids))
+
+        live_segments = self.manifest.live_segments()
+        for segment in set(by_segment) - live_segments:
+            self._remove_segment(os.path.join(self.archive_dir, segment))
+        return erased
+
+    def _remove_segment(self, path: str) -> None:
+        try:
+            with open(path, "rb") as f:
+                # An archive run still appending to it holds the lock; leave it be
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                os.remove(path)
+        except (BlockingIOError, FileNotFoundError):
+            pass
+
+
+# Global archive instance
+conversation_archive = ConversationArchive(settings.archive_dir)
@@ -1,23 +1,82 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import delete, desc, func, inspect, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.dialects import postgresql, sqlite
+from app.database import RoutingSession
 from app.models import User, Conversation, Message, MessageRole, AgentType
-from typing import List, Optional
+from app.services.history_cache import history_cache
+from app.services.archive_service import conversation_archive
+from app.services.message_notifier import message_notifier
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Rows per multi-row upsert statement in upsert_users
+UPSERT_BATCH_SIZE = 1000
 
 
 class ChatService:
     def __init__(self, db: Session):
         self.db = db
 
-    def get_or_create_user(self, clerk_user_id: str, email: str) -> User:
-        """Get existing user or create new one"""
-        user = self.db.query(User).filter(User.clerk_user_id == clerk_user_id).first()
-        if not user:
-            user = User(clerk_user_id=clerk_user_id, email=email)
-            self.db.add(user)
-            self.db.commit()
-            self.db.refresh(user)
+    def _upsert_users_stmt(self, rows: List[Dict[str, Optional[str]]]):
+        """INSERT ... ON CONFLICT (clerk_user_id) DO UPDATE for this session's dialect"""
+        # email is NOT NULL even on the conflict path, so "unknown" travels as ""
+        rows = [{**row, "email": row["email"] or ""} for row in rows]
+
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "postgresql":
+            stmt = postgresql.insert(User).values(rows)
+        elif dialect == "sqlite":
+            stmt = sqlite.insert(User).values(rows)
+        else:
+            raise RuntimeError(f"User upsert is not supported on {dialect}")
+
+        return stmt.on_conflict_do_update(
+            index_elements=[User.clerk_user_id],
+            set_={
+                # Keep the stored email when the caller doesn't know it
+                "email": func.coalesce(func.nullif(stmt.excluded.email, ""), User.email),
+                "updated_at": func.now()
+            }
+        )
+
+    def upsert_user(self, clerk_user_id: str, email: Optional[str]) -> User:
+        """Create a user or update their email in one atomic round-trip"""
+        stmt = self._upsert_users_stmt([{"clerk_user_id": clerk_user_id, "email": email}])
+        user = self.db.scalars(
+            stmt.returning(User),
+            execution_options={"populate_existing": True}
+        ).one()
+
+        # Keep the RETURNING values loaded across the commit instead of re-selecting
+        loaded = {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+        self.db.commit()
+        for key, value in loaded.items():
+            set_committed_value(user, key, value)
         return user
 
+    def upsert_users(self, users: Iterable[Tuple[str, Optional[str]]]) -> int:
+        """
+        Bulk variant of upsert_user for webhook backfills
+
+        Args:
+            users: (clerk_user_id, email) pairs; the last email wins for duplicates
+
+        Returns:
+            Number of distinct users written
+        """
+        # One statement can't touch the same row twice, so dedupe first
+        emails = dict(users)
+        rows = [{"clerk_user_id": cid, "email": email} for cid, email in emails.items()]
+        for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+            self.db.execute(self._upsert_users_stmt(rows[start:start + UPSERT_BATCH_SIZE]))
+        self.db.commit()
+        return len(rows)
+
+    def get_or_create_user(self, clerk_user_id: str, email: str) -> User:
+        """Get existing user or create new one (race-free, via upsert_user)"""
+        return self.upsert_user(clerk_user_id, email)
+
     def create_conversation(self, user_id: int, title: Optional[str] = None) -> Conversation:
         """Create a new conversation"""
         from sqlalchemy import func
@@ -29,14 +88,23 @@ class ChatService:
         self.db.add(conversation)
         self.db.commit()
         self.db.refresh(conversation)
+        history_cache.set(conversation.id, [])
         return conversation
 
     def get_conversation(self, conversation_id: int, user_id: int) -> Optional[Conversation]:
         """Get conversation with messages, ensuring user owns it"""
-        return self.db.query(Conversation).filter(
+        conversation = self.db.query(Conversation).filter(
             Conversation.id == conversation_id,
             Conversation.user_id == user_id
         ).first()
+        # Bring archived messages back into the hot table on first access
+        if conversation and conversation_archive.is_archived(conversation.id):
+            # Rehydrating reads the hot rows, writes, then the caller reads them back:
+            # all of it has to see the primary, even on a session routed to a replica
+            if isinstance(self.db, RoutingSession):
+                self.db.use_primary()
+            conversation_archive.rehydrate(self.db, conversation.id)
+        return conversation
 
     def get_user_conversations(self, user_id: int) -> List[Conversation]:
         """Get all conversations for a user"""
@@ -49,38 +117,131 @@ class ChatService:
         conversation_id: int, 
         content: str, 
         role: MessageRole, 
-        agent_type: Optional[AgentType] = None
+        agent_type: Optional[AgentType] = None,
+        idempotency_key: Optional[str] = None,
+        request_hash: Optional[str] = None,
+        reply_to_id: Optional[int] = None
     ) -> Message:
         """Add a message to a conversation"""
         message = Message(
             conversation_id=conversation_id,
             content=content,
             role=role,
-            agent_type=agent_type
+            agent_type=agent_type,
+            idempotency_key=idempotency_key,
+            request_hash=request_hash,
+            reply_to_id=reply_to_id
         )
         self.db.add(message)
+        # The conversation list and the archiver both go by updated_at
+        self.db.execute(
+            update(Conversation).where(Conversation.id == conversation_id).values(updated_at=func.now())
+        )
         self.db.commit()
         self.db.refresh(message)
+        # Write-through so the next turn doesn't have to re-read the history
+        history_cache.append(conversation_id, {"role": role.value, "content": content})
+
+        # Wake this user's long-poll sync requests
+        user_id = self.db.info.get("user_id")
+        if user_id is None:
+            user_id = self.db.scalar(select(Conversation.user_id).where(Conversation.id == conversation_id))
+        message_notifier.notify(user_id)
         return message
 
+    def get_idempotent_turn(self, idempotency_key: str) -> Optional[Tuple[Message, Optional[Message]]]:
+        """The user message recorded with this key and the assistant reply to it, if there is one yet"""
+        user_message = self.db.query(Message).filter(Message.idempotency_key == idempotency_key).first()
+        if user_message is None:
+            return None
+        reply = self.db.query(Message).filter(Message.reply_to_id == user_message.id).first()
+        return user_message, reply
+
+    def discard_message(self, message: Message) -> None:
+        """Delete the user message of a turn that failed, so a retry with its Idempotency-Key runs again"""
+        message_id, conversation_id = message.id, message.conversation_id
+        self.db.rollback()
+        self.db.execute(delete(Message).where(Message.id == message_id))
+        self.db.commit()
+        history_cache.invalidate(conversation_id)
+
     def get_conversation_messages(self, conversation_id: int) -> List[Message]:
         """Get all messages in a conversation"""
         return self.db.query(Message).filter(
             Message.conversation_id == conversation_id
         ).order_by(Message.created_at).all()
 
-    def auto_generate_title(self, conversation: Conversation) -> str:
-        """Auto-generate conversation title from first few messages"""
-        messages = self.get_conversation_messages(conversation.id)
-        if messages:
-            first_user_message = next(
-                (msg for msg in messages if msg.role == MessageRole.USER), 
-                None
+    def get_conversations_version(self, user_id: int) -> Tuple:
+        """Cheap fingerprint of a user's conversation list: (count, latest updated_at, latest message id)"""
+        conversation_ids = select(Conversation.id).where(Conversation.user_id == user_id)
+        count, updated_at = self.db.execute(
+            select(func.count(Conversation.id), func.max(Conversation.updated_at))
+            .where(Conversation.user_id == user_id)
+        ).one()
+        last_message_id = self.db.scalar(
+            select(func.max(Message.id)).where(Message.conversation_id.in_(conversation_ids))
+        )
+        return count, updated_at, last_message_id
+
+    def get_last_message_id(self, conversation_id: int) -> Optional[int]:
+        return self.db.scalar(
+            select(func.max(Message.id)).where(Message.conversation_id == conversation_id)
+        )
+
+    def get_messages_since(
+        self,
+        user_id: int,
+        since_id: int,
+        conversation_id: Optional[int] = None,
+        limit: int = 100
+    ) -> List[Row]:
+        """Messages newer than since_id in one or all of the user's conversations, oldest first"""
+        query = (
+            select(
+                Message.id, Message.conversation_id, Message.content,
+                Message.role, Message.agent_type, Message.created_at
             )
-            if first_user_message:
-                # Take first 50 characters of first user message
-                title = first_user_message.content[:50]
-                if len(first_user_message.content) > 50:
-                    title += "..."
-                return title
-        return "New Conversation"
\ No newline at end of file
+            .join(Conversation, Conversation.id == Message.conversation_id)
+            .where(Conversation.user_id == user_id, Message.id > since_id)
+        )
+        if conversation_id is not None:
+            query = query.where(Message.conversation_id == conversation_id)
+        return self.db.execute(query.order_by(Message.id).limit(limit)).all()
+
+    def get_conversation_message_rows(self, conversation_id: int) -> List[Row]:
+        """Message columns needed by API responses, without building ORM objects"""
+        return self.db.execute(
+            select(Message.content, Message.role, Message.agent_type, Message.created_at)
+            .where(Message.conversation_id == conversation_id)
+            .order_by(Message.created_at, Message.id)
+        ).all()
+
+    def get_conversation_history(self, conversation_id: int) -> List[Dict[str, str]]:
+        """Get the conversation history in the format expected by process_message"""
+        history = history_cache.get(conversation_id)
+        if history is None:
+            # Taken before the read, so a message added meanwhile keeps this
+            # (possibly older) history out of the cache
+            version = history_cache.version(conversation_id)
+            history = [
+                {"role": msg.role.value, "content": msg.content}
+                for msg in self.get_conversation_messages(conversation_id)
+            ]
+            history_cache.set(conversation_id, history, version=version)
+        return history
+
+    def auto_generate_title(self, conversation: Conversation) -> str:
+        """Auto-generate conversation title from the first user message"""
+        content = self.db.scalar(
+            select(Message.content)
+            .where(Message.conversation_id == conversation.id, Message.role == MessageRole.USER)
+            .order_by(Message.created_at, Message.id)
+            .limit(1)
+        )
+        if content:
+            # Take first 50 characters of first user message
+            title = content[:50]
+            if len(content) > 50:
+                title += "..."
+            return title
+        return "New Conversation"
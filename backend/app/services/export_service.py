@@ -0,0 +1,146 @@
+import json
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, Optional
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.database import replica_router
+from app.models import User, Conversation, Message
+from app.services.archive_service import conversation_archive
+
+# Rows fetched per round-trip from the server-side cursor
+EXPORT_BATCH_SIZE = 1000
+
+# Minimum size of a gzip chunk handed to the response
+GZIP_CHUNK_SIZE = 64 * 1024
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+class ExportService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def iter_records(
+        self,
+        user_id: Optional[int] = None,
+        batch_size: int = EXPORT_BATCH_SIZE
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream conversations and their messages as flat export records
+
+        Each conversation is emitted as a "conversation" record followed by one
+        "message" record per message, so memory use doesn't depend on thread length.
+        Archived messages are read from their segment and come before the hot ones.
+
+        Args:
+            user_id: Only export this user's conversations (None exports everyone)
+            batch_size: Rows fetched per round-trip from the server-side cursor
+        """
+        stmt = (
+            select(
+                Conversation.id,
+                User.clerk_user_id,
+                Conversation.title,
+                Conversation.created_at,
+                Conversation.updated_at,
+                Message.id,
+                Message.role,
+                Message.agent_type,
+                Message.content,
+                Message.created_at,
+            )
+            .join(User, User.id == Conversation.user_id)
+            .outerjoin(Message, Message.conversation_id == Conversation.id)
+            .order_by(Conversation.id, Message.id)
+        )
+        if user_id is not None:
+            stmt = stmt.where(Conversation.user_id == user_id)
+
+        # yield_per turns on stream_results, i.e. a server-side cursor on Postgres
+        result = self.db.execute(stmt.execution_options(yield_per=batch_size))
+
+        current_conversation_id = None
+        for row in result:
+            (conversation_id, clerk_user_id, title, conv_created_at, conv_updated_at,
+             message_id, role, agent_type, content, msg_created_at) = row
+
+            if conversation_id != current_conversation_id:
+                current_conversation_id = conversation_id
+                yield {
+                    "type": "conversation",
+                    "id": conversation_id,
+                    "clerk_user_id": clerk_user_id,
+                    "title": title,
+                    "created_at": _isoformat(conv_created_at),
+                    "updated_at": _isoformat(conv_updated_at),
+                }
+
+                archived_ids = set()
+                for record in conversation_archive.read_messages(conversation_id):
+                    archived_ids.add(record["id"])
+                    yield {
+                        "type": "message",
+                        "id": record["id"],
+                        "conversation_id": conversation_id,
+                        "role": record["role"],
+                        "agent_type": record["agent_type"],
+                        "content": record["content"],
+                        "created_at": record["created_at"],
+                    }
+
+            # A crash between archiving and deleting the hot rows leaves both copies
+            if message_id is not None and message_id not in archived_ids:
+                yield {
+                    "type": "message",
+                    "id": message_id,
+                    "conversation_id": conversation_id,
+                    "role": role.value,
+                    "agent_type": agent_type.value if agent_type else None,
+                    "content": content,
+                    "created_at": _isoformat(msg_created_at),
+                }
+
+
+def to_ndjson(records: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """Encode records as newline-delimited JSON"""
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+def gzip_stream(chunks: Iterable[bytes], chunk_size: int = GZIP_CHUNK_SIZE) -> Iterator[bytes]:
+    """Gzip-compress a byte stream incrementally"""
+    compressor = zlib.compressobj(wbits=31)  # 31 = gzip container
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += compressor.compress(chunk)
+        if len(buffer) >= chunk_size:
+            yield bytes(buffer)
+            buffer.clear()
+    buffer += compressor.flush()
+    if buffer:
+        yield bytes(buffer)
+
+
+def stream_export(
+    user_id: Optional[int] = None,
+    compress: bool = False,
+    last_write_at: Optional[str] = None
+) -> Iterator[bytes]:
+    """
+    Produce an NDJSON (optionally gzipped) export using its own session
+
+    The session outlives the request handler, so it can back a StreamingResponse.
+    Reads go to a replica when one is configured, unless last_write_at (the
+    client's read-your-writes cookie) is recent.
+    """
+    db = replica_router.read_session(user_id, last_write_at)
+    try:
+        stream = to_ndjson(ExportService(db).iter_records(user_id))
+        if compress:
+            stream = gzip_stream(stream)
+        yield from stream
+    finally:
+        db.close()
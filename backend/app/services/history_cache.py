@@ -0,0 +1,253 @@
+import abc
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from app.core.config import settings
+
+# A history is the list of {"role", "content"} dicts handed to process_message
+History = List[Dict[str, str]]
+
+
+class HistoryCacheBackend(abc.ABC):
+    """Interface for conversation history caches"""
+
+    @abc.abstractmethod
+    def get(self, conversation_id: int) -> Optional[History]:
+        """Return a copy of the cached history, or None on a miss"""
+
+    @abc.abstractmethod
+    def version(self, conversation_id: int) -> int:
+        """Token to take before loading a history from the database, for set(version=...)"""
+
+    @abc.abstractmethod
+    def set(self, conversation_id: int, history: History, version: Optional[int] = None) -> None:
+        """
+        Store the full history of a conversation
+
+        With a version, the history is only stored if nothing was appended to
+        or invalidated for the conversation since that token was taken; an
+        append on a miss is a no-op, so a history loaded before it would
+        otherwise be cached without the new message.
+        """
+
+    @abc.abstractmethod
+    def append(self, conversation_id: int, message: Dict[str, str]) -> None:
+        """Append a message to a cached history (no-op if not cached, but it still changes the version)"""
+
+    @abc.abstractmethod
+    def invalidate(self, conversation_id: int) -> None:
+        """Drop a conversation from the cache (and change its version)"""
+
+    @abc.abstractmethod
+    def clear(self) -> None:
+        """Drop every cached conversation"""
+
+    def stats(self) -> dict:
+        """Cache statistics for /metrics"""
+        return {}
+
+
+class InMemoryHistoryCache(HistoryCacheBackend):
+    """Size-bounded LRU cache local to this process"""
+
+    def __init__(self, max_size: int = 1000):
+        self.max_size = max_size
+        self._entries: "OrderedDict[int, History]" = OrderedDict()
+        # Clock value of each conversation's last append or invalidation, for
+        # as many conversations as the cache holds; older ones count as
+        # changed at _changed_floor, which only makes a versioned set skip
+        self._clock = 0
+        self._changed: "OrderedDict[int, int]" = OrderedDict()
+        self._changed_floor = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale_sets = 0
+
+    def get(self, conversation_id: int) -> Optional[History]:
+        with self._lock:
+            history = self._entries.get(conversation_id)
+            if history is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(conversation_id)
+            self.hits += 1
+            return list(history)
+
+    def _mark_changed(self, conversation_id: int) -> None:
+        self._clock += 1
+        self._changed[conversation_id] = self._clock
+        self._changed.move_to_end(conversation_id)
+        while len(self._changed) > max(self.max_size, 1):
+            _, changed_at = self._changed.popitem(last=False)
+            self._changed_floor = max(self._changed_floor, changed_at)
+
+    def version(self, conversation_id: int) -> int:
+        with self._lock:
+            return self._clock
+
+    def set(self, conversation_id: int, history: History, version: Optional[int] = None) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            if version is not None and self._changed.get(conversation_id, self._changed_floor) > version:
+                self.stale_sets += 1
+                return
+            self._entries[conversation_id] = list(history)
+            self._entries.move_to_end(conversation_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def append(self, conversation_id: int, message: Dict[str, str]) -> None:
+        with self._lock:
+            self._mark_changed(conversation_id)
+            history = self._entries.get(conversation_id)
+            if history is not None:
+                history.append(message)
+                self._entries.move_to_end(conversation_id)
+
+    def invalidate(self, conversation_id: int) -> None:
+        with self._lock:
+            self._mark_changed(conversation_id)
+            self._entries.pop(conversation_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clock += 1
+            self._changed.clear()
+            self._changed_floor = self._clock
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "stale_sets": self.stale_sets
+        }
+
+
+# Replace a history only if its version counter still matches (a missing counter is 0)
+REDIS_SET_IF_VERSION = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+if #ARGV > 2 then
+    -- In chunks: unpack is limited by the Lua stack size
+    for i = 3, #ARGV, 1000 do
+        redis.call('RPUSH', KEYS[1], unpack(ARGV, i, math.min(i + 999, #ARGV)))
+    end
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 1
+"""
+
+
+class RedisHistoryCache(HistoryCacheBackend):
+    """
+    Shared cache for multi-worker deployments, one Redis list per conversation
+
+    Each conversation also has a version counter, bumped by every append and
+    invalidation, under version_prefix (outside prefix, so clear() keeps it).
+    """
+
+    def __init__(self, redis_url: str, ttl_seconds: int = 3600, prefix: str = "chat:history:",
+                 version_prefix: str = "chat:history-version:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("The redis history cache backend requires the 'redis' package") from e
+
+        self.client = redis.Redis.from_url(redis_url)
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self.version_prefix = version_prefix
+        self._set_if_version = self.client.register_script(REDIS_SET_IF_VERSION)
+
+    def _key(self, conversation_id: int) -> str:
+        return f"{self.prefix}{conversation_id}"
+
+    def _version_key(self, conversation_id: int) -> str:
+        return f"{self.version_prefix}{conversation_id}"
+
+    def _bump_version(self, pipe, conversation_id: int) -> None:
+        pipe.incr(self._version_key(conversation_id))
+        pipe.expire(self._version_key(conversation_id), self.ttl_seconds)
+
+    def version(self, conversation_id: int) -> int:
+        return int(self.client.get(self._version_key(conversation_id)) or 0)
+
+    def get(self, conversation_id: int) -> Optional[History]:
+        key = self._key(conversation_id)
+        pipe = self.client.pipeline()
+        pipe.lrange(key, 0, -1)
+        pipe.expire(key, self.ttl_seconds)
+        items, _ = pipe.execute()
+        # Redis can't hold an empty list, so an empty history is always a miss
+        if not items:
+            return None
+        return [json.loads(item) for item in items]
+
+    def set(self, conversation_id: int, history: History, version: Optional[int] = None) -> None:
+        key = self._key(conversation_id)
+        if version is not None:
+            self._set_if_version(
+                keys=[key, self._version_key(conversation_id)],
+                args=[version, self.ttl_seconds, *[json.dumps(msg) for msg in history]]
+            )
+            return
+        pipe = self.client.pipeline()
+        pipe.delete(key)
+        if history:
+            pipe.rpush(key, *[json.dumps(msg) for msg in history])
+            pipe.expire(key, self.ttl_seconds)
+        pipe.execute()
+
+    def append(self, conversation_id: int, message: Dict[str, str]) -> None:
+        pipe = self.client.pipeline()
+        self._bump_version(pipe, conversation_id)
+        # RPUSHX only appends to an existing list, so a miss stays a miss
+        pipe.rpushx(self._key(conversation_id), json.dumps(message))
+        pipe.execute()
+
+    def invalidate(self, conversation_id: int) -> None:
+        pipe = self.client.pipeline()
+        self._bump_version(pipe, conversation_id)
+        pipe.delete(self._key(conversation_id))
+        pipe.execute()
+
+    def clear(self) -> None:
+        for key in self.client.scan_iter(f"{self.prefix}*"):
+            self.client.delete(key)
+
+
+def create_history_cache() -> HistoryCacheBackend:
+    """
+    Build the history cache configured in settings
+
+    Without an explicit backend, several workers get Redis: each in-memory
+    cache only sees its own worker's writes, so it would serve stale history
+    for turns handled by another worker.
+    """
+    backend = settings.history_cache_backend or ("redis" if settings.web_concurrency > 1 else "memory")
+    if backend == "redis":
+        if not settings.redis_url:
+            raise RuntimeError(
+                "The redis history cache requires REDIS_URL to be set "
+                "(it is the default when WEB_CONCURRENCY > 1)"
+            )
+        return RedisHistoryCache(settings.redis_url, settings.history_cache_ttl_seconds)
+    if backend != "memory":
+        raise RuntimeError(f"Unknown history_cache_backend: {backend}")
+    if settings.web_concurrency > 1:
+        print(f"⚠️ In-memory history cache with {settings.web_concurrency} workers: "
+              "histories can be stale across workers")
+    return InMemoryHistoryCache(settings.history_cache_size)
+
+
+# Global cache instance shared by every ChatService in this process
+history_cache = create_history_cache()
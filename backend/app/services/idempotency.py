@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from app.core.config import settings
+
+
+class IdempotencyStore:
+    """
+    Coalesces requests that share an Idempotency-Key (this process only)
+
+    The first request runs; duplicates that arrive while it's in flight await
+    the same future, and later ones get the stored result until it expires.
+    Failures aren't stored, so a retry after an error runs again.
+    """
+
+    def __init__(self, ttl_seconds: float = 86400, max_size: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._results: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.replayed = 0
+        self.coalesced = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._results[key]
+                return None
+            self._results.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, result: Any) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._results[key] = (time.monotonic() + self.ttl_seconds, result)
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_size:
+                self._results.popitem(last=False)
+
+    async def run(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn once per key and share its result with every duplicate"""
+        result = self.get(key)
+        if result is not None:
+            self.replayed += 1
+            return result
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            # Shielded so a duplicate going away doesn't cancel the original
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved: there may be no duplicates waiting
+            raise
+        else:
+            future.set_result(result)
+            self.set(key, result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "stored": len(self._results),
+            "in_flight": len(self._inflight),
+            "replayed": self.replayed,
+            "coalesced": self.coalesced
+        }
+
+
+# Global store for POST /api/chat/send
+idempotency_store = IdempotencyStore(settings.idempotency_ttl_seconds, settings.idempotency_cache_size)
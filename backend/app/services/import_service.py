@@ -0,0 +1,251 @@
+import csv
+import io
+import json
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+from app.models import User, Conversation, Message, MessageRole, AgentType
+from app.chat.schemas import ImportResponse
+from app.services.history_cache import history_cache
+
+# Messages buffered before a batch is written
+IMPORT_BATCH_SIZE = 5000
+
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    # Naive timestamps (e.g. exported from SQLite) are taken as UTC
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class NDJSONDecoder:
+    """Incrementally decode an (optionally gzipped) NDJSON byte stream"""
+
+    def __init__(self, gzip: bool = False):
+        self._decompressor = zlib.decompressobj(wbits=47) if gzip else None  # 47 = auto gzip/zlib
+        self._buffer = b""
+
+    def feed(self, chunk: bytes) -> List[Dict[str, Any]]:
+        """Decode a chunk, returning the records completed by it"""
+        if self._decompressor:
+            chunk = self._decompressor.decompress(chunk)
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split(b"\n")
+        return [json.loads(line) for line in lines if line.strip()]
+
+    def close(self) -> List[Dict[str, Any]]:
+        """Decode whatever is left after the last newline"""
+        if self._decompressor:
+            self._buffer += self._decompressor.flush()
+        line, self._buffer = self._buffer, b""
+        return [json.loads(line)] if line.strip() else []
+
+
+class ImportService:
+    """
+    Bulk-load conversations in the NDJSON format produced by ExportService
+
+    Records are fed one at a time; conversations and messages are buffered and
+    written in batches (executemany on SQLite, COPY on Postgres) with one
+    conversation stats update per batch, and one commit per batch or for the
+    whole import.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        user_id: Optional[int] = None,
+        batch_size: int = IMPORT_BATCH_SIZE,
+        commit_batches: bool = True
+    ):
+        """
+        Args:
+            db: Database session
+            user_id: Import every conversation for this user (None maps each
+                conversation's clerk_user_id to an existing user)
+            batch_size: Messages buffered before a batch is written
+            commit_batches: Commit each batch as it's written; False keeps the
+                whole import in one transaction, committed by finish(), so a
+                failure leaves nothing behind
+        """
+        self.db = db
+        self.user_id = user_id
+        self.batch_size = batch_size
+        self.commit_batches = commit_batches
+        self.use_copy = db.get_bind().dialect.name == "postgresql"
+
+        self._pending_conversations: List[Dict[str, Any]] = []
+        self._pending_messages: List[Dict[str, Any]] = []
+        self._conversation_ids: Dict[Any, int] = {}  # source id -> new id
+        self._updated_at: Dict[int, datetime] = {}  # new id -> latest activity
+        self._user_ids: Dict[str, int] = {}  # clerk_user_id -> user id
+
+        self.conversation_count = 0
+        self.message_count = 0
+        self._started = time.perf_counter()
+
+    def feed(self, record: Dict[str, Any]) -> None:
+        """Buffer one export record, writing a batch when the buffer is full"""
+        record_type = record.get("type")
+        if record_type == "conversation":
+            self._pending_conversations.append(record)
+        elif record_type == "message":
+            self._pending_messages.append(record)
+            if len(self._pending_messages) >= self.batch_size:
+                self.flush()
+        else:
+            raise ValueError(f"Unknown record type: {record_type!r}")
+
+    def finish(self) -> ImportResponse:
+        """Write any buffered records, commit and report throughput"""
+        self.flush()
+        if not self.commit_batches:
+            try:
+                self.db.commit()
+            except Exception:
+                self.db.rollback()
+                raise
+        seconds = time.perf_counter() - self._started
+        rows = self.conversation_count + self.message_count
+        return ImportResponse(
+            conversations=self.conversation_count,
+            messages=self.message_count,
+            seconds=round(seconds, 3),
+            rows_per_second=round(rows / seconds, 1) if seconds > 0 else 0.0
+        )
+
+    def import_records(self, records: Iterable[Dict[str, Any]]) -> ImportResponse:
+        """Import an iterable of export records"""
+        for record in records:
+            self.feed(record)
+        return self.finish()
+
+    def flush(self) -> None:
+        """Write the buffered conversations and messages (committed if commit_batches)"""
+        if not self._pending_conversations and not self._pending_messages:
+            return
+
+        try:
+            self._insert_conversations()
+            touched = self._insert_messages()
+            self._update_conversation_stats(touched)
+            if self.commit_batches:
+                self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        for conversation_id in touched:
+            history_cache.invalidate(conversation_id)
+
+    def _resolve_user_id(self, clerk_user_id: Optional[str]) -> int:
+        if self.user_id is not None:
+            return self.user_id
+        if clerk_user_id not in self._user_ids:
+            user = self.db.query(User).filter(User.clerk_user_id == clerk_user_id).first()
+            if not user:
+                raise ValueError(f"Unknown user: {clerk_user_id!r}")
+            self._user_ids[clerk_user_id] = user.id
+        return self._user_ids[clerk_user_id]
+
+    def _insert_conversations(self) -> None:
+        if not self._pending_conversations:
+            return
+
+        now = datetime.now(timezone.utc)
+        rows = []
+        for record in self._pending_conversations:
+            created_at = _parse_datetime(record.get("created_at")) or now
+            rows.append({
+                "user_id": self._resolve_user_id(record.get("clerk_user_id")),
+                "title": record.get("title"),
+                "created_at": created_at,
+                "updated_at": _parse_datetime(record.get("updated_at")) or created_at,
+            })
+
+        new_ids = self.db.scalars(
+            insert(Conversation).returning(Conversation.id, sort_by_parameter_order=True),
+            rows
+        ).all()
+
+        for record, row, new_id in zip(self._pending_conversations, rows, new_ids):
+            self._conversation_ids[record.get("id")] = new_id
+            self._updated_at[new_id] = row["updated_at"]
+
+        self.conversation_count += len(rows)
+        self._pending_conversations = []
+
+    def _insert_messages(self) -> Dict[int, datetime]:
+        """Insert buffered messages, returning the latest message time per conversation"""
+        if not self._pending_messages:
+            return {}
+
+        now = datetime.now(timezone.utc)
+        rows = []
+        touched: Dict[int, datetime] = {}
+        for record in self._pending_messages:
+            source_id = record.get("conversation_id")
+            if source_id not in self._conversation_ids:
+                raise ValueError(f"Message references unknown conversation: {source_id!r}")
+            conversation_id = self._conversation_ids[source_id]
+            created_at = _parse_datetime(record.get("created_at")) or now
+            agent_type = record.get("agent_type")
+            rows.append({
+                "conversation_id": conversation_id,
+                "content": record["content"],
+                "role": MessageRole(record["role"]),
+                "agent_type": AgentType(agent_type) if agent_type else None,
+                "created_at": created_at,
+            })
+            if conversation_id not in touched or created_at > touched[conversation_id]:
+                touched[conversation_id] = created_at
+
+        if self.use_copy:
+            self._copy_messages(rows)
+        else:
+            self.db.execute(insert(Message), rows)
+
+        self.message_count += len(rows)
+        self._pending_messages = []
+        return touched
+
+    def _copy_messages(self, rows: List[Dict[str, Any]]) -> None:
+        """Load message rows through Postgres COPY on the session's connection"""
+        buffer = io.StringIO()
+        # Quote every string so empty content stays '' while None becomes NULL
+        writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC)
+        for row in rows:
+            # Enum columns store member names, matching what the ORM writes
+            writer.writerow([
+                row["conversation_id"],
+                row["content"],
+                row["role"].name,
+                row["agent_type"].name if row["agent_type"] else None,
+                row["created_at"].isoformat(),
+            ])
+        buffer.seek(0)
+
+        raw_connection = self.db.connection().connection
+        with raw_connection.cursor() as cursor:
+            cursor.copy_expert(
+                "COPY messages (conversation_id, content, role, agent_type, created_at) "
+                "FROM STDIN WITH (FORMAT csv)",
+                buffer
+            )
+
+    def _update_conversation_stats(self, touched: Dict[int, datetime]) -> None:
+        """Move updated_at forward for every conversation that got new messages"""
+        rows = []
+        for conversation_id, latest in touched.items():
+            if latest > self._updated_at[conversation_id]:
+                self._updated_at[conversation_id] = latest
+                rows.append({"id": conversation_id, "updated_at": latest})
+
+        if rows:
+            # ORM bulk UPDATE by primary key: one executemany for the whole batch
+            self.db.execute(update(Conversation), rows)
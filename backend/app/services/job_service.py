@@ -0,0 +1,208 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Optional
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.database import SessionLocal
+from app.models import BackgroundJob, Conversation, JobStatus
+from app.services.chat_service import ChatService
+
+# A running job not finished within this long is assumed lost (crashed worker) and retried
+JOB_LEASE_SECONDS = 300
+
+# Longest delay between retries of a failing job
+MAX_RETRY_DELAY_SECONDS = 300
+
+# kind -> handler(db, conversation_id), registered with @job_handler
+JOB_HANDLERS: Dict[str, Callable[[Session, Optional[int]], None]] = {}
+
+
+def job_handler(kind: str):
+    """Register a function as the handler for a job kind"""
+    def register(fn):
+        JOB_HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+@job_handler("generate_title")
+def generate_title(db: Session, conversation_id: Optional[int]) -> None:
+    conversation = db.get(Conversation, conversation_id)
+    if conversation is None or conversation.title:
+        return
+    conversation.title = ChatService(db).auto_generate_title(conversation)
+    db.commit()
+
+
+class JobService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def enqueue(self, kind: str, conversation_id: Optional[int] = None) -> bool:
+        """
+        Queue a job unless the same kind is already queued for the conversation
+
+        Returns:
+            False if it was deduplicated
+        """
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        values = {
+            "kind": kind,
+            "conversation_id": conversation_id,
+            "dedup_key": f"{kind}:{conversation_id}" if conversation_id is not None else None,
+            "status": JobStatus.PENDING,
+            "attempts": 0,
+        }
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "postgresql":
+            stmt = postgresql.insert(BackgroundJob).values(values)
+        elif dialect == "sqlite":
+            stmt = sqlite.insert(BackgroundJob).values(values)
+        else:
+            raise RuntimeError(f"Job queue is not supported on {dialect}")
+
+        result = self.db.execute(stmt.on_conflict_do_nothing(index_elements=[BackgroundJob.dedup_key]))
+        self.db.commit()
+        return result.rowcount == 1
+
+    def claim(self) -> Optional[BackgroundJob]:
+        """Take the oldest runnable job (or one whose worker died), or None if there is none"""
+        now = datetime.now(timezone.utc)
+        while True:
+            job = self.db.query(BackgroundJob).filter(or_(
+                (BackgroundJob.status == JobStatus.PENDING) & (BackgroundJob.run_after <= func.now()),
+                (BackgroundJob.status == JobStatus.RUNNING)
+                & (BackgroundJob.locked_at < now - timedelta(seconds=JOB_LEASE_SECONDS))
+            )).order_by(BackgroundJob.id).limit(1).with_for_update(skip_locked=True).first()
+            if job is None:
+                self.db.rollback()
+                return None
+
+            # Optimistic claim: bumping attempts means only one worker's UPDATE matches
+            result = self.db.execute(
+                update(BackgroundJob)
+                .where(BackgroundJob.id == job.id, BackgroundJob.attempts == job.attempts)
+                .values(status=JobStatus.RUNNING, attempts=job.attempts + 1, locked_at=now)
+            )
+            self.db.commit()
+            if result.rowcount == 1:
+                self.db.refresh(job)
+                return job
+
+    def complete(self, job: BackgroundJob) -> None:
+        job.status = JobStatus.DONE
+        job.dedup_key = None  # Let the next job for this conversation be queued
+        job.error = None
+        job.finished_at = datetime.now(timezone.utc)
+        self.db.commit()
+
+    def fail(self, job: BackgroundJob, error: str, max_attempts: int) -> None:
+        """Schedule a retry with exponential backoff, or give up after max_attempts"""
+        job.error = error
+        if job.attempts >= max_attempts:
+            job.status = JobStatus.FAILED
+            job.dedup_key = None
+            job.finished_at = datetime.now(timezone.utc)
+        else:
+            job.status = JobStatus.PENDING
+            delay = min(2 ** job.attempts, MAX_RETRY_DELAY_SECONDS)
+            job.run_after = datetime.now(timezone.utc) + timedelta(seconds=delay)
+        self.db.commit()
+
+    def queue_depth(self) -> Dict[str, int]:
+        counts = dict(self.db.execute(
+            select(BackgroundJob.status, func.count(BackgroundJob.id))
+            .where(BackgroundJob.status.in_([JobStatus.PENDING, JobStatus.RUNNING, JobStatus.FAILED]))
+            .group_by(BackgroundJob.status)
+        ).all())
+        return {status.value: counts.get(status, 0) for status in (JobStatus.PENDING, JobStatus.RUNNING, JobStatus.FAILED)}
+
+
+class JobWorker:
+    """Pool of asyncio tasks running queued jobs after the response has been sent"""
+
+    def __init__(self, workers: int, poll_seconds: float, max_attempts: int):
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.processed = 0
+        self.failed_attempts = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks = []
+
+    def enqueue(self, db: Session, kind: str, conversation_id: Optional[int] = None) -> bool:
+        """Queue a job and wake the pool (safe to call from request threads)"""
+        queued = JobService(db).enqueue(kind, conversation_id)
+        if queued:
+            self.notify()
+        return queued
+
+    def notify(self) -> None:
+        if self._loop is not None:
+            # asyncio.Event isn't thread-safe, so set it from the loop
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _run_one(self) -> bool:
+        """Run one job to completion; False if the queue had nothing runnable"""
+        db = SessionLocal()
+        try:
+            service = JobService(db)
+            job = service.claim()
+            if job is None:
+                return False
+            try:
+                JOB_HANDLERS[job.kind](db, job.conversation_id)
+                service.complete(job)
+                self.processed += 1
+            except Exception as e:
+                db.rollback()
+                print(f"⚠️ Job {job.kind} #{job.id} failed (attempt {job.attempts}): {e}")
+                service.fail(job, str(e), self.max_attempts)
+                self.failed_attempts += 1
+            return True
+        finally:
+            db.close()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                # The database work is synchronous, so keep it off the event loop
+                if await asyncio.to_thread(self._run_one):
+                    continue
+            except Exception as e:
+                print(f"❌ Job worker error: {e}")
+            try:
+                # Polling also picks up retries that come due and jobs queued by other workers
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+            self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        self._loop = None
+
+    def stats(self) -> dict:
+        db = SessionLocal()
+        try:
+            depth = JobService(db).queue_depth()
+        finally:
+            db.close()
+        return {"workers": len(self._tasks), "processed": self.processed, "failed_attempts": self.failed_attempts, "queue": depth}
+
+
+# Global worker pool
+job_worker = JobWorker(settings.job_workers, settings.job_poll_seconds, settings.job_max_attempts)
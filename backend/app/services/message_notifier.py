@@ -0,0 +1,58 @@
+import asyncio
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Set
+
+
+class MessageNotifier:
+    """
+    Wakes long-poll requests when one of a user's conversations gets a message
+
+    In-process only: waiters in other workers aren't woken and fall back to
+    their timeout, so waits should stay short. notify() is safe to call from
+    any thread (message writes also happen in worker threads).
+    """
+
+    def __init__(self):
+        self._waiters: Dict[int, Set[asyncio.Event]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def listen(self, user_id: int) -> Iterator[asyncio.Event]:
+        """
+        Register for the user's next message before checking for new data
+
+        Registering first means a message committed between the check and the
+        wait still wakes the waiter.
+        """
+        self._loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        with self._lock:
+            self._waiters.setdefault(user_id, set()).add(event)
+        try:
+            yield event
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(user_id)
+                if waiters is not None:
+                    waiters.discard(event)
+                    if not waiters:
+                        del self._waiters[user_id]
+
+    def notify(self, user_id: int) -> None:
+        with self._lock:
+            waiters = list(self._waiters.get(user_id, ()))
+        if not waiters or self._loop is None:
+            return
+        for event in waiters:
+            # asyncio.Event isn't thread-safe, so set it from the loop
+            self._loop.call_soon_threadsafe(event.set)
+
+    def waiting(self) -> int:
+        with self._lock:
+            return sum(len(waiters) for waiters in self._waiters.values())
+
+
+# Global notifier for this process
+message_notifier = MessageNotifier()
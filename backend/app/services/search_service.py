@@ -0,0 +1,264 @@
+import base64
+import json
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import select, text, inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from app.models import AgentType, Conversation, MessageRole
+from app.chat.schemas import SearchResult, SearchResponse
+from app.services.archive_service import conversation_archive
+
+# SQLite: external-content FTS5 table kept in sync with messages by triggers
+SQLITE_SEARCH_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+        content, content='messages', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS messages_fts_ai AFTER INSERT ON messages BEGIN
+        INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS messages_fts_ad AFTER DELETE ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS messages_fts_au AFTER UPDATE OF content ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content);
+    END""",
+]
+
+# Postgres: stored generated tsvector column (maintained on insert/COPY) with a GIN index
+POSTGRES_SEARCH_DDL = [
+    """ALTER TABLE messages ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (to_tsvector('english', content)) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_messages_search_vector ON messages USING GIN (search_vector)",
+]
+
+# Lower score ranks first on both backends (Postgres ts_rank is negated). The user's
+# messages are narrowed down before anything is matched or scored. Scores are float8
+# so the value echoed back in a cursor compares exactly, and the message id breaks ties.
+SQLITE_SEARCH_SQL = """
+SELECT * FROM (
+    SELECT m.id, m.conversation_id, c.title, m.role, m.agent_type, m.created_at,
+           bm25(messages_fts) AS score,
+           snippet(messages_fts, 0, '[', ']', '…', 16) AS snippet
+    FROM messages_fts
+    JOIN messages m ON m.id = messages_fts.rowid
+    JOIN conversations c ON c.id = m.conversation_id
+    WHERE messages_fts.rowid IN (
+            SELECT um.id FROM messages um
+            JOIN conversations uc ON uc.id = um.conversation_id
+            WHERE uc.user_id = :user_id
+        )
+      AND messages_fts MATCH :query
+      {agent_filter}
+) AS hits
+{cursor_filter}
+ORDER BY score, id
+LIMIT :limit
+"""
+
+POSTGRES_SEARCH_SQL = """
+SELECT hits.*, ts_headline('english', m.content, websearch_to_tsquery('english', :query),
+                           'StartSel=[, StopSel=], MaxWords=16, MinWords=8') AS snippet
+FROM (
+    SELECT * FROM (
+        SELECT m.id, m.conversation_id, c.title, m.role, m.agent_type, m.created_at,
+               (-ts_rank(m.search_vector, websearch_to_tsquery('english', :query)))::float8 AS score
+        FROM conversations c
+        JOIN messages m ON m.conversation_id = c.id
+        WHERE c.user_id = :user_id
+          AND m.search_vector @@ websearch_to_tsquery('english', :query)
+          {agent_filter}
+    ) AS ranked
+    {cursor_filter}
+    ORDER BY score, id
+    LIMIT :limit
+) AS hits
+JOIN messages m ON m.id = hits.id
+ORDER BY hits.score, hits.id
+"""
+
+CURSOR_FILTER = "WHERE score > :cursor_score OR (score = :cursor_score AND id > :cursor_id)"
+
+# Archived messages aren't in the full-text index; they match on plain terms and
+# get this score, which ranks them after every indexed hit
+ARCHIVED_SCORE = 0.0
+
+# Characters of context either side of the first matched term in an archived snippet
+ARCHIVED_SNIPPET_CONTEXT = 60
+
+
+def ensure_search_index(engine: Engine) -> None:
+    """Create the full-text index for messages if it doesn't exist yet (idempotent)"""
+    dialect = engine.dialect.name
+    with engine.begin() as conn:
+        if dialect == "sqlite":
+            is_new = not inspect(conn).has_table("messages_fts")
+            for statement in SQLITE_SEARCH_DDL:
+                conn.execute(text(statement))
+            if is_new:
+                # Index the messages that were written before the triggers existed
+                conn.execute(text("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')"))
+        elif dialect == "postgresql":
+            for statement in POSTGRES_SEARCH_DDL:
+                conn.execute(text(statement))
+        else:
+            raise RuntimeError(f"Full-text search is not supported on {dialect}")
+
+
+def encode_cursor(score: float, message_id: int) -> str:
+    # JSON keeps the float's full repr, so the score round-trips exactly
+    return base64.urlsafe_b64encode(json.dumps([score, message_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        score, message_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(score), int(message_id)
+    except Exception:
+        raise ValueError("Invalid search cursor")
+
+
+def _fts5_query(query: str) -> str:
+    """Quote each term so user input can't trip FTS5 query syntax (terms are ANDed)"""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in query.split())
+
+
+def _plain_snippet(content: str, terms: List[str]) -> str:
+    """Text around the first matched term, terms bracketed like the indexed snippets"""
+    first = min(content.lower().find(term) for term in terms)
+    start = max(0, first - ARCHIVED_SNIPPET_CONTEXT)
+    end = min(len(content), first + ARCHIVED_SNIPPET_CONTEXT)
+    pattern = re.compile("|".join(re.escape(term) for term in terms), re.IGNORECASE)
+    snippet = pattern.sub(lambda match: f"[{match.group(0)}]", content[start:end])
+    return ("…" if start else "") + snippet + ("…" if end < len(content) else "")
+
+
+class SearchService:
+    def __init__(self, db: Session):
+        self.db = db
+        self.dialect = db.get_bind().dialect.name
+
+    def search_messages(
+        self,
+        user_id: int,
+        query: str,
+        agent_type: Optional[AgentType] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        include_archived: bool = False
+    ) -> SearchResponse:
+        """
+        Ranked full-text search over a user's messages
+
+        Args:
+            user_id: Only search this user's conversations
+            query: Search terms
+            agent_type: Only return messages written by this agent
+            limit: Page size
+            cursor: next_cursor from the previous page (keyset pagination)
+            include_archived: Also scan archived conversations (slow, see _search_archived)
+        """
+        if not query.strip():
+            return SearchResponse(results=[], next_cursor=None)
+
+        params = {"user_id": user_id, "limit": limit}
+
+        if self.dialect == "sqlite":
+            sql = SQLITE_SEARCH_SQL
+            params["query"] = _fts5_query(query)
+        elif self.dialect == "postgresql":
+            sql = POSTGRES_SEARCH_SQL
+            params["query"] = query
+        else:
+            raise RuntimeError(f"Full-text search is not supported on {self.dialect}")
+
+        agent_filter = ""
+        if agent_type:
+            # Enum columns store member names
+            agent_filter = "AND m.agent_type = :agent_type"
+            params["agent_type"] = agent_type.name
+
+        cursor_filter = ""
+        if cursor:
+            params["cursor_score"], params["cursor_id"] = decode_cursor(cursor)
+            cursor_filter = CURSOR_FILTER
+
+        rows = [dict(row) for row in self.db.execute(
+            text(sql.format(agent_filter=agent_filter, cursor_filter=cursor_filter)),
+            params
+        ).mappings()]
+
+        # A full page that ends before ARCHIVED_SCORE can't have archived hits on it
+        if include_archived and (len(rows) < limit or rows[-1]["score"] >= ARCHIVED_SCORE):
+            archived = self._search_archived(user_id, query, agent_type, params.get("cursor_score"),
+                                             params.get("cursor_id"), limit)
+            rows = sorted(rows + archived, key=lambda row: (row["score"], row["id"]))[:limit]
+
+        results = [
+            SearchResult(
+                message_id=row["id"],
+                conversation_id=row["conversation_id"],
+                conversation_title=row["title"],
+                role=MessageRole[row["role"]],
+                agent_type=AgentType[row["agent_type"]] if row["agent_type"] else None,
+                snippet=row["snippet"],
+                created_at=row["created_at"],
+                score=row["score"]
+            )
+            for row in rows
+        ]
+
+        next_cursor = None
+        if len(rows) == limit:
+            next_cursor = encode_cursor(rows[-1]["score"], rows[-1]["id"])
+
+        return SearchResponse(results=results, next_cursor=next_cursor)
+
+    def _search_archived(
+        self,
+        user_id: int,
+        query: str,
+        agent_type: Optional[AgentType],
+        cursor_score: Optional[float],
+        cursor_id: Optional[int],
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Archived messages containing every query term, as rows shaped like the SQL results
+
+        Reads each of the user's archived conversations from its segment, so it
+        costs a decompression per archived conversation; only run when the
+        caller asks for archived results.
+        """
+        if cursor_score is not None and cursor_score > ARCHIVED_SCORE:
+            return []
+
+        titles = dict(self.db.execute(
+            select(Conversation.id, Conversation.title).where(Conversation.user_id == user_id)
+        ).all())
+        terms = query.lower().split()
+
+        hits = []
+        for conversation_id in conversation_archive.archived(titles):
+            for record in conversation_archive.read_messages(conversation_id):
+                if cursor_score == ARCHIVED_SCORE and record["id"] <= cursor_id:
+                    continue
+                if agent_type and record["agent_type"] != agent_type.value:
+                    continue
+                content = record["content"].lower()
+                if not all(term in content for term in terms):
+                    continue
+                hits.append({
+                    "id": record["id"],
+                    "conversation_id": conversation_id,
+                    "title": titles[conversation_id],
+                    # Rows carry enum names, as stored in the hot table
+                    "role": MessageRole(record["role"]).name,
+                    "agent_type": AgentType(record["agent_type"]).name if record["agent_type"] else None,
+                    "created_at": datetime.fromisoformat(record["created_at"]) if record["created_at"] else None,
+                    "score": ARCHIVED_SCORE,
+                    "snippet": _plain_snippet(record["content"], terms),
+                })
+        return sorted(hits, key=lambda hit: hit["id"])[:limit]
@@ -0,0 +1,321 @@
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from sqlalchemy import delete, or_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.user_cache import user_cache
+from app.database import SessionLocal
+from app.models import User, Conversation, Message, WebhookEvent, WebhookEventStatus
+from app.services.archive_service import conversation_archive
+from app.services.chat_service import ChatService
+from app.services.history_cache import history_cache
+
+# Give up on an event after this many failed attempts
+MAX_WEBHOOK_ATTEMPTS = 5
+
+# Conversations whose messages are deleted per transaction on user.deleted
+DELETE_BATCH_SIZE = 500
+
+# A claimed event not finished within this long is assumed lost (crashed worker) and claimed again
+WEBHOOK_LEASE_SECONDS = 300
+
+# How often a worker deletes processed events past the retention period
+PURGE_INTERVAL_SECONDS = 3600
+
+UPSERT_EVENT_TYPES = ("user.created", "user.updated")
+
+
+def _primary_email(user_data: Dict[str, Any]) -> Optional[str]:
+    email_addresses = user_data.get("email_addresses", [])
+    return email_addresses[0].get("email_address") if email_addresses else None
+
+
+class WebhookService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def enqueue(self, svix_id: str, event_type: Optional[str], body: bytes) -> bool:
+        """
+        Persist a raw webhook event for the background worker
+
+        Returns:
+            False if an event with this svix-id was already received (a Clerk retry)
+        """
+        values = {
+            "svix_id": svix_id,
+            "event_type": event_type,
+            "payload": body.decode(),
+            "status": WebhookEventStatus.PENDING,
+            "attempts": 0,
+        }
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "postgresql":
+            stmt = postgresql.insert(WebhookEvent).values(values)
+        elif dialect == "sqlite":
+            stmt = sqlite.insert(WebhookEvent).values(values)
+        else:
+            raise RuntimeError(f"Webhook queue is not supported on {dialect}")
+
+        result = self.db.execute(stmt.on_conflict_do_nothing(index_elements=[WebhookEvent.svix_id]))
+        self.db.commit()
+        return result.rowcount == 1
+
+    def pending_count(self) -> int:
+        return self.db.query(WebhookEvent).filter(
+            WebhookEvent.status == WebhookEventStatus.PENDING
+        ).count()
+
+    def claim(self, batch_size: int) -> List[WebhookEvent]:
+        """
+        Claim up to batch_size pending events in arrival order
+
+        The claim is committed before the events are applied. Applying them
+        commits as it goes (which releases row locks), so the claim token is
+        what keeps other workers from picking up the same events.
+        """
+        now = datetime.now(timezone.utc)
+        claimable = (WebhookEvent.status == WebhookEventStatus.PENDING) & or_(
+            WebhookEvent.claimed_at.is_(None),
+            WebhookEvent.claimed_at < now - timedelta(seconds=WEBHOOK_LEASE_SECONDS)
+        )
+        # SKIP LOCKED only keeps workers from blocking on each other (Postgres)
+        event_ids = [
+            event_id for (event_id,) in
+            self.db.query(WebhookEvent.id).filter(claimable)
+            .order_by(WebhookEvent.id).limit(batch_size).with_for_update(skip_locked=True)
+        ]
+        if not event_ids:
+            self.db.rollback()
+            return []
+
+        # Re-checking claimable means only one worker's UPDATE matches each event
+        token = uuid.uuid4().hex
+        self.db.execute(
+            update(WebhookEvent)
+            .where(WebhookEvent.id.in_(event_ids), claimable)
+            .values(claim_token=token, claimed_at=now)
+        )
+        self.db.commit()
+        return self.db.query(WebhookEvent).filter(
+            WebhookEvent.claim_token == token
+        ).order_by(WebhookEvent.id).all()
+
+    def process_pending(self, batch_size: int) -> int:
+        """
+        Process one batch of pending events in arrival order
+
+        Returns:
+            Number of events processed successfully
+        """
+        events = self.claim(batch_size)
+        if not events:
+            return 0
+
+        try:
+            self._apply(events)
+            self._mark_processed(events)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            print(f"⚠️ Webhook batch failed ({e}), retrying events one by one")
+            event_ids = [event.id for event in events]
+            return sum(self._process_single(event_id) for event_id in event_ids)
+        return len(events)
+
+    def _process_single(self, event_id: int) -> bool:
+        event = self.db.get(WebhookEvent, event_id)
+        try:
+            self._apply([event])
+            self._mark_processed([event])
+            self.db.commit()
+            return True
+        except Exception as e:
+            self.db.rollback()
+            event = self.db.get(WebhookEvent, event_id)
+            event.attempts += 1
+            event.error = str(e)
+            # Keep claimed_at so the event is retried once its lease runs out, not in this drain
+            event.claim_token = None
+            if event.attempts >= MAX_WEBHOOK_ATTEMPTS:
+                event.status = WebhookEventStatus.FAILED
+                print(f"❌ Webhook event {event.svix_id} failed permanently: {e}")
+            self.db.commit()
+            return False
+
+    def _mark_processed(self, events: List[WebhookEvent]) -> None:
+        now = datetime.now(timezone.utc)
+        for event in events:
+            event.status = WebhookEventStatus.PROCESSED
+            event.attempts += 1
+            event.error = None
+            event.processed_at = now
+            event.claim_token = None
+
+    def purge_processed(self, retention_days: int) -> int:
+        """
+        Delete processed events older than the retention period
+
+        Returns:
+            Number of events deleted
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+        result = self.db.execute(delete(WebhookEvent).where(
+            WebhookEvent.status == WebhookEventStatus.PROCESSED,
+            WebhookEvent.processed_at < cutoff
+        ))
+        self.db.commit()
+        return result.rowcount
+
+    def _apply(self, events: List[WebhookEvent]) -> None:
+        """
+        Apply events in order, batching consecutive upserts and deletes
+
+        Upserts and deletes commit as they go; both are idempotent, so a batch
+        that fails halfway can simply be applied again.
+        """
+        upserts: List[tuple] = []
+        deletes: List[str] = []
+
+        for event in events:
+            user_data = json.loads(event.payload).get("data", {})
+            clerk_user_id = user_data.get("id")
+            if not clerk_user_id:
+                continue
+
+            if event.event_type in UPSERT_EVENT_TYPES:
+                if deletes:
+                    self.delete_users(deletes)
+                    deletes = []
+                email = _primary_email(user_data)
+                if email:
+                    upserts.append((clerk_user_id, email))
+            elif event.event_type == "user.deleted":
+                if upserts:
+                    self._upsert(upserts)
+                    upserts = []
+                deletes.append(clerk_user_id)
+
+        if upserts:
+            self._upsert(upserts)
+        if deletes:
+            self.delete_users(deletes)
+
+    def _upsert(self, users: List[tuple]) -> None:
+        ChatService(self.db).upsert_users(users)
+        for clerk_user_id, _ in users:
+            user_cache.invalidate(clerk_user_id)
+
+    def delete_users(self, clerk_user_ids: List[str]) -> int:
+        """
+        Delete users with their conversations and messages in batches
+
+        Returns:
+            Number of users deleted
+        """
+        user_ids = [
+            user_id for (user_id,) in
+            self.db.query(User.id).filter(User.clerk_user_id.in_(clerk_user_ids))
+        ]
+        for clerk_user_id in clerk_user_ids:
+            user_cache.invalidate(clerk_user_id)
+        if not user_ids:
+            return 0
+
+        conversation_ids = [
+            conversation_id for (conversation_id,) in
+            self.db.query(Conversation.id).filter(Conversation.user_id.in_(user_ids))
+        ]
+        # Archive first: a retry after a failure here still finds the conversations
+        conversation_archive.forget(conversation_ids)
+
+        # Short transactions so a big account doesn't hold locks for long
+        for start in range(0, len(conversation_ids), DELETE_BATCH_SIZE):
+            batch = conversation_ids[start:start + DELETE_BATCH_SIZE]
+            self.db.execute(delete(Message).where(Message.conversation_id.in_(batch)))
+            self.db.execute(delete(Conversation).where(Conversation.id.in_(batch)))
+            self.db.commit()
+            for conversation_id in batch:
+                history_cache.invalidate(conversation_id)
+
+        self.db.execute(delete(User).where(User.id.in_(user_ids)))
+        return len(user_ids)
+
+
+class WebhookWorker:
+    """Background task that drains the webhook_events queue"""
+
+    def __init__(self, batch_size: int, poll_seconds: float, retention_days: int):
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.retention_days = retention_days
+        self.processed = 0
+        self.purged = 0
+        self._last_purge = 0.0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def notify(self) -> None:
+        """Wake the worker right away instead of at the next poll"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _drain(self) -> int:
+        db = SessionLocal()
+        try:
+            service = WebhookService(db)
+            if time.monotonic() - self._last_purge > PURGE_INTERVAL_SECONDS:
+                self.purged += service.purge_processed(self.retention_days)
+                self._last_purge = time.monotonic()
+
+            total = 0
+            while True:
+                count = service.process_pending(self.batch_size)
+                total += count
+                # A short or partly failed batch means we're done until the next wakeup
+                if count < self.batch_size:
+                    return total
+        finally:
+            db.close()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                # The database work is synchronous, so keep it off the event loop
+                self.processed += await asyncio.to_thread(self._drain)
+            except Exception as e:
+                print(f"❌ Webhook worker error: {e}")
+            try:
+                # Polling also picks up events received by other workers
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> dict:
+        db = SessionLocal()
+        try:
+            pending = WebhookService(db).pending_count()
+        finally:
+            db.close()
+        return {"processed": self.processed, "pending": pending, "purged": self.purged}
+
+
+# Global worker instance
+webhook_worker = WebhookWorker(
+    settings.webhook_batch_size, settings.webhook_poll_seconds, settings.webhook_retention_days
+)
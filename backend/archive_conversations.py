@@ -0,0 +1,27 @@
+import argparse
+from app.core.config import settings
+from app.database import SessionLocal
+from app.services.archive_service import conversation_archive
+
+
+def archive_conversations():
+    """Move messages of inactive conversations into cold storage"""
+    parser = argparse.ArgumentParser(description="Archive inactive conversations")
+    parser.add_argument("--days", type=int, default=settings.archive_after_days,
+                        help="Archive conversations idle for more than this many days")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        stats = conversation_archive.archive_inactive(db, args.days)
+        print(f"✅ Archived {stats['conversations']} conversations "
+              f"({stats['messages']} messages) to {conversation_archive.archive_dir}")
+    except Exception as e:
+        print(f"❌ Archival failed: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    archive_conversations()
@@ -0,0 +1,85 @@
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime
+from conversation_store import ConversationStore, StoredMessage
+from main import ConversationResponse
+
+
+def build_store(conversations: int, updates: int) -> ConversationStore:
+    rng = random.Random(42)
+    store = ConversationStore(max_conversations=conversations, ttl_seconds=86400)
+    ids = [f"conv-{i}" for i in range(conversations)]
+    for conversation_id in ids:
+        store.create(conversation_id, f"Conversation {conversation_id}")
+    # Replies land on random conversations, moving them to the front of the index
+    for i in range(updates):
+        conversation = store.get(rng.choice(ids))
+        store.add_messages(conversation, [StoredMessage(str(i), "user", "hello", time.time(), "sent")])
+    return store
+
+
+def to_response(conv) -> ConversationResponse:
+    return ConversationResponse(
+        id=conv.id,
+        title=conv.title,
+        created_at=datetime.fromtimestamp(conv.created_at),
+        updated_at=datetime.fromtimestamp(conv.updated_at),
+        message_count=len(conv.messages),
+        last_message=conv.messages[-1].content if conv.messages else None
+    )
+
+
+def legacy_listing(store: ConversationStore, limit: int) -> list:
+    """The previous endpoint: a response for every conversation, then a full sort"""
+    conversations = [to_response(conv) for conv in store._conversations.values()]
+    return sorted(conversations, key=lambda x: x.updated_at, reverse=True)[:limit]
+
+
+def indexed_listing(store: ConversationStore, limit: int) -> list:
+    return [to_response(conv) for conv in store.recent(limit)]
+
+
+def timed(fn, runs: int, *args) -> tuple:
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times), result
+
+
+def benchmark_conversation_index():
+    parser = argparse.ArgumentParser(description="Benchmark conversation listing with and without the updated_at index")
+    parser.add_argument("--conversations", type=int, default=100_000)
+    parser.add_argument("--updates", type=int, default=50_000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    store = build_store(args.conversations, args.updates)
+    print(f"{args.conversations} conversations after {args.updates} updates, page of {args.limit}, median of {args.runs} runs\n")
+
+    baseline, expected = timed(legacy_listing, args.runs, store, args.limit)
+    elapsed, page = timed(indexed_listing, args.runs, store, args.limit)
+    assert [c.id for c in page] == [c.id for c in expected], "index order differs from a full sort"
+    print(f"{'legacy (build all + sort)':28} {baseline * 1000:10.2f} ms")
+    print(f"{'updated_at index':28} {elapsed * 1000:10.2f} ms  ({baseline / elapsed:.0f}x)")
+
+    last = store.recent(args.limit)[-1]
+    cursor = (last.updated_at, last.id)
+    elapsed, _ = timed(lambda: [to_response(c) for c in store.recent(args.limit, cursor)], args.runs)
+    print(f"{'next page (before cursor)':28} {elapsed * 1000:10.2f} ms")
+
+    ids = list(store._conversations)
+    rng = random.Random(7)
+    message = StoredMessage("x", "user", "hello", time.time(), "sent")
+    t0 = time.perf_counter()
+    for _ in range(10_000):
+        store.add_messages(store.get(rng.choice(ids)), [message])
+    print(f"{'index update per message':28} {(time.perf_counter() - t0) / 10_000 * 1e6:10.2f} us")
+
+
+if __name__ == "__main__":
+    benchmark_conversation_index()
@@ -0,0 +1,104 @@
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from main import ConnectionManager, conversation_topic
+
+
+class SimulatedSocket:
+    """Stand-in for a WebSocket with a fixed send latency, or one that hangs or fails"""
+
+    def __init__(self, latency: float, behaviour: str = "ok"):
+        self.latency = latency
+        self.behaviour = behaviour
+        self.received = 0
+        self.last_received_at = 0.0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message: str):
+        if self.behaviour == "dead":
+            raise ConnectionResetError("simulated dead connection")
+        await asyncio.sleep(3600 if self.behaviour == "slow" else self.latency)
+        self.received += 1
+        self.last_received_at = time.perf_counter()
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+async def sequential_broadcast(sockets, message: str):
+    """The old ConnectionManager.broadcast: every socket, one after another"""
+    for socket in sockets:
+        try:
+            await asyncio.wait_for(socket.send_text(message), 0.05)
+        except Exception:
+            pass
+
+
+async def run(args):
+    rng = random.Random(42)
+    manager = ConnectionManager(queue_size=args.queue_size, slow_consumer_policy=args.policy, send_timeout=2.0)
+
+    sockets = []
+    for i in range(args.sockets):
+        roll = rng.random()
+        behaviour = "slow" if roll < args.slow_fraction else "dead" if roll < args.slow_fraction + args.dead_fraction else "ok"
+        socket = SimulatedSocket(args.latency, behaviour)
+        await manager.connect(socket, [conversation_topic(str(i % args.conversations))])
+        sockets.append(socket)
+
+    healthy = [s for s in sockets if s.behaviour == "ok"]
+    publish_times = []
+    start = time.perf_counter()
+    for n in range(args.messages):
+        message = json.dumps({"type": "message", "n": n, "content": "x" * 200})
+        t0 = time.perf_counter()
+        # Every message goes to every conversation topic: the worst case for fan-out
+        await manager.publish([conversation_topic(str(c)) for c in range(args.conversations)], message)
+        publish_times.append(time.perf_counter() - t0)
+        await asyncio.sleep(args.interval)
+
+    expected = args.messages
+    deadline = time.perf_counter() + 30
+    while any(s.received < expected for s in healthy) and time.perf_counter() < deadline:
+        await asyncio.sleep(0.01)
+    delivered_at = max(s.last_received_at for s in healthy) - start
+
+    print(f"Sockets:            {args.sockets} ({len(healthy)} healthy, policy={args.policy})")
+    print(f"Publish (enqueue):  median {statistics.median(publish_times) * 1000:.2f} ms, "
+          f"max {max(publish_times) * 1000:.2f} ms per message")
+    print(f"All healthy delivered in {delivered_at:.2f}s "
+          f"({sum(s.received for s in healthy)}/{expected * len(healthy)} messages)")
+    print(f"Manager stats:      {manager.stats()}")
+
+    for subscriber in list(manager.active_connections.values()):
+        subscriber.task.cancel()
+
+    if args.compare:
+        t0 = time.perf_counter()
+        await sequential_broadcast(sockets, "x")
+        print(f"Old sequential broadcast of one message: {time.perf_counter() - t0:.2f}s")
+
+
+def benchmark_fanout():
+    parser = argparse.ArgumentParser(description="Benchmark WebSocket fan-out with simulated sockets")
+    parser.add_argument("--sockets", type=int, default=5000)
+    parser.add_argument("--conversations", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--interval", type=float, default=0.01, help="Seconds between publishes")
+    parser.add_argument("--latency", type=float, default=0.002, help="Send latency of a healthy socket")
+    parser.add_argument("--slow-fraction", type=float, default=0.02, help="Sockets that never finish a send")
+    parser.add_argument("--dead-fraction", type=float, default=0.02, help="Sockets whose sends fail")
+    parser.add_argument("--queue-size", type=int, default=100)
+    parser.add_argument("--policy", choices=["drop", "disconnect"], default="drop")
+    parser.add_argument("--compare", action="store_true", help="Also time the old sequential broadcast")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    benchmark_fanout()
@@ -0,0 +1,113 @@
+import argparse
+import itertools
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timezone
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.models import User, Conversation, Message, MessageRole, AgentType
+from app.services.search_service import SearchService, ensure_search_index
+
+TOPIC_WORDS = (
+    "plan goal schedule week study exam chapter story character idea feel anxious "
+    "data analysis reason budget habit morning project deadline write poem explain "
+    "concept practice review energy focus team meeting travel routine sleep"
+).split()
+
+# Zipf-like vocabulary so term frequencies look like real chat text
+VOCABULARY_SIZE = 20000
+
+QUERIES = ["plan", "study exam", "story character", "budget analysis", "morning routine", "anxious"]
+
+
+def build_corpus(engine, users: int, conversations_per_user: int, messages: int):
+    """Insert a synthetic corpus in large executemany batches"""
+    rng = random.Random(42)
+    now = datetime.now(timezone.utc)
+    agents = list(AgentType)
+    vocabulary = [f"w{i}" for i in range(VOCABULARY_SIZE)]
+    for i, word in enumerate(TOPIC_WORDS):
+        vocabulary[500 + i * 100] = word
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(VOCABULARY_SIZE)))
+
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"clerk_user_id": f"bench_{i}", "email": f"bench_{i}@example.com"} for i in range(users)
+        ])
+        conn.execute(insert(Conversation), [
+            {"user_id": u + 1, "title": f"Conversation {u}-{c}", "created_at": now, "updated_at": now}
+            for u in range(users) for c in range(conversations_per_user)
+        ])
+
+    total_conversations = users * conversations_per_user
+    batch = []
+    with engine.begin() as conn:
+        for i in range(messages):
+            is_user = i % 2 == 0
+            batch.append({
+                "conversation_id": rng.randint(1, total_conversations),
+                "content": " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=rng.randint(8, 60))),
+                "role": MessageRole.USER if is_user else MessageRole.ASSISTANT,
+                "agent_type": None if is_user else rng.choice(agents),
+                "created_at": now,
+            })
+            if len(batch) == 10000:
+                conn.execute(insert(Message), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(Message), batch)
+
+
+def benchmark_search():
+    """Measure full-text search latency on a large synthetic corpus"""
+    parser = argparse.ArgumentParser(description="Benchmark message full-text search")
+    parser.add_argument("--database-url", help="Database to fill (default: temporary SQLite file)")
+    parser.add_argument("--messages", type=int, default=500_000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--conversations-per-user", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=20, help="Runs per query")
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    if not database_url:
+        path = os.path.join(tempfile.mkdtemp(), "search_bench.db")
+        database_url = f"sqlite:///{path}"
+
+    engine = create_engine(database_url)
+    Base.metadata.create_all(engine)
+    ensure_search_index(engine)
+
+    print(f"📦 Building corpus of {args.messages} messages...")
+    started = time.perf_counter()
+    build_corpus(engine, args.users, args.conversations_per_user, args.messages)
+    print(f"   done in {time.perf_counter() - started:.1f}s")
+
+    db = sessionmaker(bind=engine)()
+    service = SearchService(db)
+    rng = random.Random(7)
+
+    timings = []
+    for query in QUERIES:
+        for _ in range(args.runs):
+            user_id = rng.randint(1, args.users)
+            agent_type = rng.choice([None, AgentType.PLANNING])
+            started = time.perf_counter()
+            page = service.search_messages(user_id, query, agent_type=agent_type)
+            if page.next_cursor:
+                service.search_messages(user_id, query, agent_type=agent_type, cursor=page.next_cursor)
+            timings.append((time.perf_counter() - started) * 1000 / (2 if page.next_cursor else 1))
+
+    db.close()
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"🔎 {len(timings)} searches: p50 {statistics.median(timings):.1f} ms, "
+          f"p95 {p95:.1f} ms, max {timings[-1]:.1f} ms")
+    print("✅ Under 50 ms at p95" if p95 < 50 else "❌ p95 is over 50 ms")
+
+
+if __name__ == "__main__":
+    benchmark_search()
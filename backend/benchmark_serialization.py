@@ -0,0 +1,108 @@
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.models import User, Conversation, Message, MessageRole, AgentType
+from app.chat.schemas import ChatMessage, ConversationDetail, CHAT_MESSAGE_ROW_FIELDS, CONVERSATION_DETAIL_ADAPTER
+from app.core.json_response import RESPONSE_CLASSES, json_response
+from app.services.chat_service import ChatService
+
+
+def build_conversation(engine, messages: int) -> int:
+    rng = random.Random(42)
+    start = datetime.now(timezone.utc) - timedelta(days=1)
+    agents = list(AgentType)
+    words = "plan study feel idea data story goal week focus explain".split()
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"clerk_user_id": "bench", "email": "bench@example.com"}])
+        conn.execute(insert(Conversation), [{"user_id": 1, "title": "Long thread", "created_at": start, "updated_at": start}])
+        conn.execute(insert(Message), [
+            {
+                "conversation_id": 1,
+                "content": " ".join(rng.choices(words, k=rng.randint(10, 120))),
+                "role": MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT,
+                "agent_type": None if i % 2 == 0 else rng.choice(agents),
+                "created_at": start + timedelta(seconds=i),
+            }
+            for i in range(messages)
+        ])
+    return 1
+
+
+def legacy_response(db, conversation_id: int) -> bytes:
+    """The previous path: ORM objects, a model per row, then FastAPI's response_model serialization"""
+    conversation = db.get(Conversation, conversation_id)
+    messages = [
+        ChatMessage(content=m.content, role=m.role, agent_type=m.agent_type, created_at=m.created_at)
+        for m in conversation.messages
+    ]
+    detail = ConversationDetail(
+        id=conversation.id, title=conversation.title, created_at=conversation.created_at,
+        updated_at=conversation.updated_at, messages=messages
+    )
+    field = create_response_field(name="response", type_=ConversationDetail)
+    content = asyncio.run(serialize_response(field=field, response_content=detail, is_coroutine=True))
+    return JSONResponse(content).body
+
+
+def fast_response(db, conversation_id: int, backend: str) -> bytes:
+    """The get_conversation path: plain rows validated in one pass, encoded by the chosen backend"""
+    conversation = db.get(Conversation, conversation_id)
+    rows = ChatService(db).get_conversation_message_rows(conversation_id)
+    detail = CONVERSATION_DETAIL_ADAPTER.validate_python({
+        "id": conversation.id,
+        "title": conversation.title,
+        "created_at": conversation.created_at,
+        "updated_at": conversation.updated_at,
+        "messages": [dict(zip(CHAT_MESSAGE_ROW_FIELDS, row)) for row in rows]
+    })
+    return json_response(detail, CONVERSATION_DETAIL_ADAPTER, backend).body
+
+
+def timed(fn, runs: int, Session, *args) -> tuple:
+    times = []
+    for _ in range(runs):
+        db = Session()
+        t0 = time.perf_counter()
+        body = fn(db, *args)
+        times.append(time.perf_counter() - t0)
+        db.close()
+    return statistics.median(times), len(body)
+
+
+def benchmark_serialization():
+    parser = argparse.ArgumentParser(description="Benchmark conversation detail serialization")
+    parser.add_argument("--messages", type=int, default=10_000)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "serialization.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    conversation_id = build_conversation(engine, args.messages)
+    print(f"Conversation with {args.messages} messages, median of {args.runs} runs (query + build + encode)\n")
+
+    baseline, size = timed(legacy_response, args.runs, Session, conversation_id)
+    print(f"{'legacy (ORM + response_model)':32} {baseline * 1000:8.1f} ms  {size / 1024:.0f} KB")
+    for backend in RESPONSE_CLASSES:
+        try:
+            elapsed, size = timed(fast_response, args.runs, Session, conversation_id, backend)
+        except ImportError:
+            print(f"{'rows + ' + backend:32} (not installed)")
+            continue
+        print(f"{'rows + ' + backend:32} {elapsed * 1000:8.1f} ms  {size / 1024:.0f} KB  ({baseline / elapsed:.1f}x)")
+
+
+if __name__ == "__main__":
+    benchmark_serialization()
@@ -0,0 +1,325 @@
+"""
+Bounded in-memory conversation store for the development server
+
+Conversations are kept in least-recently-used order and evicted once there
+are more than max_conversations or one has not been touched for ttl_seconds.
+Messages are stored as compact tuples rather than Pydantic models, and the
+whole store can be snapshotted to a JSON file periodically and reloaded at
+startup so a restart doesn't lose every conversation.
+
+Besides the LRU order, conversations are linked newest-updated first, so a
+page of the most recently updated conversations costs O(page size) instead
+of a sort over the whole store. Pages are keyed by (updated_at, id), which
+is unique and strictly descending along the index.
+"""
+import asyncio
+import heapq
+import json
+import math
+import os
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+
+def encode_cursor(conversation: "StoredConversation") -> str:
+    """Page cursor for listing the conversations older than this one"""
+    return f"{conversation.updated_at!r}:{conversation.id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    updated_at, separator, conversation_id = cursor.partition(":")
+    try:
+        if not separator:
+            raise ValueError
+        return float(updated_at), conversation_id
+    except ValueError:
+        raise ValueError("Invalid conversation cursor")
+
+
+class StoredMessage(NamedTuple):
+    id: str
+    role: str
+    content: str
+    timestamp: float  # Unix time
+    status: str
+    message_type: Optional[str] = None
+    agent_used: Optional[str] = None
+    confidence: Optional[float] = None
+
+
+def message_bytes(message: StoredMessage) -> int:
+    """Approximate memory held by one message (short shared strings such as role aren't counted)"""
+    return (
+        sys.getsizeof(message) + sys.getsizeof(message.id)
+        + sys.getsizeof(message.content) + sys.getsizeof(message.timestamp)
+    )
+
+
+class StoredConversation:
+    __slots__ = (
+        "id", "title", "created_at", "updated_at", "user_id", "messages", "last_access", "nbytes",
+        "newer", "older"  # Neighbours in the updated_at index
+    )
+
+    def __init__(self, id: str, title: str, created_at: float, updated_at: float,
+                 user_id: Optional[str] = None, messages: Optional[List[StoredMessage]] = None,
+                 last_access: Optional[float] = None):
+        self.id = id
+        self.title = title
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.user_id = user_id
+        self.messages = messages if messages is not None else []
+        self.last_access = last_access if last_access is not None else time.time()
+        self.nbytes = self._base_bytes() + sum(message_bytes(message) for message in self.messages)
+        self.newer: Optional["StoredConversation"] = None
+        self.older: Optional["StoredConversation"] = None
+
+    def _base_bytes(self) -> int:
+        return (
+            sys.getsizeof(self) + sys.getsizeof(self.id) + sys.getsizeof(self.title)
+            + sys.getsizeof(self.messages) + 2 * sys.getsizeof(self.created_at)
+        )
+
+    def to_row(self) -> list:
+        # Copy the message list so a snapshot can be written while new messages arrive
+        return [self.id, self.title, self.created_at, self.updated_at, self.user_id, list(self.messages), self.last_access]
+
+    @classmethod
+    def from_row(cls, row: list) -> "StoredConversation":
+        conversation_id, title, created_at, updated_at, user_id, messages, last_access = row
+        return cls(conversation_id, title, created_at, updated_at, user_id,
+                   [StoredMessage(*message) for message in messages], last_access)
+
+
+class ConversationStore:
+    """
+    LRU + TTL bounded conversation store
+
+    Only reads through get() count as access; listing conversations doesn't
+    keep them alive. Expired conversations are dropped lazily from the cold end.
+    """
+
+    def __init__(self, max_conversations: int, ttl_seconds: float,
+                 snapshot_path: Optional[str] = None, snapshot_seconds: float = 60.0):
+        self.max_conversations = max_conversations
+        self.ttl_seconds = ttl_seconds
+        self.snapshot_path = snapshot_path
+        self.snapshot_seconds = snapshot_seconds
+        self.evicted = {"capacity": 0, "expired": 0}
+        self.nbytes = 0
+        self._conversations: "OrderedDict[str, StoredConversation]" = OrderedDict()
+        # Ends of the updated_at index; updates only ever move a conversation to the newest end
+        self._newest: Optional[StoredConversation] = None
+        self._oldest: Optional[StoredConversation] = None
+        self._dirty = False
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._conversations)
+
+    def __contains__(self, conversation_id: str) -> bool:
+        return self.get(conversation_id, touch=False) is not None
+
+    def recent(self, limit: Optional[int] = None,
+               before: Optional[Tuple[float, str]] = None) -> List[StoredConversation]:
+        """
+        Conversations by most recent update, without refreshing their LRU position
+
+        Args:
+            limit: Page size (all conversations if None)
+            before: (updated_at, id) of the last conversation on the previous page;
+                the page starts at the first conversation older than that, even
+                if that conversation has since been updated or evicted
+        """
+        self._evict_expired()
+        node = self._newest
+        if before is not None:
+            cursor = self._conversations.get(before[1])
+            if cursor is not None and (cursor.updated_at, cursor.id) == before:
+                node = cursor.older
+            else:
+                # Moved or gone: walk past everything updated since the cursor was issued
+                while node is not None and (node.updated_at, node.id) >= before:
+                    node = node.older
+        page = []
+        while node is not None and (limit is None or len(page) < limit):
+            page.append(node)
+            node = node.older
+        return page
+
+    def get(self, conversation_id: str, touch: bool = True) -> Optional[StoredConversation]:
+        conversation = self._conversations.get(conversation_id)
+        if conversation is None:
+            return None
+        now = time.time()
+        if now - conversation.last_access > self.ttl_seconds:
+            self._remove(conversation_id, "expired")
+            return None
+        if touch:
+            conversation.last_access = now
+            self._conversations.move_to_end(conversation_id)
+        return conversation
+
+    def create(self, conversation_id: str, title: str, user_id: Optional[str] = None) -> StoredConversation:
+        now = self._next_update_time()
+        conversation = StoredConversation(conversation_id, title, now, now, user_id)
+        self._insert(conversation)
+        self._dirty = True
+        return conversation
+
+    def add_messages(self, conversation: StoredConversation, messages: List[StoredMessage]) -> None:
+        conversation.messages.extend(messages)
+        added = sum(message_bytes(message) for message in messages)
+        conversation.nbytes += added
+        conversation.updated_at = self._next_update_time()
+        conversation.last_access = time.time()
+        if conversation.id in self._conversations:
+            self.nbytes += added
+            self._conversations.move_to_end(conversation.id)
+            self._unlink(conversation)
+            self._link_newest(conversation)
+        self._dirty = True
+
+    def set_title(self, conversation: StoredConversation, title: str) -> None:
+        delta = sys.getsizeof(title) - sys.getsizeof(conversation.title)
+        conversation.title = title
+        conversation.nbytes += delta
+        if conversation.id in self._conversations:
+            self.nbytes += delta
+        self._dirty = True
+
+    def _next_update_time(self) -> float:
+        # Strictly after the newest conversation, so linking at the newest end keeps the index
+        # sorted and cursors unambiguous
+        now = time.time()
+        if self._newest is None:
+            return now
+        return max(now, math.nextafter(self._newest.updated_at, math.inf))
+
+    def _link_newest(self, conversation: StoredConversation) -> None:
+        conversation.newer = None
+        conversation.older = self._newest
+        if self._newest is not None:
+            self._newest.newer = conversation
+        else:
+            self._oldest = conversation
+        self._newest = conversation
+
+    def _unlink(self, conversation: StoredConversation) -> None:
+        if conversation.newer is not None:
+            conversation.newer.older = conversation.older
+        else:
+            self._newest = conversation.older
+        if conversation.older is not None:
+            conversation.older.newer = conversation.newer
+        else:
+            self._oldest = conversation.newer
+        conversation.newer = conversation.older = None
+
+    def _insert(self, conversation: StoredConversation) -> None:
+        if conversation.id in self._conversations:
+            self._remove(conversation.id)
+        self._conversations[conversation.id] = conversation
+        self._link_newest(conversation)
+        self.nbytes += conversation.nbytes
+        self._evict_expired()
+        while len(self._conversations) > self.max_conversations:
+            self._remove(next(iter(self._conversations)), "capacity")
+
+    def _remove(self, conversation_id: str, reason: Optional[str] = None) -> None:
+        conversation = self._conversations.pop(conversation_id)
+        self._unlink(conversation)
+        self.nbytes -= conversation.nbytes
+        if reason:
+            self.evicted[reason] += 1
+        self._dirty = True
+
+    def _evict_expired(self) -> None:
+        # LRU order is access order, so expired conversations are all at the front
+        cutoff = time.time() - self.ttl_seconds
+        while self._conversations:
+            conversation_id, conversation = next(iter(self._conversations.items()))
+            if conversation.last_access >= cutoff:
+                break
+            self._remove(conversation_id, "expired")
+
+    def memory_usage(self, top: int = 10) -> Dict[str, Any]:
+        """Approximate memory in total, per conversation on average, and for the largest conversations"""
+        count = len(self._conversations)
+        largest = heapq.nlargest(top, self._conversations.values(), key=lambda c: c.nbytes)
+        return {
+            "bytes": self.nbytes,
+            "avg_bytes_per_conversation": self.nbytes // count if count else 0,
+            "largest": [
+                {"id": c.id, "messages": len(c.messages), "bytes": c.nbytes} for c in largest
+            ]
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        self._evict_expired()
+        return {
+            "conversations": len(self._conversations),
+            "max_conversations": self.max_conversations,
+            "messages": sum(len(c.messages) for c in self._conversations.values()),
+            "evicted": dict(self.evicted),
+            "memory": self.memory_usage(),
+            "snapshot_path": self.snapshot_path
+        }
+
+    def load_snapshot(self) -> int:
+        """Replace the contents with the conversations saved by save_snapshot(), skipping expired ones"""
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return 0
+        with open(self.snapshot_path) as f:
+            rows = json.load(f)
+        cutoff = time.time() - self.ttl_seconds
+        conversations = [StoredConversation.from_row(row) for row in rows]
+        # Snapshots are written least recently used first, so keeping the order restores the LRU order
+        conversations = [c for c in conversations if c.last_access >= cutoff][-self.max_conversations:]
+
+        self._conversations = OrderedDict((c.id, c) for c in conversations)
+        self.nbytes = sum(c.nbytes for c in conversations)
+        # The updated_at index is rebuilt with one sort
+        self._newest = self._oldest = None
+        for conversation in sorted(conversations, key=lambda c: (c.updated_at, c.id)):
+            self._link_newest(conversation)
+        self._dirty = False
+        return len(self._conversations)
+
+    async def save_snapshot(self) -> None:
+        """Write every conversation to snapshot_path atomically"""
+        if not self.snapshot_path:
+            return
+        rows = [conversation.to_row() for conversation in self._conversations.values()]
+        self._dirty = False
+        # Encoding and writing happen off the event loop on a copy of the rows
+        await asyncio.to_thread(self._write_snapshot, rows)
+
+    def _write_snapshot(self, rows: list) -> None:
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(rows, f, separators=(",", ":"))
+        os.replace(tmp_path, self.snapshot_path)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.snapshot_seconds)
+            if self._dirty:
+                try:
+                    await self.save_snapshot()
+                except Exception as e:
+                    self._dirty = True
+                    print(f"❌ Conversation snapshot failed: {e}")
+
+    def start(self) -> None:
+        if self.snapshot_path and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+            await self.save_snapshot()
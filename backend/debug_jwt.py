@@ -0,0 +1,80 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+# Local JWKS stub so token verification can be exercised without Clerk
+STUB_PORT = 8765
+STUB_KID = "stub-key-1"
+
+private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+private_pem = private_key.private_bytes(
+    serialization.Encoding.PEM,
+    serialization.PrivateFormat.PKCS8,
+    serialization.NoEncryption()
+).decode()
+public_jwk = jwk.construct(private_pem, "RS256").public_key().to_dict()
+public_jwk.update({"kid": STUB_KID, "use": "sig", "alg": "RS256"})
+
+
+class JWKSHandler(BaseHTTPRequestHandler):
+    fetches = 0
+
+    def do_GET(self):
+        JWKSHandler.fetches += 1
+        body = json.dumps({"keys": [public_jwk]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Cache-Control", "public, max-age=600")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+# Point the app at the stub before it reads its settings
+os.environ["CLERK_JWKS_URL"] = f"http://127.0.0.1:{STUB_PORT}/.well-known/jwks.json"
+
+from app.core.auth import verify_clerk_jwt, jwks_client  # noqa: E402
+
+
+async def debug_jwt():
+    """Verify stub-signed tokens and show the effect of the key and token caches"""
+    server = HTTPServer(("127.0.0.1", STUB_PORT), JWKSHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    claims = {"sub": "user_stub_123", "email": "stub@example.com", "exp": int(time.time()) + 300}
+    token = jwt.encode(claims, private_pem, algorithm="RS256", headers={"kid": STUB_KID})
+
+    # Concurrent first requests should share a single JWKS fetch
+    results = await asyncio.gather(*[verify_clerk_jwt(token) for _ in range(10)])
+    print(f"✅ 10 concurrent verifications -> {results[0]} ({JWKSHandler.fetches} JWKS fetch)")
+
+    started = time.perf_counter()
+    for _ in range(1000):
+        await verify_clerk_jwt(token)
+    print(f"⏱️  Cached token: {(time.perf_counter() - started) * 1000:.3f} µs/verification")
+
+    started = time.perf_counter()
+    for i in range(100):
+        fresh = jwt.encode({**claims, "n": i}, private_pem, algorithm="RS256", headers={"kid": STUB_KID})
+        assert await verify_clerk_jwt(fresh)
+    print(f"⏱️  New tokens (sign + RSA verify): {(time.perf_counter() - started) * 10:.3f} ms/token")
+
+    forged = jwt.encode(claims, rsa.generate_private_key(public_exponent=65537, key_size=2048).private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode(), algorithm="RS256", headers={"kid": STUB_KID})
+    print(f"✅ Forged token rejected: {await verify_clerk_jwt(forged) is None}")
+
+    await jwks_client.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(debug_jwt())
@@ -0,0 +1,51 @@
+from app.database import SessionLocal, replica_router, replica_engines, engine
+from app.models import User
+from app.services.chat_service import ChatService
+
+# Run with e.g.
+#   DATABASE_URL=sqlite:///primary.db DATABASE_REPLICA_URLS=sqlite:///replica1.db,sqlite:///replica2.db
+# Both SQLite files need the schema; rows written here only reach the primary,
+# which makes it easy to see where each read was served from.
+
+
+def debug_replicas():
+    """Show which database serves reads before and after a user's write"""
+    if not replica_engines:
+        print("⚠️ DATABASE_REPLICA_URLS is not set - every read goes to the primary")
+        return
+
+    print(f"Primary: {engine.url}")
+    for replica in replica_engines:
+        print(f"Replica: {replica.url}")
+
+    db = SessionLocal()
+    user = ChatService(db).get_or_create_user("replica_debug_user", "replica@test.com")
+    user_id = user.id
+    db.close()
+
+    def where_is_user():
+        read_db = replica_router.read_session(user_id)
+        try:
+            found = read_db.query(User).filter(User.id == user_id).first() is not None
+            bind = read_db.get_bind()
+            return bind.url, found
+        finally:
+            read_db.close()
+
+    print(f"\nBefore a write by user {user_id}:")
+    for _ in range(len(replica_engines) + 1):
+        url, found = where_is_user()
+        print(f"- read served by {url} (user row found: {found})")
+
+    db = SessionLocal()
+    db.info["user_id"] = user_id
+    ChatService(db).create_conversation(user_id, "Replica debug")
+    db.close()
+
+    print(f"\nWithin {replica_router.window_seconds}s of a write (read-your-writes):")
+    url, found = where_is_user()
+    print(f"- read served by {url} (user row found: {found})")
+
+
+if __name__ == "__main__":
+    debug_replicas()
@@ -0,0 +1,42 @@
+import argparse
+import sys
+from app.database import SessionLocal
+from app.models import User
+from app.services.export_service import stream_export
+
+
+def export_conversations():
+    """Export conversations and messages as (optionally gzipped) NDJSON"""
+    parser = argparse.ArgumentParser(description="Export conversations as NDJSON")
+    parser.add_argument("--user", help="Clerk user ID to export (default: all users)")
+    parser.add_argument("--gzip", action="store_true", help="gzip-compress the output")
+    parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    args = parser.parse_args()
+
+    user_id = None
+    if args.user:
+        db = SessionLocal()
+        try:
+            user = db.query(User).filter(User.clerk_user_id == args.user).first()
+        finally:
+            db.close()
+        if not user:
+            print(f"❌ User not found: {args.user}", file=sys.stderr)
+            sys.exit(1)
+        user_id = user.id
+
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        total = 0
+        for chunk in stream_export(user_id, compress=args.gzip):
+            out.write(chunk)
+            total += len(chunk)
+    finally:
+        if args.output:
+            out.close()
+
+    print(f"✅ Exported {total} bytes", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    export_conversations()
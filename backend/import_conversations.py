@@ -0,0 +1,53 @@
+import argparse
+import gzip
+import json
+import sys
+from app.database import SessionLocal
+from app.models import User
+from app.services.import_service import ImportService, IMPORT_BATCH_SIZE
+
+
+def import_conversations():
+    """Bulk import conversations from an NDJSON export"""
+    parser = argparse.ArgumentParser(description="Import conversations from NDJSON")
+    parser.add_argument("input", help="NDJSON file (.gz is decompressed), or - for stdin")
+    parser.add_argument("--user", help="Import everything for this Clerk user ID "
+                                       "(default: use each conversation's clerk_user_id)")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE,
+                        help="Messages written per batch")
+    args = parser.parse_args()
+
+    if args.input == "-":
+        stream = sys.stdin.buffer
+    elif args.input.endswith(".gz"):
+        stream = gzip.open(args.input, "rb")
+    else:
+        stream = open(args.input, "rb")
+
+    db = SessionLocal()
+    try:
+        user_id = None
+        if args.user:
+            user = db.query(User).filter(User.clerk_user_id == args.user).first()
+            if not user:
+                print(f"❌ User not found: {args.user}")
+                sys.exit(1)
+            user_id = user.id
+
+        service = ImportService(db, user_id=user_id, batch_size=args.batch_size)
+        records = (json.loads(line) for line in stream if line.strip())
+        result = service.import_records(records)
+
+        print(f"✅ Imported {result.conversations} conversations and {result.messages} messages")
+        print(f"⏱️  {result.seconds}s ({result.rows_per_second} rows/s)")
+
+    except Exception as e:
+        print(f"❌ Import failed: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+        stream.close()
+
+
+if __name__ == "__main__":
+    import_conversations()
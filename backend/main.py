@@ -1,8 +1,8 @@
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Depends
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Depends, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Optional, Set
 import uuid
 import json
 import asyncio
@@ -28,6 +28,12 @@ except ImportError as e:
 
 from pydantic import BaseModel
 from typing import Literal
+from app.core.event_bus import create_event_bus
+from conversation_store import ConversationStore, StoredMessage, decode_cursor, encode_cursor
+from app.core.health import HealthMonitor, anthropic_check
+from app.core.circuit_breaker import CircuitBreaker, CircuitOpen
+from app.core.config import settings
+from app.core.auth import jwks_client, verify_clerk_jwt
 
 # Models (keeping them inline for simplicity)
 MessageRole = Literal["user", "assistant", "system"]
@@ -56,6 +62,7 @@ class ChatResponse(BaseModel):
 
 class ConversationCreate(BaseModel):
     title: Optional[str] = "New Conversation"
+    user_id: Optional[str] = None
 
 class ConversationResponse(BaseModel):
     id: str
@@ -70,16 +77,36 @@ class HealthResponse(BaseModel):
     message: str
     timestamp: datetime
     langgraph_status: str
+    llm_circuit: Optional[str] = None
 
-# Simple in-memory storage for development
+# Simple in-memory storage for development, bounded by count and idle time
 # TODO: Replace with your PostgreSQL database
-conversations_db = {}
-messages_db = {}
+store = ConversationStore(
+    max_conversations=int(os.getenv("STORE_MAX_CONVERSATIONS", "10000")),
+    ttl_seconds=float(os.getenv("STORE_TTL_SECONDS", "86400")),
+    snapshot_path=os.getenv("STORE_SNAPSHOT_PATH") or None,
+    snapshot_seconds=float(os.getenv("STORE_SNAPSHOT_SECONDS", "60"))
+)
+
+def to_stored(message: MessageResponse) -> StoredMessage:
+    """Compact tuple form of a message for the store"""
+    return StoredMessage(
+        message.id, message.role, message.content, message.timestamp.timestamp(),
+        message.status, message.message_type, message.agent_used, message.confidence
+    )
 
 # LangGraph Service
 class LangGraphService:
     def __init__(self):
         self.available = LANGGRAPH_AVAILABLE
+        # Each turn's graph.invoke is one guarded call, so a failing LLM stops costing every turn a timeout
+        self.breaker = CircuitBreaker(
+            window_size=int(os.getenv("LLM_BREAKER_WINDOW", "20")),
+            min_calls=int(os.getenv("LLM_BREAKER_MIN_CALLS", "5")),
+            failure_rate=float(os.getenv("LLM_BREAKER_FAILURE_RATE", "0.5")),
+            slow_call_seconds=float(os.getenv("LLM_BREAKER_SLOW_CALL_SECONDS", "30")),
+            open_seconds=float(os.getenv("LLM_BREAKER_OPEN_SECONDS", "30"))
+        )
         
     def process_message(self, user_message: str, conversation_history: list = None) -> tuple[MessageResponse, MessageResponse]:
         """Process a user message through your LangGraph system"""
@@ -111,6 +138,9 @@ class LangGraphService:
                 
                 return user_msg, ai_msg
                 
+            except CircuitOpen:
+                # Degraded mode: answer right away instead of waiting on a failing LLM
+                return user_msg, self._get_mock_response(degraded=True)
             except Exception as e:
                 print(f"❌ Error invoking LangGraph: {e}")
                 return user_msg, self._get_mock_response()
@@ -144,8 +174,9 @@ class LangGraphService:
         
         print(f"🤖 Invoking LangGraph with: {user_message}")
         
-        # Invoke your LangGraph system
-        result = graph.invoke(state)
+        # Invoke your LangGraph system (only the call itself counts for the breaker, not parsing its result)
+        with self.breaker.call():
+            result = graph.invoke(state)
         
         print(f"📝 LangGraph result: {result}")
         
@@ -164,8 +195,8 @@ class LangGraphService:
         else:
             raise Exception("No response generated from LangGraph")
     
-    def _get_mock_response(self) -> MessageResponse:
-        """Mock response for development"""
+    def _get_mock_response(self, degraded: bool = False) -> MessageResponse:
+        """Mock response for development, or the LLM_DEGRADED_RESPONSE text while the circuit is open"""
         import random
         
         mock_responses = [
@@ -182,6 +213,8 @@ class LangGraphService:
         ]
         
         mock = random.choice(mock_responses)
+        if degraded and os.getenv("LLM_DEGRADED_RESPONSE"):
+            mock["content"] = os.getenv("LLM_DEGRADED_RESPONSE")
         
         return MessageResponse(
             id=str(uuid.uuid4()),
@@ -195,35 +228,40 @@ class LangGraphService:
         )
     
     def health_check(self) -> Dict[str, Any]:
-        """Check if the LangGraph system is working"""
-        if self.available:
-            try:
-                # Test with a simple message
-                test_state = {
-                    "messages": [{"role": "user", "content": "Hello"}],
-                    "message_type": None
-                }
-                
-                result = graph.invoke(test_state)
-                
-                return {
-                    "status": "healthy",
-                    "langgraph_available": True,
-                    "message": "LangGraph system is operational"
-                }
-            except Exception as e:
-                return {
-                    "status": "error",
-                    "langgraph_available": False,
-                    "message": f"LangGraph system error: {str(e)}"
-                }
-        else:
+        """Status of the LangGraph system from the last background LLM check"""
+        if not self.available:
             return {
                 "status": "mock",
                 "langgraph_available": False,
                 "message": "Running in mock mode - LangGraph not available"
             }
 
+        if self.breaker.state != CircuitBreaker.CLOSED:
+            return {
+                "status": "error",
+                "langgraph_available": True,
+                "message": "LLM circuit open - serving degraded responses"
+            }
+
+        result = health_monitor.results.get("llm")
+        if result is None:
+            return {
+                "status": "unknown",
+                "langgraph_available": True,
+                "message": "LangGraph system not checked yet"
+            }
+        if result["status"] != "ok":
+            return {
+                "status": "error",
+                "langgraph_available": False,
+                "message": f"LangGraph system error: {result['error']}"
+            }
+        return {
+            "status": "healthy",
+            "langgraph_available": True,
+            "message": "LangGraph system is operational"
+        }
+
 # Initialize FastAPI app
 app = FastAPI(
     title="LangGraph Chat API",
@@ -243,81 +281,254 @@ app.add_middleware(
 # Initialize services
 langgraph_service = LangGraphService()
 
+# Checks the LLM in the background so health probes never invoke the graph
+health_monitor = HealthMonitor(
+    float(os.getenv("HEALTH_CHECK_INTERVAL_SECONDS", "30")),
+    float(os.getenv("HEALTH_CHECK_TIMEOUT_SECONDS", "5"))
+)
+if LANGGRAPH_AVAILABLE and os.getenv("ANTHROPIC_API_KEY"):
+    health_monitor.add_check("llm", anthropic_check(
+        os.getenv("ANTHROPIC_API_KEY"), health_monitor.timeout_seconds
+    ))
+
 # WebSocket connection manager
+def conversation_topic(conversation_id: str) -> str:
+    return f"conversation:{conversation_id}"
+
+def user_topic(user_id: str) -> str:
+    return f"user:{user_id}"
+
+class Subscriber:
+    """A connected socket with its own bounded outbox and sender task"""
+    __slots__ = ("websocket", "queue", "task", "topics", "dropped")
+
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.task: Optional[asyncio.Task] = None
+        self.topics: Set[str] = set()
+        self.dropped = 0
+
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+    """
+    Topic-based WebSocket fan-out
+
+    Sockets subscribe to topics (one per conversation or user) and only get
+    messages published there. Publishing never waits on the network: each
+    message is queued on every subscriber's bounded outbox and a per-socket
+    sender task writes it out, so one slow client can't stall the others.
+    When an outbox is full the slow-consumer policy applies: "drop" discards
+    that socket's oldest queued message, "disconnect" closes the socket.
+    Sockets whose sends fail or time out are removed.
+    """
+
+    def __init__(self, queue_size: int = 100, slow_consumer_policy: str = "drop", send_timeout: float = 10.0):
+        if slow_consumer_policy not in ("drop", "disconnect"):
+            raise ValueError(f"Unknown slow consumer policy: {slow_consumer_policy}")
+        self.queue_size = queue_size
+        self.slow_consumer_policy = slow_consumer_policy
+        self.send_timeout = send_timeout
+        self.active_connections: Dict[WebSocket, Subscriber] = {}
+        self.topics: Dict[str, Set[WebSocket]] = {}
+        self.sent = 0
+        self.dropped = 0
+        self.slow_disconnects = 0
+        self.dead_disconnects = 0
     
-    async def connect(self, websocket: WebSocket):
+    async def connect(self, websocket: WebSocket, topics: Iterable[str] = ()):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.register(websocket, topics)
+
+    def register(self, websocket: WebSocket, topics: Iterable[str] = ()) -> Subscriber:
+        """Track an already-accepted socket and start its sender task"""
+        subscriber = Subscriber(websocket, self.queue_size)
+        subscriber.task = asyncio.create_task(self._sender(subscriber))
+        self.active_connections[websocket] = subscriber
+        for topic in topics:
+            self.subscribe(websocket, topic)
+        return subscriber
     
     def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        subscriber = self.active_connections.pop(websocket, None)
+        if subscriber is None:
+            return
+        for topic in subscriber.topics:
+            sockets = self.topics.get(topic)
+            if sockets is not None:
+                sockets.discard(websocket)
+                if not sockets:
+                    del self.topics[topic]
+        if subscriber.task is not None and subscriber.task is not asyncio.current_task():
+            subscriber.task.cancel()
+
+    def subscribe(self, websocket: WebSocket, topic: str):
+        subscriber = self.active_connections.get(websocket)
+        if subscriber is not None:
+            subscriber.topics.add(topic)
+            self.topics.setdefault(topic, set()).add(websocket)
+
+    def unsubscribe(self, websocket: WebSocket, topic: str):
+        subscriber = self.active_connections.get(websocket)
+        if subscriber is not None:
+            subscriber.topics.discard(topic)
+            sockets = self.topics.get(topic)
+            if sockets is not None:
+                sockets.discard(websocket)
+                if not sockets:
+                    del self.topics[topic]
     
     async def send_personal_message(self, message: str, websocket: WebSocket):
-        await websocket.send_text(message)
+        subscriber = self.active_connections.get(websocket)
+        if subscriber is not None:
+            self._enqueue(subscriber, message)
+
+    async def publish(self, topics: Iterable[str], message: str) -> int:
+        """Queue a message for every socket subscribed to any of the topics (once each)"""
+        recipients: Set[WebSocket] = set()
+        for topic in topics:
+            recipients.update(self.topics.get(topic, ()))
+        for websocket in recipients:
+            subscriber = self.active_connections.get(websocket)
+            if subscriber is not None:
+                self._enqueue(subscriber, message)
+        return len(recipients)
     
     async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except:
-                pass  # Connection might be closed
+        """Queue a message for every connected socket regardless of topic"""
+        for subscriber in list(self.active_connections.values()):
+            self._enqueue(subscriber, message)
+
+    def _enqueue(self, subscriber: Subscriber, message: str):
+        try:
+            subscriber.queue.put_nowait(message)
+            return
+        except asyncio.QueueFull:
+            pass
+
+        if self.slow_consumer_policy == "disconnect":
+            self.slow_disconnects += 1
+            self.disconnect(subscriber.websocket)
+            asyncio.create_task(self._close(subscriber.websocket, code=1013))  # Try again later
+        else:
+            # Keep the newest messages: drop the oldest queued one
+            subscriber.queue.get_nowait()
+            subscriber.queue.put_nowait(message)
+            subscriber.dropped += 1
+            self.dropped += 1
+
+    async def _sender(self, subscriber: Subscriber):
+        try:
+            while True:
+                message = await subscriber.queue.get()
+                await asyncio.wait_for(subscriber.websocket.send_text(message), self.send_timeout)
+                self.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Closed or stuck connection: forget it so publishes stop queueing for it
+            self.dead_disconnects += 1
+            self.disconnect(subscriber.websocket)
+            await self._close(subscriber.websocket)
+
+    async def _close(self, websocket: WebSocket, code: int = 1000):
+        try:
+            await asyncio.wait_for(websocket.close(code=code), self.send_timeout)
+        except Exception:
+            pass  # Connection is already gone
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connections": len(self.active_connections),
+            "topics": len(self.topics),
+            "queued": sum(s.queue.qsize() for s in self.active_connections.values()),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "slow_disconnects": self.slow_disconnects,
+            "dead_disconnects": self.dead_disconnects
+        }
 
 manager = ConnectionManager()
 
+# Carries events between workers; each worker fans them out to its own sockets
+event_bus = create_event_bus(settings.event_bus, settings.event_bus_url)
+
 # API Endpoints
 @app.get("/api/health", response_model=HealthResponse)
 async def health_check():
-    """Check API and LangGraph system health"""
+    """Check API and LangGraph system health (cached, never calls the LLM)"""
     langgraph_health = langgraph_service.health_check()
     
     return HealthResponse(
         status="healthy" if langgraph_health["status"] != "error" else "degraded",
         message=f"API is running. {langgraph_health['message']}",
         timestamp=datetime.now(),
-        langgraph_status=langgraph_health["status"]
+        langgraph_status=langgraph_health["status"],
+        llm_circuit=langgraph_service.breaker.state
     )
 
+@app.get("/api/health/live")
+async def liveness():
+    """Liveness probe: the process is up and serving requests"""
+    return {"status": "alive"}
+
+@app.get("/api/health/ready")
+async def readiness():
+    """Readiness probe from the cached checks: 503 until required checks pass (mock mode still serves requests)"""
+    health = {**health_monitor.status(), "llm_circuit": langgraph_service.breaker.state}
+    return JSONResponse(health, status_code=200 if health_monitor.ready() else 503)
+
+@app.get("/api/metrics")
+async def metrics():
+    """In-process statistics for this worker"""
+    return {
+        "websockets": manager.stats(),
+        "store": store.stats(),
+        "llm_breaker": langgraph_service.breaker.stats()
+    }
+
 @app.get("/api/conversations", response_model=List[ConversationResponse])
-async def get_conversations():
-    """Get all conversations"""
+async def get_conversations(response: Response, limit: Optional[int] = Query(None, ge=1, le=1000),
+                            before: Optional[str] = None):
+    """
+    Get conversations, most recently updated first
+
+    Pass limit for one page; a full page sets X-Next-Cursor, to be passed as
+    before for the next one. Pages come straight off the store's updated_at
+    index, so no sorting is needed.
+    """
+    try:
+        page = store.recent(limit, decode_cursor(before) if before else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if limit is not None and len(page) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(page[-1])
+    
     conversations = []
-    for conv_id, conv_data in conversations_db.items():
-        conv_messages = messages_db.get(conv_id, [])
-        last_message = conv_messages[-1].content if conv_messages else None
+    for conv in page:
+        last_message = conv.messages[-1].content if conv.messages else None
         
         conversations.append(ConversationResponse(
-            id=conv_id,
-            title=conv_data["title"],
-            created_at=conv_data["created_at"],
-            updated_at=conv_data["updated_at"],
-            message_count=len(conv_messages),
+            id=conv.id,
+            title=conv.title,
+            created_at=datetime.fromtimestamp(conv.created_at),
+            updated_at=datetime.fromtimestamp(conv.updated_at),
+            message_count=len(conv.messages),
             last_message=last_message
         ))
     
-    return sorted(conversations, key=lambda x: x.updated_at, reverse=True)
+    return conversations
 
 @app.post("/api/conversations", response_model=ConversationResponse)
 async def create_conversation(conversation: ConversationCreate):
     """Create a new conversation"""
     conversation_id = str(uuid.uuid4())
-    now = datetime.now()
-    
-    conversations_db[conversation_id] = {
-        "title": conversation.title,
-        "created_at": now,
-        "updated_at": now
-    }
-    messages_db[conversation_id] = []
+    conv = store.create(conversation_id, conversation.title, conversation.user_id)
     
     return ConversationResponse(
         id=conversation_id,
-        title=conversation.title,
-        created_at=now,
-        updated_at=now,
+        title=conv.title,
+        created_at=datetime.fromtimestamp(conv.created_at),
+        updated_at=datetime.fromtimestamp(conv.updated_at),
         message_count=0
     )
 
@@ -325,18 +536,14 @@ async def create_conversation(conversation: ConversationCreate):
 async def send_message(conversation_id: str, message_request: MessageRequest):
     """Send a message and get AI response"""
     
-    # Check if conversation exists, create if it doesn't
-    if conversation_id not in conversations_db:
-        conversations_db[conversation_id] = {
-            "title": "New Conversation",
-            "created_at": datetime.now(),
-            "updated_at": datetime.now()
-        }
-        messages_db[conversation_id] = []
+    # Check if conversation exists, create if it doesn't (or it was evicted)
+    conv = store.get(conversation_id)
+    if conv is None:
+        conv = store.create(conversation_id, "New Conversation")
     
     try:
         # Get conversation history
-        conversation_history = messages_db.get(conversation_id, [])
+        conversation_history = conv.messages
         
         # Process message through LangGraph
         user_msg, ai_msg = langgraph_service.process_message(
@@ -344,24 +551,28 @@ async def send_message(conversation_id: str, message_request: MessageRequest):
             conversation_history
         )
         
-        # Save messages
-        messages_db[conversation_id].extend([user_msg, ai_msg])
-        
-        # Update conversation timestamp
-        conversations_db[conversation_id]["updated_at"] = datetime.now()
+        # Save messages (also updates the conversation timestamp)
+        store.add_messages(conv, [to_stored(user_msg), to_stored(ai_msg)])
         
         # Update title if this is the first message
-        if len(messages_db[conversation_id]) == 2:  # First user + AI message
+        if len(conv.messages) == 2:  # First user + AI message
             title = message_request.content[:50] + ("..." if len(message_request.content) > 50 else "")
-            conversations_db[conversation_id]["title"] = title
+            store.set_title(conv, title)
         
-        # Broadcast to WebSocket connections
-        await manager.broadcast(json.dumps({
-            "type": "message",
-            "conversation_id": conversation_id,
-            "user_message": user_msg.model_dump(mode='json'),
-            "ai_message": ai_msg.model_dump(mode='json')
-        }, default=str))
+        # Publish to the sockets following this conversation (or its owner) on every worker
+        topics = [conversation_topic(conversation_id)]
+        if conv.user_id:
+            topics.append(user_topic(conv.user_id))
+        try:
+            await event_bus.publish(topics, json.dumps({
+                "type": "message",
+                "conversation_id": conversation_id,
+                "user_message": user_msg.model_dump(mode='json'),
+                "ai_message": ai_msg.model_dump(mode='json')
+            }, default=str))
+        except Exception as e:
+            # The reply is saved either way; live updates are best effort
+            print(f"⚠️ Could not publish message event: {e}")
         
         return ChatResponse(
             user_message=user_msg,
@@ -373,19 +584,78 @@ async def send_message(conversation_id: str, message_request: MessageRequest):
         print(f"❌ Error processing message: {e}")
         raise HTTPException(status_code=500, detail=f"Error processing message: {str(e)}")
 
+DEV_SOCKET_USER = "dev_user_123"  # Same development fallback as the app's get_current_user
+
+async def socket_user(websocket: WebSocket) -> Optional[str]:
+    """
+    Clerk user id a socket has proved with its token, checked once before accept
+
+    Browsers can't set headers on a WebSocket, so the token may also be passed
+    in the `token` query parameter. In debug, a socket without a token acts as
+    the development user, as the app's REST endpoints do.
+    """
+    token = websocket.query_params.get("token")
+    authorization = websocket.headers.get("authorization", "")
+    if not token and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    if not token:
+        return DEV_SOCKET_USER if settings.debug else None
+    user_data = await verify_clerk_jwt(token)
+    return user_data["user_id"] if user_data else None
+
+def may_follow(conversation_id: str, user_id: str) -> bool:
+    """
+    A socket may only follow conversations owned by its verified user
+
+    This server's REST endpoints don't authenticate, so an owner is whatever
+    user_id the conversation was created with; conversations created without
+    one can't be followed over a socket at all.
+    """
+    conv = store.get(conversation_id, touch=False)
+    return conv is not None and conv.user_id is not None and conv.user_id == user_id
+
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket endpoint for real-time updates"""
-    await manager.connect(websocket)
+async def websocket_endpoint(websocket: WebSocket, conversation_id: Optional[str] = None):
+    """
+    WebSocket endpoint for real-time updates
+
+    The socket authenticates with a Clerk token (see socket_user) and follows
+    its user's topic. Subscribe to one of that user's conversations at connect
+    time with ?conversation_id=, or later with
+    {"type": "subscribe" | "unsubscribe", "conversation_id": ...} frames.
+    """
+    user_id = await socket_user(websocket)
+    if user_id is None or (conversation_id and not may_follow(conversation_id, user_id)):
+        await websocket.close(code=1008)
+        return
+    topics = [user_topic(user_id)]
+    if conversation_id:
+        topics.append(conversation_topic(conversation_id))
+    await manager.connect(websocket, topics)
     try:
         while True:
             data = await websocket.receive_text()
             message_data = json.loads(data)
             
             if message_data.get("type") == "ping":
-                await websocket.send_text(json.dumps({"type": "pong"}))
+                await manager.send_personal_message(json.dumps({"type": "pong"}), websocket)
+            elif message_data.get("type") == "unsubscribe":
+                if message_data.get("conversation_id"):
+                    manager.unsubscribe(websocket, conversation_topic(message_data["conversation_id"]))
+            elif message_data.get("type") == "subscribe":
+                requested_conversation = message_data.get("conversation_id")
+                if requested_conversation and not may_follow(requested_conversation, user_id):
+                    await manager.send_personal_message(json.dumps({
+                        "type": "error",
+                        "detail": "Not allowed to subscribe to that conversation"
+                    }), websocket)
+                    continue
+                if requested_conversation:
+                    manager.subscribe(websocket, conversation_topic(requested_conversation))
                 
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket)
 
 @app.on_event("startup")
@@ -394,7 +664,20 @@ async def startup_event():
     print("🚀 Starting LangGraph Chat API...")
     print(f"📊 Database URL: {os.getenv('DATABASE_URL', 'In-memory storage')}")
     
-    # Test LangGraph integration
+    try:
+        restored = store.load_snapshot()
+        if store.snapshot_path:
+            print(f"💾 Restored {restored} conversations from {store.snapshot_path}")
+    except Exception as e:
+        print(f"⚠️ Could not load conversation snapshot: {e}")
+    store.start()
+    
+    await event_bus.start(manager.publish)
+    print(f"📡 Event bus: {type(event_bus).__name__}")
+    
+    # One cheap reachability check (no tokens), then refresh in the background
+    await health_monitor.refresh()
+    health_monitor.start()
     health = langgraph_service.health_check()
     if health["langgraph_available"]:
         print("✅ LangGraph system connected and ready")
@@ -405,6 +688,14 @@ async def startup_event():
     print("🌐 API server ready at http://localhost:8000")
     print("📖 API docs available at http://localhost:8000/docs")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Disconnect from the event bus, stop background checks and save the store"""
+    await health_monitor.stop()
+    await jwks_client.close()
+    await store.stop()
+    await event_bus.close()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -0,0 +1,96 @@
+"""
+Offline stand-in for the Anthropic chat model
+
+Classification is a keyword match and replies are canned text streamed word
+by word with a fixed delay, so the graph can be run, demoed and benchmarked
+without an API key or network access. Usage metadata carries approximate
+token counts so token stats still mean something.
+"""
+import time
+from typing import Any, Iterator, List, Optional
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+# First match wins; anything else is "logical"
+KEYWORDS = {
+    "emotional": ("feel", "sad", "anxious", "stress", "lonely", "depress", "worried", "upset"),
+    "study": ("explain", "learn", "understand", "homework", "study", "teach", "what is"),
+    "creative": ("write", "story", "poem", "idea", "brainstorm", "creative", "imagine"),
+    "planning": ("plan", "schedule", "goal", "organize", "deadline", "routine", "week"),
+}
+
+FILLER = (
+    "Here is an offline answer from the fake model so the conversation flow can be "
+    "tried without calling the real service. It streams one word at a time just like "
+    "a real reply would and keeps going for a while to give the client something to show."
+).split()
+
+
+def classify(text: str) -> str:
+    lowered = text.lower()
+    for message_type, words in KEYWORDS.items():
+        if any(word in lowered for word in words):
+            return message_type
+    return "logical"
+
+
+def _text(message: Any) -> str:
+    content = message["content"] if isinstance(message, dict) else message.content
+    return content if isinstance(content, str) else str(content)
+
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic chat model: reply_words words per reply, token_delay seconds per word"""
+
+    token_delay: float = 0.0
+    reply_words: int = 40
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        prompt = _text(messages[-1])[:40]
+        words = [FILLER[i % len(FILLER)] for i in range(self.reply_words)]
+        return f"(offline reply to \"{prompt}\") " + " ".join(words)
+
+    def _usage(self, messages: List[BaseMessage], reply: str) -> dict:
+        input_tokens = count_tokens_approximately(messages)
+        output_tokens = count_tokens_approximately([AIMessage(content=reply)])
+        return {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        reply = self._reply(messages)
+        time.sleep(self.token_delay * len(reply.split()))
+        message = AIMessage(
+            content=reply,
+            usage_metadata=self._usage(messages, reply),
+            response_metadata={"model_name": self._llm_type}
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        reply = self._reply(messages)
+        for i, word in enumerate(reply.split(" ")):
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+        # Usage comes last, as it does from the Anthropic API
+        yield ChatGenerationChunk(message=AIMessageChunk(
+            content="",
+            usage_metadata=self._usage(messages, reply),
+            response_metadata={"model_name": self._llm_type}
+        ))
+
+    def with_structured_output(self, schema, **kwargs):
+        # Only the classifier asks for structured output
+        return RunnableLambda(lambda messages: schema(message_type=classify(_text(messages[-1]))))
@@ -1,16 +1,43 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
 from dotenv import load_dotenv
-from typing import Annotated, Literal
+from typing import Annotated, Any, AsyncIterator, Dict, List, Literal, Tuple
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
 from langchain.chat_models import init_chat_model
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage, HumanMessage, trim_messages
+from langchain_core.messages.utils import count_tokens_approximately
 from pydantic import BaseModel, Field
 from typing_extensions import TypedDict
 
 load_dotenv()
 
-llm = init_chat_model(
-    "anthropic:claude-3-5-sonnet-latest"
-)
+LLM_BACKENDS = ("anthropic", "fake")
+
+
+def create_llm(backend: str):
+    """Chat model for a backend: "anthropic", or "fake" to run offline without an API key"""
+    if backend == "fake":
+        from fake_llm import FakeChatModel
+        return FakeChatModel(token_delay=float(os.getenv("FAKE_LLM_TOKEN_DELAY", "0.02")))
+    if backend != "anthropic":
+        raise ValueError(f"Unknown LLM backend: {backend}")
+    return init_chat_model(
+        "anthropic:claude-3-5-sonnet-latest"
+    )
+
+
+llm = create_llm(os.getenv("LLM_BACKEND", "anthropic"))
+
+
+def use_llm(backend: str) -> None:
+    """Switch every node to another backend (nodes look up llm when they run)"""
+    global llm
+    llm = create_llm(backend)
 
 
 class MessageClassifier(BaseModel):
@@ -201,62 +228,213 @@ graph_builder.add_edge("planning", END)
 graph = graph_builder.compile()
 
 
-def run_chatbot():
-    """Interactive chatbot with enhanced agent routing"""
+# Nodes whose LLM output is the reply itself (the classifier's isn't)
+AGENT_NODES = {"emotional", "logical", "study", "creative", "planning"}
+
+AGENT_ICONS = {
+    "emotional": "💭",
+    "logical": "🧠",
+    "study": "📚",
+    "creative": "🎨",
+    "planning": "📋"
+}
+
+# Conversation history sent with each turn, in (approximate) tokens
+DEFAULT_HISTORY_TOKENS = 4000
+
+
+class TokenUsage(BaseCallbackHandler):
+    """Collects input/output tokens reported by every LLM call, per graph node"""
+
+    def __init__(self):
+        self.by_node: Dict[str, Dict[str, int]] = {}
+        self._run_nodes: Dict[Any, str] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._run_nodes[run_id] = (metadata or {}).get("langgraph_node", "unknown")
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        node = self._run_nodes.pop(run_id, "unknown")
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                counts = self.by_node.setdefault(node, {"input_tokens": 0, "output_tokens": 0})
+                counts["input_tokens"] += usage.get("input_tokens", 0)
+                counts["output_tokens"] += usage.get("output_tokens", 0)
+
+    def totals(self) -> Dict[str, int]:
+        return {
+            key: sum(counts[key] for counts in self.by_node.values())
+            for key in ("input_tokens", "output_tokens")
+        }
+
+
+def trim_history(messages: list, max_tokens: int) -> list:
+    """The most recent messages that fit in max_tokens, starting on a user turn"""
+    return trim_messages(
+        messages,
+        max_tokens=max_tokens,
+        token_counter=count_tokens_approximately,
+        strategy="last",
+        start_on="human"
+    )
+
+
+def _content_text(content: Any) -> str:
+    """Text of a message's content, which Anthropic may send as content blocks"""
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block.get("text", "") if isinstance(block, dict) else str(block)
+        for block in content
+    )
+
+
+async def stream_turn(messages: list, callbacks: List[BaseCallbackHandler] = ()) -> AsyncIterator[Tuple[str, str]]:
+    """
+    Run one turn through the graph
+
+    Yields:
+        ("routing", agent_type) once the classifier has decided
+        ("token", text) for each piece of the agent's reply
+        ("done", reply) with the full reply, last
+    """
+    state = {"messages": messages, "message_type": None}
+    reply = ""
+    async for mode, chunk in graph.astream(
+        state, stream_mode=["updates", "messages"], config={"callbacks": list(callbacks)}
+    ):
+        if mode == "messages":
+            message_chunk, metadata = chunk
+            if metadata.get("langgraph_node") in AGENT_NODES:
+                delta = _content_text(message_chunk.content)
+                if delta:
+                    yield "token", delta
+            continue
+
+        for node, update in chunk.items():
+            if node == "classifier":
+                yield "routing", update.get("message_type") or "logical"
+            elif node in AGENT_NODES and update.get("messages"):
+                reply = _content_text(update["messages"][-1].content)
+    yield "done", reply
+
+
+def print_agents():
+    print("\n🎭 Available Agents:")
+    print("📚 Study Buddy: Learning, explanations, tutoring")
+    print("🎨 Creative Partner: Writing, brainstorming, artistic projects")
+    print("📋 Planning Coach: Goals, scheduling, productivity")
+    print("💭 Therapist: Emotional support, mental health")
+    print("🧠 Analyst: Logic, reasoning, problem-solving\n")
+
+
+async def run_chatbot(show_stats: bool = False, history_tokens: int = DEFAULT_HISTORY_TOKENS):
+    """Interactive chatbot with enhanced agent routing, streaming replies as they're generated"""
     print("🤖 Multi-Agent Assistant Ready!")
     print("Available agents: Therapist | Analyst | Study Buddy | Creative Partner | Planning Coach")
     print("Type 'exit' to quit, 'agents' to see agent descriptions\n")
 
-    state = {"messages": [], "message_type": None}
+    history = []
 
     while True:
-        user_input = input("You: ")
+        # input() blocks, so read in a thread and keep the event loop free
+        try:
+            user_input = await asyncio.to_thread(input, "You: ")
+        except EOFError:
+            user_input = "exit"
 
         if user_input.lower() == "exit":
             print("Goodbye! 👋")
             break
 
         if user_input.lower() == "agents":
-            print("\n🎭 Available Agents:")
-            print("📚 Study Buddy: Learning, explanations, tutoring")
-            print("🎨 Creative Partner: Writing, brainstorming, artistic projects")
-            print("📋 Planning Coach: Goals, scheduling, productivity")
-            print("💭 Therapist: Emotional support, mental health")
-            print("🧠 Analyst: Logic, reasoning, problem-solving\n")
+            print_agents()
             continue
 
-        # Add user message to state
-        from langchain_core.messages import HumanMessage
-        state["messages"] = state.get("messages", []) + [
-            HumanMessage(content=user_input)
-        ]
+        # Only the most recent history that fits the budget goes to the graph
+        messages = trim_history(history, history_tokens) + [HumanMessage(content=user_input)]
+        usage = TokenUsage()
+        started = time.perf_counter()
+        routed_at = first_token_at = None
+        reply = ""
 
-        # Process through the graph
         try:
-            result_state = graph.invoke(state)
-
-            # Get the agent type and response
-            agent_type = result_state.get("message_type", "unknown")
-            agent_icons = {
-                "emotional": "💭",
-                "logical": "🧠",
-                "study": "📚",
-                "creative": "🎨",
-                "planning": "📋"
-            }
-
-            if result_state.get("messages") and len(result_state["messages"]) > 0:
-                last_response = result_state["messages"][-1]
-                icon = agent_icons.get(agent_type, "🤖")
-                print(f"\n{icon} {agent_type.title()} Agent: {last_response.content}\n")
-
-            # Update state for next iteration
-            state = result_state
-
+            async for kind, value in stream_turn(messages, [usage]):
+                if kind == "routing":
+                    routed_at = time.perf_counter()
+                    print(f"\n{AGENT_ICONS.get(value, '🤖')} {value.title()} Agent: ", end="", flush=True)
+                elif kind == "token":
+                    first_token_at = first_token_at or time.perf_counter()
+                    print(value, end="", flush=True)
+                else:
+                    reply = value
+            if first_token_at is None:
+                # The model didn't stream, so show the whole reply at once
+                print(reply, end="")
+            print("\n")
         except Exception as e:
-            print(f"Error: {e}")
+            print(f"\nError: {e}")
             print("Please try again.\n")
+            continue
+
+        history = messages + [AIMessage(content=reply)]
+
+        if show_stats:
+            tokens = usage.totals()
+            routed = f"{routed_at - started:.2f}s" if routed_at else "-"
+            first_token = f"{first_token_at - started:.2f}s" if first_token_at else "-"
+            print(
+                f"⏱️  routed {routed} | first token {first_token} | total {time.perf_counter() - started:.2f}s"
+                f" | tokens in {tokens['input_tokens']} out {tokens['output_tokens']}"
+                f" | history {len(messages) - 1} messages\n"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-agent assistant")
+    parser.add_argument("--llm", choices=LLM_BACKENDS, default=os.getenv("LLM_BACKEND", "anthropic"),
+                        help="LLM backend; 'fake' runs offline without an API key")
+    parser.add_argument("--stats", action="store_true", help="Print latency and token stats after each turn")
+    parser.add_argument("--history-tokens", type=int, default=DEFAULT_HISTORY_TOKENS,
+                        help="Approximate token budget for the history sent with each turn")
+
+    benchmark = parser.add_argument_group("replay benchmark (see replay.py)")
+    benchmark.add_argument("--replay", metavar="TRANSCRIPT", help="Replay a transcript instead of chatting")
+    benchmark.add_argument("--output", metavar="RUN_JSON", help="Where to save the replay run")
+    benchmark.add_argument("--label", help="Name for the replay run in reports")
+    benchmark.add_argument("--repeat", type=int, default=1, help="Replay the transcript this many times")
+    benchmark.add_argument("--no-allocations", action="store_true",
+                           help="Don't trace allocations (tracing slows every turn down)")
+    benchmark.add_argument("--compare", nargs=2, metavar=("BASE_JSON", "NEW_JSON"),
+                           help="Compare two saved replay runs")
+    benchmark.add_argument("--threshold", type=float, default=10.0,
+                           help="Percent increase reported as a regression by --compare")
+    args = parser.parse_args()
+
+    if args.compare:
+        import replay
+        regressions = replay.compare_runs(
+            replay.load_run(args.compare[0]), replay.load_run(args.compare[1]), args.threshold / 100
+        )
+        sys.exit(1 if regressions else 0)
+
+    if args.replay:
+        import replay
+        run = asyncio.run(replay.replay(
+            args.replay, args.llm, args.history_tokens,
+            use_llm=use_llm, stream_turn=stream_turn, trim_history=trim_history, token_usage=TokenUsage,
+            repeat=args.repeat, allocations=not args.no_allocations, label=args.label
+        ))
+        replay.print_summary(run)
+        if args.output:
+            replay.save_run(run, args.output)
+            print(f"\n💾 Saved run to {args.output}")
+        return
+
+    use_llm(args.llm)
+    asyncio.run(run_chatbot(args.stats, args.history_tokens))
 
 
 if __name__ == "__main__":
-    run_chatbot()
\ No newline at end of file
+    main()
@@ -0,0 +1,300 @@
+"""
+Transcript replay benchmark for the graph
+
+Replays the user turns in a transcript through the compiled graph and
+records per-turn and per-node wall time, allocations and token counts, so a
+routing or prompt change can be compared against a baseline run before it
+ships:
+
+    python main.py --replay transcripts/sample.txt --llm fake --output base.json
+    python main.py --replay transcripts/sample.txt --llm fake --output new.json
+    python main.py --compare base.json new.json
+
+A transcript is a text file with one user turn per line. A line with only
+"---" starts a new conversation; blank lines and lines starting with "#" are
+skipped.
+"""
+import json
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage, HumanMessage
+
+# Relative increase in a metric reported as a regression by --compare
+DEFAULT_REGRESSION_THRESHOLD = 0.10
+
+# Smaller absolute changes (ms, tokens or KB) are noise, whatever the relative change
+MIN_REGRESSION_DELTA = 1.0
+
+
+class NodeProfiler(BaseCallbackHandler):
+    """
+    Wall time and allocations for each graph node run
+
+    Allocation peaks are reset when a node starts, which is only meaningful
+    because this graph runs its nodes one after another.
+    """
+
+    def __init__(self):
+        self.nodes: List[Dict[str, Any]] = []
+        self.peak = 0  # Highest traced memory seen during the turn, across the resets
+        self._running: Dict[Any, tuple] = {}
+
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        # Runnables inside a node report the node too; only time the node itself
+        if node is None or kwargs.get("name") != node:
+            return
+        memory = None
+        if tracemalloc.is_tracing():
+            memory, peak = tracemalloc.get_traced_memory()
+            self.peak = max(self.peak, peak)
+            tracemalloc.reset_peak()
+        self._running[run_id] = (node, time.perf_counter(), memory)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def _finish(self, run_id) -> None:
+        if run_id not in self._running:
+            return
+        node, started, memory = self._running.pop(run_id)
+        record = {"node": node, "wall_ms": (time.perf_counter() - started) * 1000}
+        if memory is not None:
+            current, peak = tracemalloc.get_traced_memory()
+            self.peak = max(self.peak, peak)
+            record["alloc_net_kb"] = (current - memory) / 1024
+            record["alloc_peak_kb"] = (peak - memory) / 1024
+        self.nodes.append(record)
+
+
+def load_transcript(path: str) -> List[List[str]]:
+    """Conversations, each a list of user turns"""
+    conversations = [[]]
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line == "---":
+                conversations.append([])
+            else:
+                conversations[-1].append(line)
+    return [turns for turns in conversations if turns]
+
+
+async def replay(transcript: str, backend: str, history_tokens: int, *,
+                 use_llm: Callable[[str], None], stream_turn: Callable, trim_history: Callable,
+                 token_usage: Callable[[], Any], repeat: int = 1, allocations: bool = True,
+                 label: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Replay a transcript through the graph and return the run record
+
+    The graph helpers come from the caller (main.py), so replaying doesn't
+    import main a second time as a module separate from __main__.
+    """
+    use_llm(backend)
+    conversations = load_transcript(transcript)
+    if allocations:
+        tracemalloc.start()
+
+    turns = []
+    try:
+        for _ in range(repeat):
+            for conversation_index, conversation in enumerate(conversations):
+                history = []
+                for text in conversation:
+                    messages = trim_history(history, history_tokens) + [HumanMessage(content=text)]
+                    turn, reply = await _replay_turn(messages, token_usage(), allocations, stream_turn)
+                    turn.update({"conversation": conversation_index, "input": text})
+                    turns.append(turn)
+                    history = messages + [AIMessage(content=reply)]
+    finally:
+        if allocations:
+            tracemalloc.stop()
+
+    return {
+        "label": label or f"{backend} {datetime.now(timezone.utc):%Y-%m-%d %H:%M:%S}",
+        "llm": backend,
+        "transcript": transcript,
+        "history_tokens": history_tokens,
+        "repeat": repeat,
+        "allocations": allocations,
+        "recorded_at": datetime.now(timezone.utc).isoformat(),
+        "turns": turns,
+        "summary": summarize(turns)
+    }
+
+
+async def _replay_turn(messages: list, usage, allocations: bool, stream_turn) -> tuple:
+    profiler = NodeProfiler()
+    agent = None
+    reply = ""
+    routing_ms = first_token_ms = None
+    if allocations:
+        tracemalloc.reset_peak()
+        memory = tracemalloc.get_traced_memory()[0]
+
+    started = time.perf_counter()
+    async for kind, value in stream_turn(messages, [usage, profiler]):
+        elapsed = (time.perf_counter() - started) * 1000
+        if kind == "routing":
+            agent, routing_ms = value, elapsed
+        elif kind == "token" and first_token_ms is None:
+            first_token_ms = elapsed
+        elif kind == "done":
+            reply = value
+    turn = {
+        "agent": agent,
+        "wall_ms": (time.perf_counter() - started) * 1000,
+        "routing_ms": routing_ms,
+        "first_token_ms": first_token_ms,
+        **usage.totals(),
+        "history_messages": len(messages) - 1,
+        "nodes": profiler.nodes
+    }
+    if allocations:
+        current, peak = tracemalloc.get_traced_memory()
+        turn["alloc_net_kb"] = (current - memory) / 1024
+        turn["alloc_peak_kb"] = (max(peak, profiler.peak) - memory) / 1024
+
+    for record in profiler.nodes:
+        counts = usage.by_node.get(record["node"], {})
+        record["input_tokens"] = counts.get("input_tokens", 0)
+        record["output_tokens"] = counts.get("output_tokens", 0)
+    return turn, reply
+
+
+def _distribution(values: List[float]) -> Dict[str, float]:
+    values = sorted(v for v in values if v is not None)
+    if not values:
+        return {}
+    return {
+        "p50": statistics.median(values),
+        "p95": values[min(len(values) - 1, int(len(values) * 0.95))],
+        "mean": statistics.fmean(values),
+        "total": sum(values)
+    }
+
+
+def summarize(turns: List[Dict[str, Any]]) -> Dict[str, Any]:
+    summary = {
+        "turns": len(turns),
+        "agents": {},
+        "metrics": {
+            metric: _distribution([turn.get(metric) for turn in turns])
+            for metric in ("wall_ms", "routing_ms", "first_token_ms", "input_tokens", "output_tokens",
+                           "alloc_net_kb", "alloc_peak_kb")
+        },
+        "nodes": {}
+    }
+    for turn in turns:
+        summary["agents"][turn["agent"]] = summary["agents"].get(turn["agent"], 0) + 1
+
+    records_by_node: Dict[str, List[Dict[str, Any]]] = {}
+    for turn in turns:
+        for record in turn["nodes"]:
+            records_by_node.setdefault(record["node"], []).append(record)
+    for node, records in records_by_node.items():
+        summary["nodes"][node] = {
+            "calls": len(records),
+            **{
+                metric: _distribution([record.get(metric) for record in records])
+                for metric in ("wall_ms", "alloc_peak_kb", "input_tokens", "output_tokens")
+            }
+        }
+    return summary
+
+
+def save_run(run: Dict[str, Any], path: str) -> None:
+    with open(path, "w") as f:
+        json.dump(run, f, indent=2)
+
+
+def load_run(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def print_summary(run: Dict[str, Any]) -> None:
+    summary = run["summary"]
+    print(f"\n📊 {run['label']}: {summary['turns']} turns on {run['llm']}")
+    for metric, values in summary["metrics"].items():
+        if values:
+            print(f"   {metric:16} p50 {values['p50']:10.2f}  p95 {values['p95']:10.2f}  total {values['total']:12.2f}")
+    print("   per node:")
+    for node, stats in summary["nodes"].items():
+        wall = stats["wall_ms"]
+        tokens = stats["input_tokens"].get("total", 0) + stats["output_tokens"].get("total", 0)
+        print(f"   {node:16} calls {stats['calls']:4}  wall p50 {wall['p50']:9.2f} ms  p95 {wall['p95']:9.2f} ms  tokens {tokens:8.0f}")
+
+
+def _change(base: Optional[float], new: Optional[float]) -> Optional[float]:
+    if base is None or new is None:
+        return None
+    if base == 0:
+        return 0.0 if new == 0 else float("inf")
+    return (new - base) / base
+
+
+def compare_runs(base: Dict[str, Any], new: Dict[str, Any],
+                 threshold: float = DEFAULT_REGRESSION_THRESHOLD) -> List[str]:
+    """
+    Print a comparison of two runs
+
+    Returns:
+        The metrics that got worse by more than threshold
+    """
+    regressions = []
+
+    def row(name: str, base_value: Optional[float], new_value: Optional[float]) -> None:
+        change = _change(base_value, new_value)
+        flag = ""
+        significant = change is not None and abs(new_value - base_value) >= MIN_REGRESSION_DELTA
+        if significant and change > threshold:
+            flag = "  ⚠️ regression"
+            regressions.append(name)
+        elif significant and change < -threshold:
+            flag = "  ✅ improved"
+        def fmt(value: Optional[float]) -> str:
+            return f"{value:12.2f}" if value is not None else f"{'-':>12}"
+        pct = f"{change * 100:+8.1f}%" if change is not None and change != float("inf") else f"{'-':>9}"
+        print(f"   {name:36} {fmt(base_value)} {fmt(new_value)} {pct}{flag}")
+
+    print(f"\n🔍 {base['label']}  →  {new['label']}")
+    if base["transcript"] != new["transcript"] or base["llm"] != new["llm"]:
+        print("⚠️  Runs used different transcripts or LLM backends; differences may not be from the change")
+    if base["allocations"] != new["allocations"]:
+        print("⚠️  Only one run traced allocations, which slows it down; wall times aren't comparable")
+
+    print(f"   {'metric (p50)':36} {'base':>12} {'new':>12} {'change':>9}")
+    for metric in base["summary"]["metrics"]:
+        row(metric, base["summary"]["metrics"][metric].get("p50"), new["summary"]["metrics"].get(metric, {}).get("p50"))
+    for metric in ("wall_ms", "routing_ms"):
+        row(f"{metric} p95", base["summary"]["metrics"][metric].get("p95"), new["summary"]["metrics"][metric].get("p95"))
+
+    for node in sorted(set(base["summary"]["nodes"]) | set(new["summary"]["nodes"])):
+        base_node = base["summary"]["nodes"].get(node, {})
+        new_node = new["summary"]["nodes"].get(node, {})
+        for metric in ("wall_ms", "input_tokens", "output_tokens", "alloc_peak_kb"):
+            row(f"{node}.{metric}", base_node.get(metric, {}).get("p50"), new_node.get(metric, {}).get("p50"))
+
+    # Routing changes show up as different agents for the same input
+    rerouted = [
+        (b["input"], b["agent"], n["agent"])
+        for b, n in zip(base["turns"], new["turns"])
+        if b["input"] == n["input"] and b["agent"] != n["agent"]
+    ]
+    if rerouted:
+        print(f"\n🔀 {len(rerouted)} turns routed differently:")
+        for text, before, after in rerouted[:20]:
+            print(f"   {before} → {after}: {text[:60]}")
+
+    print(f"\n{'⚠️ ' if regressions else '✅'} {len(regressions)} metrics regressed by more than {threshold:.0%}")
+    return regressions